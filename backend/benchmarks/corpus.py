@@ -0,0 +1,233 @@
+"""Synthetic stream-json transcripts shaped like `claude --output-format stream-json`.
+
+Deterministic (seeded) so benchmark runs are comparable. Real recordings can
+be used instead by pointing the benchmark at a directory of .ndjson files.
+"""
+
+import json
+import random
+import uuid
+from collections.abc import Iterator
+from pathlib import Path
+
+TOOLS = ["Read", "Write", "Edit", "Bash", "Glob", "Grep", "Task", "WebFetch", "TodoWrite"]
+MODEL = "claude-sonnet-4-20250514"
+
+WORDS = (
+    "the session runner parses each line converts it to events and streams them to "
+    "the browser while the monitor builds a tree of tool calls for every nested task"
+).split()
+
+
+class _Transcript:
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.cli_session_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        self.lines: list[dict] = []
+        self.n_tool = 0
+        self.n_msg = 0
+
+    def _id(self, prefix: str) -> str:
+        return f"{prefix}_{self.rng.getrandbits(64):016x}"
+
+    def words(self, n: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def init(self):
+        self.lines.append({
+            "type": "system",
+            "subtype": "init",
+            "session_id": self.cli_session_id,
+            "cwd": "/home/dev/project",
+            "tools": TOOLS,
+            "mcp_servers": [{"name": "github", "status": "connected"}],
+            "model": MODEL,
+            "permissionMode": "bypassPermissions",
+        })
+
+    def _assistant(self, content: list[dict], parent: str | None = None):
+        self.n_msg += 1
+        self.lines.append({
+            "type": "assistant",
+            "message": {
+                "id": self._id("msg"),
+                "type": "message",
+                "role": "assistant",
+                "model": MODEL,
+                "content": content,
+                "stop_reason": None,
+                "usage": {"input_tokens": 12, "output_tokens": 40},
+            },
+            "parent_tool_use_id": parent,
+            "session_id": self.cli_session_id,
+        })
+
+    def text(self, n_words: int, parent: str | None = None):
+        self._assistant([{"type": "text", "text": self.words(n_words)}], parent)
+
+    def tool(self, name: str | None = None, parent: str | None = None,
+             result_len: int | None = None, tool_input: dict | None = None) -> str:
+        name = name or self.rng.choice(TOOLS[:6])
+        tool_id = self._id("toolu")
+        self.n_tool += 1
+        if tool_input is None:
+            tool_input = {
+                "Read": {"file_path": f"/home/dev/project/src/mod_{self.n_tool}.py"},
+                "Write": {"file_path": f"/tmp/out_{self.n_tool}.txt", "content": self.words(60)},
+                "Edit": {"file_path": "/home/dev/project/app.py",
+                         "old_string": self.words(5), "new_string": self.words(6)},
+                "Bash": {"command": f"pytest -q tests/test_{self.n_tool}.py"},
+                "Glob": {"pattern": "**/*.py"},
+                "Grep": {"pattern": "TODO", "path": "src"},
+            }.get(name, {"query": self.words(8)})
+        self._assistant([{"type": "tool_use", "id": tool_id, "name": name, "input": tool_input}],
+                        parent)
+        if result_len is None:
+            result_len = self.rng.choice([80, 300, 1200, 2500, 9000])
+        body = self.words(result_len // 5)[:result_len]
+        self.lines.append({
+            "type": "user",
+            "message": {
+                "role": "user",
+                "content": [{
+                    "tool_use_id": tool_id,
+                    "type": "tool_result",
+                    "content": [{"type": "text", "text": body}],
+                    "is_error": self.rng.random() < 0.03,
+                }],
+            },
+            "parent_tool_use_id": parent,
+            "session_id": self.cli_session_id,
+        })
+        return tool_id
+
+    def result(self):
+        self.lines.append({
+            "type": "result",
+            "subtype": "success",
+            "is_error": False,
+            "duration_ms": 1000 + 250 * self.n_tool,
+            "duration_api_ms": 800 + 200 * self.n_tool,
+            "num_turns": self.n_msg,
+            "result": self.words(20),
+            "session_id": self.cli_session_id,
+            "cost_usd": round(0.002 * self.n_msg, 6),
+            "usage": {
+                "input_tokens": 1500 * self.n_msg,
+                "output_tokens": 60 * self.n_msg,
+                "cache_read_tokens": 1200 * self.n_msg,
+                "cache_write_tokens": 300,
+            },
+            "model": MODEL,
+        })
+
+
+def small_chat(seed: int = 1) -> list[dict]:
+    t = _Transcript(seed)
+    t.init()
+    for _ in range(3):
+        t.text(t.rng.randint(30, 200))
+    t.result()
+    return t.lines
+
+
+def tool_heavy(n_tools: int = 500, seed: int = 2) -> list[dict]:
+    t = _Transcript(seed)
+    t.init()
+    for i in range(n_tools):
+        if i % 10 == 0:
+            t.text(40)
+        t.tool()
+    t.text(120)
+    t.result()
+    return t.lines
+
+
+def nested_tasks(n_tasks: int = 20, tools_per_task: int = 15, seed: int = 3) -> list[dict]:
+    """Task tool calls whose subagent messages carry parent_tool_use_id.
+
+    The Task's own tool_result is written after its children, as the CLI does.
+    """
+    t = _Transcript(seed)
+    t.init()
+    for i in range(n_tasks):
+        t.text(30)
+        task_id = t._id("toolu")
+        t.n_tool += 1
+        t._assistant([{
+            "type": "tool_use",
+            "id": task_id,
+            "name": "Task",
+            "input": {"description": f"Subtask {i}", "prompt": t.words(40),
+                      "subagent_type": t.rng.choice(["Explore", "general-purpose", "Plan"])},
+        }])
+        for _ in range(tools_per_task):
+            t.tool(parent=task_id)
+        t.text(60, parent=task_id)
+        t.lines.append({
+            "type": "user",
+            "message": {"role": "user", "content": [{
+                "tool_use_id": task_id, "type": "tool_result",
+                "content": [{"type": "text", "text": t.words(150)}],
+            }]},
+            "session_id": t.cli_session_id,
+        })
+    t.result()
+    return t.lines
+
+
+def partial_chat(n_messages: int = 20, seed: int = 4) -> list[dict]:
+    """Token-level stream_event deltas (--include-partial-messages)."""
+    t = _Transcript(seed)
+    t.init()
+    for _ in range(n_messages):
+        msg_id = t._id("msg")
+        text = t.words(t.rng.randint(50, 300))
+        wrap = {"session_id": t.cli_session_id, "parent_tool_use_id": None}
+        t.lines.append({"type": "stream_event", "event": {
+            "type": "message_start", "message": {"id": msg_id, "content": []}}, **wrap})
+        t.lines.append({"type": "stream_event", "event": {
+            "type": "content_block_start", "index": 0,
+            "content_block": {"type": "text", "text": ""}}, **wrap})
+        for i in range(0, len(text), 12):
+            t.lines.append({"type": "stream_event", "event": {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": text[i:i + 12]}}, **wrap})
+        t.lines.append({"type": "stream_event", "event": {
+            "type": "content_block_stop", "index": 0}, **wrap})
+        t.lines.append({"type": "assistant", "message": {
+            "id": msg_id, "role": "assistant", "content": [{"type": "text", "text": text}]},
+            "session_id": t.cli_session_id})
+        t.lines.append({"type": "stream_event", "event": {"type": "message_stop"}, **wrap})
+        t.n_msg += 1
+    t.result()
+    return t.lines
+
+
+SCENARIOS = {
+    "small_chat": small_chat,
+    "tool_heavy_500": tool_heavy,
+    "nested_tasks": nested_tasks,
+    "partial_chat": partial_chat,
+}
+
+
+def to_ndjson(lines: list[dict]) -> bytes:
+    return b"".join(json.dumps(obj, ensure_ascii=False).encode() + b"\n" for obj in lines)
+
+
+def iter_corpus(corpus_dir: str | Path | None = None) -> Iterator[tuple[str, list[bytes]]]:
+    """Yield (name, raw lines). Uses *.ndjson files from corpus_dir if given."""
+    if corpus_dir:
+        for path in sorted(Path(corpus_dir).glob("*.ndjson")):
+            yield path.stem, path.read_bytes().splitlines()
+        return
+    for name, build in SCENARIOS.items():
+        yield name, to_ndjson(build()).splitlines()
+
+
+def write_corpus(out_dir: str | Path) -> None:
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    for name, build in SCENARIOS.items():
+        (out / f"{name}.ndjson").write_bytes(to_ndjson(build()))
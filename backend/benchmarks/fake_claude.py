@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Stand-in for the Claude CLI that replays stream-json without spending tokens.
+
+Point the server at it with CLAUDE_BIN=/path/to/backend/benchmarks/fake_claude.py.
+It accepts the flags CliRunner passes and is configured through env vars
+(inherited from the server process):
+
+  FAKE_CLAUDE_TRANSCRIPT   replay this .ndjson file instead of a generated one
+  FAKE_CLAUDE_SCENARIO     corpus scenario (small_chat, tool_heavy_500, nested_tasks,
+                           partial_chat); default small_chat, or partial_chat when
+                           --include-partial-messages is passed
+  FAKE_CLAUDE_TOOLS        generate a tool-heavy session with this many tool calls
+  FAKE_CLAUDE_STARTUP_MS   delay before the first line (cold-start emulation)
+  FAKE_CLAUDE_LINE_DELAY_MS  delay between lines (0 = as fast as possible)
+  FAKE_CLAUDE_FAIL_RATE    probability [0-1] of dying halfway with exit code 1
+  FAKE_CLAUDE_STDERR_BYTES  write this much log noise to stderr before stdout
+  FAKE_CLAUDE_BURN_CPU_S   spin the CPU this long before the first line
+  FAKE_CLAUDE_WRITE_FILE   create this file (relative to the cwd) like an edit tool
+  FAKE_CLAUDE_SILENT_MS    then print nothing for this long (a long tool call)
+  FAKE_CLAUDE_SEED         seed for generation and failures
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import SCENARIOS, to_ndjson, tool_heavy  # noqa: E402
+
+
+def _env_float(name: str, default: float = 0.0) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _load_lines(partial: bool, seed: int) -> list[bytes]:
+    transcript = os.environ.get("FAKE_CLAUDE_TRANSCRIPT")
+    if transcript:
+        return Path(transcript).read_bytes().splitlines()
+
+    n_tools = os.environ.get("FAKE_CLAUDE_TOOLS")
+    if n_tools:
+        return to_ndjson(tool_heavy(int(n_tools), seed=seed)).splitlines()
+
+    default = "partial_chat" if partial else "small_chat"
+    scenario = os.environ.get("FAKE_CLAUDE_SCENARIO", default)
+    build = SCENARIOS.get(scenario)
+    if build is None:
+        print(f"fake_claude: unknown scenario {scenario!r}", file=sys.stderr)
+        sys.exit(2)
+    return to_ndjson(build()).splitlines()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--print", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    parser.add_argument("--output-format")
+    parser.add_argument("--model")
+    parser.add_argument("--agent")
+    parser.add_argument("--include-partial-messages", action="store_true")
+    parser.add_argument("--input-format")
+    parser.add_argument("--resume")
+    parser.add_argument("--fork-session", action="store_true")
+    args, _rest = parser.parse_known_args()
+
+    seed = int(_env_float("FAKE_CLAUDE_SEED", time.time_ns() % 2**32))
+    rng = random.Random(seed)
+    lines = _load_lines(args.include_partial_messages, seed)
+
+    startup = _env_float("FAKE_CLAUDE_STARTUP_MS") / 1000
+    delay = _env_float("FAKE_CLAUDE_LINE_DELAY_MS") / 1000
+    fail_at = len(lines) // 2 if rng.random() < _env_float("FAKE_CLAUDE_FAIL_RATE") else -1
+
+    if startup:
+        time.sleep(startup)
+
+    if args.input_format == "stream-json":
+        # Like the real CLI: boot first, then block until the prompt arrives
+        prompt_lines = [ln for ln in sys.stdin.buffer.read().splitlines() if ln.strip()]
+        if not prompt_lines:
+            print("fake_claude: no input on stdin", file=sys.stderr)
+            return 1
+
+    burn_until = time.process_time() + _env_float("FAKE_CLAUDE_BURN_CPU_S")
+    while time.process_time() < burn_until:
+        pass
+
+    noise = int(_env_float("FAKE_CLAUDE_STDERR_BYTES"))
+    while noise > 0:
+        chunk = b"fake_claude: debug log line\n" * 1024
+        sys.stderr.buffer.write(chunk[:noise])
+        noise -= len(chunk)
+    sys.stderr.flush()
+
+    if os.environ.get("FAKE_CLAUDE_WRITE_FILE"):
+        Path(os.environ["FAKE_CLAUDE_WRITE_FILE"]).write_text("written by fake_claude\n")
+    time.sleep(_env_float("FAKE_CLAUDE_SILENT_MS") / 1000)
+
+    out = sys.stdout.buffer
+    for i, line in enumerate(lines):
+        if i == fail_at:
+            print("fake_claude: simulated crash", file=sys.stderr)
+            return 1
+        out.write(line + b"\n")
+        out.flush()
+        if delay:
+            time.sleep(delay)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""End-to-end load driver: N concurrent sessions through POST /api/sessions + /stream.
+
+By default it spawns its own uvicorn server with a temp DB and CLAUDE_BIN set
+to benchmarks/fake_claude.py, so no tokens are spent:
+
+    uv run python -m benchmarks.load_test --sessions 200 --concurrency 20 \\
+        --scenario tool_heavy_500 --line-delay-ms 1
+
+Use --url (and optionally --server-pid for RSS) to target a running server.
+
+Reports sessions/sec, time-to-first-event, SSE lag (receive time minus the
+event's server timestamp), DB write latency (terminal event → events
+readable from /api/sessions/{id}/events) and server RSS.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+FAKE_CLAUDE = Path(__file__).resolve().with_name("fake_claude.py")
+TERMINAL = ("RunFinished", "RunError")
+
+
+@dataclass
+class SessionResult:
+    ok: bool = False
+    events: int = 0
+    ttfe_ms: float | None = None
+    total_ms: float = 0.0
+    db_write_ms: float | None = None
+    lags_ms: list[float] = field(default_factory=list)
+    error: str | None = None
+
+
+def _pct(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> float | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+async def _sample_rss(pid: int, samples: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = _rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.1)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _run_session(client: httpx.AsyncClient, workspace_id: str, batch: bool,
+                       db_timeout_s: float) -> SessionResult:
+    res = SessionResult()
+    t0 = time.perf_counter()
+    try:
+        resp = await client.post(
+            "/api/sessions", json={"workspace_id": workspace_id, "prompt": "load test"}
+        )
+        resp.raise_for_status()
+        session_id = resp.json()["session_id"]
+
+        terminal_at = None
+        params = {"batch": "true"} if batch else {}
+        async with client.stream(
+            "GET", f"/api/sessions/{session_id}/stream", params=params
+        ) as stream:
+            event_name = None
+            async for line in stream.aiter_lines():
+                if line.startswith("event:"):
+                    event_name = line[6:].strip()
+                    continue
+                if not line.startswith("data:"):
+                    continue
+                now = time.perf_counter()
+                if res.ttfe_ms is None:
+                    res.ttfe_ms = (now - t0) * 1000
+                payload = json.loads(line[5:].strip())
+                events = payload if event_name == "Batch" else [payload]
+                wall = datetime.now(timezone.utc)
+                for ev in events:
+                    res.events += 1
+                    if ev.get("timestamp"):
+                        sent = datetime.fromisoformat(ev["timestamp"])
+                        res.lags_ms.append((wall - sent).total_seconds() * 1000)
+                    if ev.get("type") in TERMINAL:
+                        terminal_at = now
+                        res.ok = ev["type"] == "RunFinished"
+                        if not res.ok:
+                            res.error = ev.get("error")
+        res.total_ms = (time.perf_counter() - t0) * 1000
+
+        if terminal_at is not None:
+            deadline = time.perf_counter() + db_timeout_s
+            while time.perf_counter() < deadline:
+                r = await client.get(f"/api/sessions/{session_id}/events")
+                if r.status_code == 200 and r.json()["events"]:
+                    res.db_write_ms = (time.perf_counter() - terminal_at) * 1000
+                    break
+                await asyncio.sleep(0.01)
+    except Exception as e:  # report, don't abort the whole run
+        res.error = f"{type(e).__name__}: {e}"
+    return res
+
+
+async def run_load(url: str, sessions: int, concurrency: int, batch: bool,
+                   server_pid: int | None, workspace_path: str) -> dict:
+    limits = httpx.Limits(max_connections=concurrency * 2 + 4)
+    async with httpx.AsyncClient(
+        base_url=url, timeout=None, limits=limits, trust_env=False
+    ) as client:
+        r = await client.post("/api/workspaces/tenants", json={
+            "name": "load", "config_dir": workspace_path, "claude_alias": "fake"})
+        r.raise_for_status()
+        r = await client.post("/api/workspaces", json={
+            "tenant_id": r.json()["id"], "name": "load", "path": workspace_path})
+        r.raise_for_status()
+        workspace_id = r.json()["id"]
+
+        rss: list[float] = []
+        stop = asyncio.Event()
+        sampler = (
+            asyncio.create_task(_sample_rss(server_pid, rss, stop)) if server_pid else None
+        )
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one() -> SessionResult:
+            async with sem:
+                return await _run_session(client, workspace_id, batch, db_timeout_s=30)
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(one() for _ in range(sessions)))
+        wall = time.perf_counter() - t0
+        stop.set()
+        if sampler:
+            await sampler
+
+    ok = [r for r in results if r.ok]
+    lags = [lag for r in results for lag in r.lags_ms]
+    ttfe = [r.ttfe_ms for r in results if r.ttfe_ms is not None]
+    db = [r.db_write_ms for r in results if r.db_write_ms is not None]
+    errors: dict[str, int] = {}
+    for r in results:
+        if r.error:
+            errors[r.error[:120]] = errors.get(r.error[:120], 0) + 1
+
+    def dist(values: list[float]) -> dict:
+        return {p: _round(_pct(values, n)) for p, n in (("p50", 50), ("p95", 95), ("p99", 99))}
+
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "completed": len(ok),
+        "failed": sessions - len(ok),
+        "wall_s": round(wall, 2),
+        "sessions_per_sec": round(len(ok) / wall, 2) if wall else 0.0,
+        "events_per_sec": round(sum(r.events for r in results) / wall, 1) if wall else 0.0,
+        "ttfe_ms": dist(ttfe),
+        "sse_lag_ms": dist(lags),
+        "db_write_ms": dist(db),
+        "server_rss_mb": {"peak": _round(max(rss, default=None)),
+                          "end": _round(rss[-1] if rss else None)},
+        "errors": errors,
+    }
+
+
+def _round(v: float | None) -> float | None:
+    return None if v is None else round(v, 2)
+
+
+def _spawn_server(port: int, tmp: Path, fake_env: dict[str, str]) -> subprocess.Popen:
+    env = os.environ.copy()
+    env.update(fake_env)
+    env.update({
+        "DB_PATH": str(tmp / "load.db"),
+        "BLOB_DIR": str(tmp / "blobs"),
+        "CLAUDE_BIN": str(FAKE_CLAUDE),
+        "PYTHONPATH": os.pathsep.join(
+            [str(BACKEND_DIR / "src"), env.get("PYTHONPATH", "")]
+        ).rstrip(os.pathsep),
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "dcc.app:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=tmp,
+        env=env,
+    )
+
+
+async def _wait_healthy(url: str, timeout_s: float = 20) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient(base_url=url, trust_env=False) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/api/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {url} did not become healthy")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", help="target a running server instead of spawning one")
+    parser.add_argument("--server-pid", type=int, help="pid to sample RSS from (with --url)")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--batch", action="store_true", help="use /stream?batch=true")
+    parser.add_argument("--scenario", default="small_chat")
+    parser.add_argument("--tools", type=int, help="synthetic tool calls per session")
+    parser.add_argument("--transcript", help="replay a recorded .ndjson file")
+    parser.add_argument("--startup-ms", type=float, default=0)
+    parser.add_argument("--line-delay-ms", type=float, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    fake_env = {
+        "FAKE_CLAUDE_SCENARIO": args.scenario,
+        "FAKE_CLAUDE_STARTUP_MS": str(args.startup_ms),
+        "FAKE_CLAUDE_LINE_DELAY_MS": str(args.line_delay_ms),
+        "FAKE_CLAUDE_FAIL_RATE": str(args.fail_rate),
+    }
+    if args.tools:
+        fake_env["FAKE_CLAUDE_TOOLS"] = str(args.tools)
+    if args.transcript:
+        fake_env["FAKE_CLAUDE_TRANSCRIPT"] = str(Path(args.transcript).resolve())
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        server = None
+        url, pid = args.url, args.server_pid
+        if not url:
+            port = _free_port()
+            url = f"http://127.0.0.1:{port}"
+            server = _spawn_server(port, tmp, fake_env)
+            pid = server.pid
+        try:
+            if server:
+                asyncio.run(_wait_healthy(url))
+            report = asyncio.run(
+                run_load(url, args.sessions, args.concurrency, args.batch, pid, str(tmp))
+            )
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:>18}: {value}")
+    return 0 if report["failed"] == 0 or args.fail_rate else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
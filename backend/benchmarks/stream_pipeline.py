@@ -0,0 +1,263 @@
+"""Microbenchmarks for the stream pipeline.
+
+Stages, per scenario of the corpus:
+  parse      parse_cli_bytes(line)
+  convert    PartialMessageConverter.convert(cli_event)  (blob store in a tmp dir)
+  serialize  AgUiEvent.to_json()
+  monitor    MonitorProcessor.process_event(event)       (SQLite in a tmp dir)
+
+For each stage it reports items/sec, p99 latency per item and the mean
+transient allocation per item (tracemalloc peak, measured in a separate pass
+so tracing does not skew the timings). Results are compared against a stored
+baseline; a regression beyond the tolerance exits with status 1.
+
+Timings depend on the machine, so each run also times a fixed calibration
+workload and the baseline's throughput and latency are rescaled by the speed
+ratio before comparing. Allocations depend on the interpreter and decoder
+instead, so baselines are stored per Python version and decoder
+(e.g. "py3.13-orjson"); with no entry for the current one there is nothing
+to compare against.
+
+    uv run python -m benchmarks.stream_pipeline
+    uv run python -m benchmarks.stream_pipeline --update-baseline
+    uv run python -m benchmarks.stream_pipeline --corpus-dir recordings/
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.corpus import iter_corpus
+from dcc.config import settings
+from dcc.db import repository
+from dcc.db.database import close_db, init_db
+from dcc.engine.blob_store import BlobStore
+from dcc.engine.event_converter import PartialMessageConverter
+from dcc.engine.monitor import MonitorProcessor
+from dcc.engine.stream_parser import FAST_DECODER, parse_cli_bytes
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+STAGES = ("parse", "convert", "serialize", "monitor")
+CALIBRATION_OPS = 20_000
+_CALIBRATION_LINE = json.dumps(
+    {"type": "assistant", "message": {"content": [{"type": "text", "text": "x" * 64}] * 4}}
+)
+
+
+def baseline_key() -> str:
+    return f"py{sys.version_info.major}.{sys.version_info.minor}-{FAST_DECODER}"
+
+
+def calibrate(rounds: int = 5) -> float:
+    """Ops/sec (best of rounds) of a fixed parse-and-serialize loop."""
+    best = 0.0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(CALIBRATION_OPS):
+            msg = json.loads(_CALIBRATION_LINE)
+            json.dumps({"type": msg["type"], "n": len(msg["message"]["content"])})
+        best = max(best, CALIBRATION_OPS / (time.perf_counter() - t0))
+    return round(best, 1)
+
+
+def _percentile(samples: list[int], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class _Stage:
+    def __init__(self):
+        self.samples_ns: list[int] = []
+        self.alloc_bytes = 0
+        self.alloc_items = 0
+
+    def summary(self) -> dict:
+        total_ns = sum(self.samples_ns)
+        n = len(self.samples_ns)
+        return {
+            "items": n,
+            "items_per_sec": round(n / (total_ns / 1e9), 1) if total_ns else 0.0,
+            "p50_us": round(_percentile(self.samples_ns, 50) / 1000, 2),
+            "p99_us": round(_percentile(self.samples_ns, 99) / 1000, 2),
+            "alloc_bytes_per_item": (
+                round(self.alloc_bytes / self.alloc_items) if self.alloc_items else 0
+            ),
+        }
+
+
+async def _run_scenario(
+    session_id: str, lines: list[bytes], tmp: Path, trace: bool, stages: dict[str, _Stage]
+) -> None:
+    store = BlobStore(tmp / ("blobs-trace" if trace else "blobs"))
+    converter = PartialMessageConverter(session_id, store)
+    monitor = MonitorProcessor(session_id)
+    clock = time.perf_counter_ns
+
+    def measure(stage: str, fn, *args):
+        if trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            out = fn(*args)
+            stages[stage].alloc_bytes += tracemalloc.get_traced_memory()[1] - base
+            stages[stage].alloc_items += 1
+            return out
+        t0 = clock()
+        out = fn(*args)
+        stages[stage].samples_ns.append(clock() - t0)
+        return out
+
+    for line in lines:
+        cli = measure("parse", parse_cli_bytes, line)
+        if cli is None:
+            continue
+        for ev in measure("convert", converter.convert, cli):
+            measure("serialize", ev.to_json)
+            if trace:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                await monitor.process_event(ev)
+                stages["monitor"].alloc_bytes += tracemalloc.get_traced_memory()[1] - base
+                stages["monitor"].alloc_items += 1
+            else:
+                t0 = clock()
+                await monitor.process_event(ev)
+                stages["monitor"].samples_ns.append(clock() - t0)
+
+
+async def run_benchmarks(corpus_dir: str | None = None, repeat: int = 3) -> dict:
+    results: dict[str, dict] = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        settings.db_path = str(tmp / "bench.db")
+        await close_db()
+        await init_db()
+        await repository.upsert_tenant("bench", "Bench", str(tmp), "claude")
+        await repository.upsert_workspace("bench-ws", "bench", "Bench", str(tmp))
+
+        try:
+            for name, lines in iter_corpus(corpus_dir):
+                stages = {s: _Stage() for s in STAGES}
+                for _ in range(repeat):
+                    session_id = await repository.create_session("bench-ws", name)
+                    await _run_scenario(session_id, lines, tmp, False, stages)
+
+                tracemalloc.start()
+                try:
+                    session_id = await repository.create_session("bench-ws", name)
+                    await _run_scenario(session_id, lines, tmp, True, stages)
+                finally:
+                    tracemalloc.stop()
+
+                results[name] = {s: stages[s].summary() for s in STAGES}
+        finally:
+            await close_db()
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float, speed: float = 1.0) -> list[str]:
+    """Return human-readable regressions versus the baseline.
+
+    speed is this machine's calibration over the baseline's: expected
+    throughput scales with it, expected latency with its inverse.
+    Throughput and allocations use `tolerance`; p99 is noisier and gets twice it.
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, cur in stages.items():
+            base = baseline.get(scenario, {}).get(stage)
+            if not base:
+                continue
+            expected_ips = base["items_per_sec"] * speed
+            expected_p99 = base["p99_us"] / speed
+            if cur["items_per_sec"] < expected_ips * (1 - tolerance):
+                regressions.append(
+                    f"{scenario}/{stage}: {cur['items_per_sec']:.0f} items/s "
+                    f"< baseline {expected_ips:.0f} (scaled)"
+                )
+            if cur["p99_us"] > expected_p99 * (1 + 2 * tolerance):
+                regressions.append(
+                    f"{scenario}/{stage}: p99 {cur['p99_us']}us "
+                    f"> baseline {expected_p99:.2f}us (scaled)"
+                )
+            if cur["alloc_bytes_per_item"] > base["alloc_bytes_per_item"] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario}/{stage}: {cur['alloc_bytes_per_item']} B/item "
+                    f"> baseline {base['alloc_bytes_per_item']} B/item"
+                )
+    return regressions
+
+
+def _print_table(results: dict) -> None:
+    header = (
+        f"{'scenario':<16} {'stage':<10} {'items':>7} {'items/s':>11} "
+        f"{'p50 us':>8} {'p99 us':>8} {'B/item':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for scenario, stages in results.items():
+        for stage, r in stages.items():
+            print(
+                f"{scenario:<16} {stage:<10} {r['items']:>7} {r['items_per_sec']:>11.0f} "
+                f"{r['p50_us']:>8.2f} {r['p99_us']:>8.2f} {r['alloc_bytes_per_item']:>8}"
+            )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--corpus-dir", help="directory of recorded *.ndjson transcripts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args(argv)
+
+    calibration = calibrate()
+    results = asyncio.run(run_benchmarks(args.corpus_dir, args.repeat))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(
+            f"python {platform.python_version()}, decoder={FAST_DECODER}, "
+            f"calibration={calibration:.0f} ops/s\n"
+        )
+        _print_table(results)
+
+    key = baseline_key()
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    if args.update_baseline:
+        baselines[key] = {"calibration_ops_per_sec": calibration, "results": results}
+        baseline_path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+        print(f"\nBaseline {key} written to {baseline_path}")
+        return 0
+
+    entry = baselines.get(key)
+    if entry is None:
+        print(f"\nNo {key} baseline in {baseline_path}; run with --update-baseline")
+        return 0
+
+    speed = calibration / entry["calibration_ops_per_sec"]
+    print(f"\nComparing against {key} baseline, machine speed x{speed:.2f}")
+    regressions = compare(results, entry["results"], args.tolerance, speed)
+    if regressions:
+        print("\nRegressions:")
+        for r in regressions:
+            print(f"  {r}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,3 +28,8 @@ async def top_skills(limit: int = Query(default=10, ge=1, le=100)):
 @router.get("/token-efficiency")
 async def token_efficiency():
     return await repository.get_token_efficiency()
+
+
+@router.get("/resources")
+async def resource_usage(days: int = Query(default=30, ge=1, le=365)):
+    return await repository.get_resource_usage(days=days)
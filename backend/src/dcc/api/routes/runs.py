@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+
+from dcc.engine.scheduler import scheduler
+from dcc.engine.worktree_pool import worktree_pool
+
+router = APIRouter(prefix="/api/runs", tags=["runs"])
+
+
+@router.get("/queue")
+async def get_run_queue():
+    """Running and queued CLI runs with the configured concurrency caps."""
+    return scheduler.snapshot()
+
+
+@router.get("/worktrees")
+async def get_worktrees():
+    """Idle and leased worktrees of the isolation pool."""
+    return worktree_pool.stats()
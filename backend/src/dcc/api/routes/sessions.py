@@ -1,22 +1,60 @@
 import asyncio
+import json
 import logging
-import time
+from typing import Literal
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
 from sse_starlette.sse import EventSourceResponse
 
+from dcc.config import settings
 from dcc.db import repository
+from dcc.engine.blob_store import get_blob_store
 from dcc.engine.cli_runner import CliRunner
-from dcc.engine.monitor import MonitorProcessor
-from dcc.engine.types import AgUiEventType
+from dcc.engine.event_batcher import coalesce_events
+from dcc.engine.resource_limits import ResourceLimits
+from dcc.engine.run_manager import RunHandle, run_manager
+from dcc.engine.scheduler import RunTicket
+from dcc.engine.warm_pool import warm_pool
+from dcc.engine.worktree_pool import ISOLATION_WORKTREE, worktree_pool
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/sessions", tags=["sessions"])
 
-# Active runners indexed by session_id
-_active_runners: dict[str, CliRunner] = {}
+BATCH_EVENT = "Batch"
+
+_continue_lock = asyncio.Lock()
+
+
+class Attachment(BaseModel):
+    """A file sent along with the prompt: images and PDFs base64-encoded,
+    text/* as plain text."""
+
+    name: str | None = None
+    media_type: str
+    data: str
+
+    @field_validator("media_type")
+    @classmethod
+    def _supported(cls, v: str) -> str:
+        if not (v.startswith(("image/", "text/")) or v == "application/pdf"):
+            raise ValueError(f"unsupported attachment type {v}")
+        return v
+
+    def to_content_block(self) -> dict:
+        if self.media_type.startswith("image/"):
+            source = {"type": "base64", "media_type": self.media_type, "data": self.data}
+            return {"type": "image", "source": source}
+        if self.media_type == "application/pdf":
+            source = {"type": "base64", "media_type": self.media_type, "data": self.data}
+        else:
+            source = {"type": "text", "media_type": "text/plain", "data": self.data}
+        block = {"type": "document", "source": source}
+        if self.name:
+            block["title"] = self.name
+        return block
 
 
 class CreateSessionRequest(BaseModel):
@@ -26,6 +64,14 @@ class CreateSessionRequest(BaseModel):
     agent: str | None = None
     model: str | None = None
     workflow_id: str | None = None
+    # Run budgets in seconds; None uses settings, 0 disables
+    timeout_s: float | None = None
+    idle_timeout_s: float | None = None
+    # "worktree": run in an isolated git worktree checked out at base_ref
+    isolation: Literal["worktree"] | None = None
+    base_ref: str | None = None
+    # Sent with the prompt over stdin; kept in the blob store until the run
+    attachments: list[Attachment] = []
 
 
 @router.post("")
@@ -35,6 +81,13 @@ async def create_session(req: CreateSessionRequest):
     if not ws:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
+    attachments_ref = None
+    if req.attachments:
+        blocks = [a.to_content_block() for a in req.attachments]
+        attachments_ref, _ = await asyncio.to_thread(
+            get_blob_store().put, json.dumps(blocks).encode()
+        )
+
     session_id = await repository.create_session(
         workspace_id=req.workspace_id,
         prompt=req.prompt,
@@ -42,11 +95,100 @@ async def create_session(req: CreateSessionRequest):
         agent=req.agent,
         model=req.model,
         workflow_id=req.workflow_id,
+        timeout_s=req.timeout_s,
+        idle_timeout_s=req.idle_timeout_s,
+        isolation=req.isolation,
+        base_ref=req.base_ref,
+        attachments_ref=attachments_ref,
     )
 
+    workflow = await repository.get_workflow(req.workflow_id) if req.workflow_id else None
+    if req.isolation == ISOLATION_WORKTREE:
+        asyncio.create_task(worktree_pool.prewarm(ws["path"]))
+    # Start booting a CLI now so it is ready by the time /stream connects.
+    # Capped runs spawn their own CLI under the limits, so don't warm one
+    elif warm_pool.enabled and _resource_limits(ws, workflow).is_empty():
+        warm_pool.prewarm(
+            CliRunner(
+                session_id=session_id,
+                workspace_path=ws["path"],
+                config_dir=ws["config_dir"],
+                prompt=req.prompt,
+                agent=req.agent,
+                model=req.model,
+                partial_messages=settings.cli_partial_messages,
+            ).spawn_spec()
+        )
+
     return {"session_id": session_id}
 
 
+class ContinueSessionRequest(BaseModel):
+    prompt: str
+    # Branch off a new CLI session so several continuations can run in parallel
+    fork: bool = False
+    model: str | None = None
+    timeout_s: float | None = None
+    idle_timeout_s: float | None = None
+
+
+@router.post("/{session_id}/continue")
+async def continue_session(session_id: str, req: ContinueSessionRequest):
+    """Create a follow-up session that resumes this session's CLI conversation."""
+    parent = await repository.get_session(session_id)
+    if not parent:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if parent["status"] in ("running", "pending"):
+        raise HTTPException(status_code=409, detail="Session is still running")
+
+    if not parent.get("cli_session_id"):
+        raise HTTPException(status_code=409, detail="Session has no CLI conversation to resume")
+
+    # Check-and-create must not interleave with another continuation
+    async with _continue_lock:
+        if not req.fork:
+            # Two runs appending to one CLI conversation corrupt it; forks are safe
+            children = await repository.get_child_sessions(session_id)
+            if any(
+                not c["fork_session"] and c["status"] in ("running", "pending") for c in children
+            ):
+                raise HTTPException(
+                    status_code=409,
+                    detail="A continuation of this session is still running; use fork",
+                )
+
+        child_id = await repository.create_session(
+            workspace_id=parent["workspace_id"],
+            prompt=req.prompt,
+            agent=parent.get("agent"),
+            model=req.model or parent.get("model"),
+            workflow_id=parent.get("workflow_id"),
+            timeout_s=req.timeout_s,
+            idle_timeout_s=req.idle_timeout_s,
+            parent_session_id=session_id,
+            resume_cli_session_id=parent["cli_session_id"],
+            fork_session=req.fork,
+            # The CLI looks conversations up by cwd: run in the parent's
+            # worktree, starting from the changes it saved on its branch
+            isolation=parent.get("isolation"),
+            base_ref=parent.get("worktree_branch") or parent.get("base_ref"),
+            worktree_path=parent.get("worktree_path"),
+        )
+    return {"session_id": child_id, "parent_session_id": session_id}
+
+
+@router.get("/{session_id}/children")
+async def get_session_children(session_id: str):
+    """Sessions continued or forked from this one."""
+    session = await repository.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    children = await repository.get_child_sessions(session_id)
+    return {"sessions": children}
+
+
 @router.get("/history")
 async def session_history(
     workspace_id: str | None = None,
@@ -81,9 +223,48 @@ async def get_session_events(session_id: str):
     return {"session": session, "events": events}
 
 
-@router.get("/{session_id}/stream")
-async def stream_session(session_id: str):
-    """SSE endpoint that streams AG-UI events for a session."""
+def _resource_limits(ws: dict, workflow: dict | None) -> ResourceLimits:
+    return ResourceLimits.merged(
+        settings.run_resource_limits,
+        ws.get("tenant_resource_limits"),
+        workflow.get("resource_limits") if workflow else None,
+    )
+
+
+def _build_runner(
+    session: dict,
+    ws: dict,
+    partial: bool | None,
+    workflow: dict | None = None,
+    attachments: list[dict] | None = None,
+) -> CliRunner:
+    return CliRunner(
+        session_id=session["id"],
+        workspace_path=ws["path"],
+        config_dir=ws["config_dir"],
+        prompt=session["prompt"],
+        skill=session.get("skill"),
+        agent=session.get("agent"),
+        model=session.get("model"),
+        partial_messages=settings.cli_partial_messages if partial is None else partial,
+        timeout_s=session.get("timeout_s"),
+        idle_timeout_s=session.get("idle_timeout_s"),
+        resume_cli_session_id=session.get("resume_cli_session_id"),
+        fork_session=bool(session.get("fork_session")),
+        resource_limits=_resource_limits(ws, workflow),
+        isolation=session.get("isolation"),
+        base_ref=session.get("base_ref"),
+        attachments=attachments,
+        worktree_path=session.get("worktree_path"),
+    )
+
+
+async def _start_run(session_id: str, partial: bool | None) -> RunHandle:
+    """Return the session's run, starting it if it has not started yet."""
+    handle = run_manager.get(session_id)
+    if handle:
+        return handle
+
     session = await repository.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -95,81 +276,83 @@ async def stream_session(session_id: str):
     if not ws:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
-    runner = CliRunner(
-        session_id=session_id,
-        workspace_path=ws["path"],
-        config_dir=ws["config_dir"],
-        prompt=session["prompt"],
-        skill=session.get("skill"),
-        agent=session.get("agent"),
-        model=session.get("model"),
-    )
-    _active_runners[session_id] = runner
+    workflow = None
+    if session.get("workflow_id"):
+        workflow = await repository.get_workflow(session["workflow_id"])
+
+    attachments = None
+    if session.get("attachments_ref"):
+        try:
+            raw = await asyncio.to_thread(get_blob_store().get, session["attachments_ref"])
+        except FileNotFoundError as e:
+            raise HTTPException(
+                status_code=410, detail="Session attachments no longer stored"
+            ) from e
+        attachments = json.loads(raw)
+
+    ticket = RunTicket(session_id=session_id, tenant_id=ws["tenant_id"], workspace_id=ws["id"])
+    runner = _build_runner(session, ws, partial, workflow, attachments)
+    return run_manager.start(runner, ticket)
+
+
+@router.post("/{session_id}/start")
+async def start_session(session_id: str, partial: bool | None = None):
+    """Start a session's run without attaching a stream (headless clients)."""
+    handle = await _start_run(session_id, partial)
+    return {"session_id": session_id, "last_seq": handle.last_seq}
+
+
+@router.get("/{session_id}/stream")
+async def stream_session(
+    session_id: str,
+    partial: bool | None = None,
+    batch: bool = False,
+    last_event_id: int | None = None,
+    last_event_id_header: int | None = Header(None, alias="Last-Event-ID"),
+):
+    """SSE endpoint that streams AG-UI events for a session.
+
+    The run executes server-side: the first stream (or POST /start) starts
+    it, and disconnecting does not stop it. Any number of streams can attach;
+    each frame carries its seq as the SSE id, so a reconnect with
+    Last-Event-ID (or ?last_event_id=) resumes right after it.
+
+    partial=true runs the CLI with partial messages for token-level streaming;
+    defaults to settings.cli_partial_messages. Only applies when this request
+    starts the run.
+
+    batch=true coalesces bursts into `Batch` frames whose data is a JSON array
+    of events (see settings.sse_batch_window_ms / sse_batch_max_events).
+    Terminal events flush immediately.
 
-    monitor = MonitorProcessor(session_id)
+    When concurrency caps are reached the run waits in the scheduler queue
+    and `queue_position` Custom events are streamed until it starts.
+    """
+    handle = await _start_run(session_id, partial)
+    after = last_event_id if last_event_id is not None else last_event_id_header
+    if after is None:
+        after = -1
 
     async def event_generator():
-        start_time = time.monotonic()
-        event_buffer: list[tuple[str, int, str, str]] = []
-        seq = 0
         try:
-            async for event in runner.run():
-                data = event.model_dump_json(exclude_none=True)
-                yield {"event": event.type.value, "data": data}
-
-                # Buffer event for persistence
-                event_buffer.append((session_id, seq, event.type.value, data))
-                seq += 1
-
-                # Forward al monitor para construir arbol de ejecucion
-                asyncio.create_task(monitor.process_event(event))
-
-                # Update DB on finish
-                if event.type in (AgUiEventType.RUN_FINISHED, AgUiEventType.RUN_ERROR):
-                    elapsed_ms = int((time.monotonic() - start_time) * 1000)
-                    status = (
-                        "completed" if event.type == AgUiEventType.RUN_FINISHED else "error"
-                    )
-                    await repository.update_session_finished(
-                        session_id=session_id,
-                        status=status,
-                        model=event.model,
-                        cost_usd=event.cost_usd,
-                        input_tokens=event.input_tokens,
-                        output_tokens=event.output_tokens,
-                        num_turns=event.num_turns,
-                        duration_ms=event.duration_ms or elapsed_ms,
-                        cli_session_id=event.cli_session_id,
-                    )
+            if batch:
+                async for group in coalesce_events(
+                    handle.subscribe(after),
+                    window_s=settings.sse_batch_window_ms / 1000,
+                    max_events=settings.sse_batch_max_events,
+                ):
+                    yield {
+                        "event": BATCH_EVENT,
+                        "id": str(group[-1].seq),
+                        "data": "[" + ",".join(e.data for e in group) + "]",
+                    }
+            else:
+                async for entry in handle.subscribe(after):
+                    yield {"event": entry.type.value, "id": str(entry.seq), "data": entry.data}
         except asyncio.CancelledError:
-            logger.info("SSE connection cancelled for session %s", session_id)
-            await runner.cancel()
-        finally:
-            # Persist buffered events
-            if event_buffer:
-                try:
-                    await repository.insert_session_events_batch(event_buffer)
-                except Exception:
-                    logger.exception("Failed to persist events for session %s", session_id)
-
-            # Persist diff capture
-            if runner.diff_capture and (
-                runner.diff_capture.diff_stat or runner.diff_capture.diff_content
-            ):
-                try:
-                    dc = runner.diff_capture
-                    await repository.insert_session_diff(
-                        session_id=session_id,
-                        diff_stat=dc.diff_stat,
-                        diff_content=dc.diff_content,
-                        files_changed=dc.files_changed,
-                        insertions=dc.insertions,
-                        deletions=dc.deletions,
-                    )
-                except Exception:
-                    logger.exception("Failed to persist diff for session %s", session_id)
-
-            _active_runners.pop(session_id, None)
+            # The run keeps going; a reconnect resumes from Last-Event-ID
+            logger.info("SSE subscriber detached from session %s", session_id)
+            raise
 
     return EventSourceResponse(event_generator())
 
@@ -177,20 +360,92 @@ async def stream_session(session_id: str):
 @router.post("/{session_id}/cancel")
 async def cancel_session(session_id: str):
     """Cancel a running session."""
-    runner = _active_runners.get(session_id)
-    if not runner:
+    if not await run_manager.cancel(session_id):
         raise HTTPException(status_code=404, detail="No active runner for this session")
 
-    await runner.cancel()
     await repository.update_session_finished(session_id=session_id, status="cancelled")
     return {"status": "cancelled"}
 
 
+@router.get("/{session_id}/stderr")
+async def get_session_stderr(session_id: str):
+    """Debug: stderr tail of a live run."""
+    handle = run_manager.get(session_id)
+    if not handle or handle.done:
+        raise HTTPException(status_code=404, detail="No active runner for this session")
+
+    tail = handle.runner.stderr_tail
+    return {
+        "session_id": session_id,
+        "total_bytes": tail.total_bytes,
+        "lines": tail.line_count,
+        "tail": tail.text(),
+    }
+
+
 @router.get("/{session_id}/diff")
 async def get_session_diff(session_id: str):
-    """Get captured git diff for a session."""
+    """Get captured git diff for a session.
+
+    diff_content is a preview; truncated says the full diff is longer (fetch
+    it per file from /diff/files and /diff/file).
+    """
     diff = await repository.get_session_diff(session_id)
-    return {"has_diff": bool(diff), "diff": diff}
+    truncated = bool(
+        diff
+        and diff.get("diff_size")
+        and diff["diff_size"] > len((diff["diff_content"] or "").encode())
+    )
+    return {"has_diff": bool(diff), "diff": diff, "truncated": truncated}
+
+
+@router.get("/{session_id}/diff/files")
+async def list_session_diff_files(session_id: str):
+    """Per-file index of a session's diff (path, status, +/- counts, size)."""
+    files = await repository.get_session_diff_files(session_id)
+    return {
+        "files": [
+            {
+                "path": f["path"],
+                "old_path": f["old_path"],
+                "status": f["status"],
+                "insertions": f["insertions"],
+                "deletions": f["deletions"],
+                "binary": bool(f["binary"]),
+                "size_bytes": f["byte_length"],
+            }
+            for f in files
+        ]
+    }
+
+
+@router.get("/{session_id}/diff/file")
+async def get_session_diff_file(session_id: str, path: str):
+    """Stream one file's section of the full diff (headers and hunks)."""
+    ref = await repository.get_session_diff_file(session_id, path)
+    store = get_blob_store()
+    if not ref or not ref["diff_sha256"] or not store.exists(ref["diff_sha256"]):
+        raise HTTPException(status_code=404, detail="File not in session diff")
+
+    return StreamingResponse(
+        store.iter_range(ref["diff_sha256"], ref["byte_offset"], ref["byte_length"]),
+        media_type="text/x-diff; charset=utf-8",
+    )
+
+
+@router.get("/{session_id}/tool-results/{tool_call_id}")
+async def get_tool_result(session_id: str, tool_call_id: str):
+    """Stream the full (untruncated) output of a tool call."""
+    ref = await repository.get_tool_result_blob(session_id, tool_call_id)
+    store = get_blob_store()
+    if not ref or not store.exists(ref["blob_sha256"]):
+        raise HTTPException(status_code=404, detail="Tool result not found")
+
+    return StreamingResponse(
+        store.iter_blob(ref["blob_sha256"]),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Blob-Sha256": ref["blob_sha256"]},
+    )
 
 
 @router.get("")
@@ -2,9 +2,10 @@
 
 import logging
 import re
+from typing import Annotated
 
 from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from dcc.db import repository
 
@@ -12,6 +13,9 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/workflows", tags=["workflows"])
 
+# setrlimit rejects 0 and negatives inside the child's preexec_fn
+LimitValue = Annotated[int, Field(ge=1)]
+
 
 # --- Request models ---
 
@@ -25,6 +29,10 @@ class CreateWorkflowRequest(BaseModel):
     icon: str = "Workflow"
     parameters: list[dict] | None = None
     model: str | None = None
+    timeout_s: float | None = None
+    idle_timeout_s: float | None = None
+    # cpu_s, memory_mb, nofile, nproc
+    resource_limits: dict[str, LimitValue] | None = None
 
 
 class UpdateWorkflowRequest(BaseModel):
@@ -35,6 +43,9 @@ class UpdateWorkflowRequest(BaseModel):
     prompt_template: str | None = None
     parameters: list[dict] | None = None
     model: str | None = None
+    timeout_s: float | None = None
+    idle_timeout_s: float | None = None
+    resource_limits: dict[str, LimitValue] | None = None
 
 
 class LaunchWorkflowRequest(BaseModel):
@@ -85,6 +96,9 @@ async def create_workflow(req: CreateWorkflowRequest):
         icon=req.icon,
         parameters=req.parameters,
         model=req.model,
+        timeout_s=req.timeout_s,
+        idle_timeout_s=req.idle_timeout_s,
+        resource_limits=req.resource_limits,
     )
     return {"workflow_id": workflow_id}
 
@@ -182,6 +196,8 @@ async def launch_workflow(workflow_id: str, req: LaunchWorkflowRequest):
         prompt=prompt,
         model=model,
         workflow_id=workflow_id,
+        timeout_s=wf.get("timeout_s"),
+        idle_timeout_s=wf.get("idle_timeout_s"),
     )
 
     # Incrementar uso
@@ -1,7 +1,7 @@
 import uuid
 
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from dcc.db import repository
 from dcc.db.seed import sync_agents_for_workspace
@@ -23,6 +23,15 @@ class CreateTenantRequest(BaseModel):
     claude_alias: str
 
 
+class TenantLimitsRequest(BaseModel):
+    """Per-run resource caps for the tenant's sessions; omitted keys are unlimited."""
+
+    cpu_s: int | None = Field(None, ge=1)
+    memory_mb: int | None = Field(None, ge=1)
+    nofile: int | None = Field(None, ge=1)
+    nproc: int | None = Field(None, ge=1)
+
+
 @router.get("")
 async def list_workspaces():
     """List all workspaces with tenant info and agent/skill counts."""
@@ -102,6 +111,15 @@ async def create_tenant(req: CreateTenantRequest):
     return {"id": tenant_id}
 
 
+@router.put("/tenants/{tenant_id}/limits")
+async def set_tenant_limits(tenant_id: str, req: TenantLimitsRequest):
+    """Set per-run resource limits for a tenant."""
+    limits = req.model_dump(exclude_none=True)
+    if not await repository.update_tenant_limits(tenant_id, limits or None):
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    return {"id": tenant_id, "resource_limits": limits}
+
+
 @router.delete("/tenants/{tenant_id}")
 async def delete_tenant(tenant_id: str):
     """Delete a tenant."""
@@ -6,13 +6,24 @@ from fastapi.middleware.cors import CORSMiddleware
 from dcc.config import settings
 from dcc.db.database import close_db, init_db
 from dcc.db.seed import seed_defaults
+from dcc.engine.blob_gc import blob_collector
+from dcc.engine.gh_client import gh_client
+from dcc.engine.git_helper import git_helpers
+from dcc.engine.run_manager import run_manager
+from dcc.engine.warm_pool import warm_pool
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
     await seed_defaults()
+    blob_collector.start()
     yield
+    await blob_collector.close()
+    await run_manager.close()
+    await warm_pool.close()
+    await git_helpers.close()
+    await gh_client.close()
     await close_db()
 
 
@@ -32,6 +43,7 @@ from dcc.api.routes.analytics import router as analytics_router  # noqa: E402
 from dcc.api.routes.config import router as config_router  # noqa: E402
 from dcc.api.routes.github import router as github_router  # noqa: E402
 from dcc.api.routes.health import router as health_router  # noqa: E402
+from dcc.api.routes.runs import router as runs_router  # noqa: E402
 from dcc.api.routes.workflows import router as workflows_router  # noqa: E402
 from dcc.api.routes.sessions import router as sessions_router  # noqa: E402
 from dcc.api.routes.workspaces import router as workspaces_router  # noqa: E402
@@ -44,3 +56,4 @@ app.include_router(analytics_router)
 app.include_router(github_router)
 app.include_router(workflows_router)
 app.include_router(agents_router)
+app.include_router(runs_router)
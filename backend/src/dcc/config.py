@@ -5,8 +5,73 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     db_path: str = "dcc.db"
+    # Compressed, content-addressed store for full tool results
+    blob_dir: str = "blobs"
+    # Blob GC every blob_gc_interval_s (0 = off): blobs no session row refers
+    # to are deleted once older than blob_gc_grace_s (runs store blobs before
+    # their rows). Over blob_max_bytes (0 = no cap) the oldest go regardless
+    blob_gc_interval_s: float = 3600
+    blob_gc_grace_s: float = 3600
+    blob_max_bytes: int = 0
     cors_origins: list[str] = ["http://localhost:5173"]
     claude_bin: str = "claude"
+    # GitHub REST API base (GitHub Enterprise: https://<host>/api/v3); the
+    # token comes from `gh auth token`
+    github_api_url: str = "https://api.github.com"
+    # Longest stdout NDJSON line accepted from the CLI; longer lines are skipped
+    cli_max_line_bytes: int = 32 * 1024 * 1024
+    # Pre-spawned CLI processes per (config_dir, workspace, model, agent); 0 = off
+    warm_pool_size: int = 0
+    warm_pool_idle_ttl_s: float = 300
+    # CLI stderr kept per run (ring buffer); stream new lines as Custom events
+    cli_stderr_tail_bytes: int = 64 * 1024
+    cli_stderr_events: bool = False
+    # /proc sampling of each run's process tree for resource accounting; 0 = off
+    resource_sample_interval_s: float = 1.0
+    # Default per-run caps (cpu_s, memory_mb, nofile, nproc), overridable per
+    # tenant and workflow. cgroup_root: delegated, writable cgroup v2 directory
+    # under which each run gets its own group ("" = rlimits only)
+    run_resource_limits: dict[str, int] = {}
+    cgroup_root: str = ""
+    # Idle seconds before a workspace's `git cat-file --batch` helper exits
+    git_helper_idle_s: float = 60
+    # Watch the workspace during runs (inotify, else polling): stream Custom
+    # `files_touched` events and limit the final diff to the touched paths
+    run_file_watch: bool = False
+    file_watch_debounce_ms: int = 200
+    file_watch_poll_s: float = 1.0
+    # Non-git workspaces: diff from pre/post-run file manifests. Text files up
+    # to manifest_max_file_bytes get a compressed copy for the diff, up to
+    # manifest_copy_max_bytes per snapshot; copies unused for
+    # manifest_copy_retention_s are deleted. Workspaces with more than
+    # manifest_max_files files are skipped (0 = off)
+    manifest_max_files: int = 20_000
+    manifest_max_file_bytes: int = 1024 * 1024
+    manifest_copy_max_bytes: int = 64 * 1024 * 1024
+    manifest_copy_retention_s: float = 7 * 24 * 3600
+    # Git worktrees for isolation="worktree" runs: kept under worktree_dir,
+    # with up to worktree_pool_size idle (pre-warmed) ones per workspace
+    worktree_dir: str = "worktrees"
+    worktree_pool_size: int = 2
+    # Run watchdog budgets in seconds (overridable per session/workflow); 0 = off.
+    # Idle = no stdout, stderr or tree CPU; kept well above the CLI's longest
+    # tool call (Bash: 10 min)
+    run_timeout_s: float = 1800
+    run_idle_timeout_s: float = 1200
+    # Token-level streaming via --include-partial-messages (overridable per stream)
+    cli_partial_messages: bool = False
+    # Per-session event log: in-memory tail, DB flush chunk, and how long a
+    # finished run stays attachable for reconnects
+    run_event_buffer: int = 4096
+    run_event_flush_size: int = 256
+    run_retain_s: float = 300
+    # SSE micro-batching for /stream?batch=true
+    sse_batch_window_ms: int = 10
+    sse_batch_max_events: int = 64
+    # Concurrent CLI runs; extra runs wait in a FIFO queue. 0 = unlimited
+    max_concurrent_runs: int = 8
+    max_runs_per_tenant: int = 0
+    max_runs_per_workspace: int = 0
 
     # Tenant defaults (can be overridden per tenant in DB)
     default_config_dir: str = str(Path.home() / ".claude-personal")
@@ -17,9 +17,13 @@ async def get_db() -> aiosqlite.Connection:
 
 async def init_db():
     db = await get_db()
-    from dcc.db.models import SCHEMA
+    from dcc.db.models import COLUMN_MIGRATIONS, SCHEMA
 
     await db.executescript(SCHEMA)
+    for table, column, ddl in COLUMN_MIGRATIONS:
+        cursor = await db.execute(f"PRAGMA table_info({table})")
+        if column not in {row["name"] for row in await cursor.fetchall()}:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
     await db.commit()
 
 
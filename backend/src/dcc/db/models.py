@@ -4,6 +4,7 @@ CREATE TABLE IF NOT EXISTS tenants (
     name TEXT NOT NULL,
     config_dir TEXT NOT NULL,
     claude_alias TEXT NOT NULL,
+    resource_limits TEXT,
     is_active INTEGER NOT NULL DEFAULT 1,
     created_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
@@ -37,6 +38,22 @@ CREATE TABLE IF NOT EXISTS sessions (
     num_turns INTEGER,
     duration_ms INTEGER,
     workflow_id TEXT REFERENCES workflows(id),
+    timeout_s REAL,
+    idle_timeout_s REAL,
+    parent_session_id TEXT REFERENCES sessions(id),
+    resume_cli_session_id TEXT,
+    fork_session INTEGER NOT NULL DEFAULT 0,
+    peak_rss_bytes INTEGER,
+    cpu_user_s REAL,
+    cpu_sys_s REAL,
+    io_read_bytes INTEGER,
+    io_write_bytes INTEGER,
+    max_children INTEGER,
+    isolation TEXT,
+    base_ref TEXT,
+    worktree_branch TEXT,
+    worktree_path TEXT,
+    attachments_ref TEXT,
     started_at TEXT NOT NULL DEFAULT (datetime('now')),
     finished_at TEXT
 );
@@ -70,10 +87,35 @@ CREATE TABLE IF NOT EXISTS session_diffs (
     files_changed INTEGER DEFAULT 0,
     insertions INTEGER DEFAULT 0,
     deletions INTEGER DEFAULT 0,
+    diff_sha256 TEXT,
+    diff_size INTEGER,
     captured_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
 CREATE INDEX IF NOT EXISTS idx_session_diffs_session ON session_diffs(session_id);
 
+CREATE TABLE IF NOT EXISTS session_diff_files (
+    session_id TEXT NOT NULL REFERENCES sessions(id),
+    idx INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    old_path TEXT,
+    status TEXT NOT NULL,
+    insertions INTEGER NOT NULL DEFAULT 0,
+    deletions INTEGER NOT NULL DEFAULT 0,
+    binary INTEGER NOT NULL DEFAULT 0,
+    byte_offset INTEGER NOT NULL,
+    byte_length INTEGER NOT NULL,
+    PRIMARY KEY (session_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS session_tool_results (
+    session_id TEXT NOT NULL REFERENCES sessions(id),
+    tool_call_id TEXT NOT NULL,
+    blob_sha256 TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT (datetime('now')),
+    PRIMARY KEY (session_id, tool_call_id)
+);
+
 CREATE TABLE IF NOT EXISTS workflows (
     id TEXT PRIMARY KEY,
     workspace_id TEXT NOT NULL REFERENCES workspaces(id),
@@ -84,6 +126,9 @@ CREATE TABLE IF NOT EXISTS workflows (
     prompt_template TEXT NOT NULL,
     parameters TEXT DEFAULT '[]',
     model TEXT,
+    timeout_s REAL,
+    idle_timeout_s REAL,
+    resource_limits TEXT,
     is_builtin INTEGER NOT NULL DEFAULT 0,
     usage_count INTEGER NOT NULL DEFAULT 0,
     last_used_at TEXT,
@@ -132,3 +177,30 @@ CREATE TABLE IF NOT EXISTS agent_registry (
 );
 CREATE INDEX IF NOT EXISTS idx_agent_registry_workspace ON agent_registry(workspace_id);
 """
+
+# Columns added after the first release. init_db adds the ones missing from an
+# existing database (CREATE TABLE IF NOT EXISTS leaves old tables untouched).
+COLUMN_MIGRATIONS: list[tuple[str, str, str]] = [
+    ("sessions", "timeout_s", "REAL"),
+    ("sessions", "idle_timeout_s", "REAL"),
+    ("workflows", "timeout_s", "REAL"),
+    ("workflows", "idle_timeout_s", "REAL"),
+    ("sessions", "parent_session_id", "TEXT REFERENCES sessions(id)"),
+    ("sessions", "resume_cli_session_id", "TEXT"),
+    ("sessions", "fork_session", "INTEGER NOT NULL DEFAULT 0"),
+    ("sessions", "peak_rss_bytes", "INTEGER"),
+    ("sessions", "cpu_user_s", "REAL"),
+    ("sessions", "cpu_sys_s", "REAL"),
+    ("sessions", "io_read_bytes", "INTEGER"),
+    ("sessions", "io_write_bytes", "INTEGER"),
+    ("sessions", "max_children", "INTEGER"),
+    ("tenants", "resource_limits", "TEXT"),
+    ("workflows", "resource_limits", "TEXT"),
+    ("sessions", "isolation", "TEXT"),
+    ("sessions", "base_ref", "TEXT"),
+    ("sessions", "worktree_branch", "TEXT"),
+    ("sessions", "attachments_ref", "TEXT"),
+    ("session_diffs", "diff_sha256", "TEXT"),
+    ("session_diffs", "diff_size", "INTEGER"),
+    ("sessions", "worktree_path", "TEXT"),
+]
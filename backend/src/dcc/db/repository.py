@@ -31,6 +31,17 @@ async def upsert_tenant(tenant_id: str, name: str, config_dir: str, claude_alias
     await db.commit()
 
 
+async def update_tenant_limits(tenant_id: str, limits: dict | None) -> bool:
+    """Set (or clear with None) a tenant's per-run resource limits."""
+    db = await get_db()
+    cursor = await db.execute(
+        "UPDATE tenants SET resource_limits = ? WHERE id = ?",
+        (json.dumps(limits) if limits else None, tenant_id),
+    )
+    await db.commit()
+    return cursor.rowcount > 0
+
+
 # --- Workspaces ---
 
 
@@ -48,7 +59,8 @@ async def get_workspaces() -> list[dict]:
 async def get_workspace(workspace_id: str) -> dict | None:
     db = await get_db()
     cursor = await db.execute(
-        """SELECT w.*, t.name as tenant_name, t.claude_alias, t.config_dir
+        """SELECT w.*, t.name as tenant_name, t.claude_alias, t.config_dir,
+                  t.resource_limits as tenant_resource_limits
            FROM workspaces w JOIN tenants t ON w.tenant_id = t.id
            WHERE w.id = ?""",
         (workspace_id,),
@@ -128,13 +140,42 @@ async def create_session(
     agent: str | None = None,
     model: str | None = None,
     workflow_id: str | None = None,
+    timeout_s: float | None = None,
+    idle_timeout_s: float | None = None,
+    parent_session_id: str | None = None,
+    resume_cli_session_id: str | None = None,
+    fork_session: bool = False,
+    isolation: str | None = None,
+    base_ref: str | None = None,
+    attachments_ref: str | None = None,
+    worktree_path: str | None = None,
 ) -> str:
     session_id = str(uuid.uuid4())
     db = await get_db()
     await db.execute(
-        """INSERT INTO sessions (id, workspace_id, prompt, skill, agent, model, workflow_id, status)
-           VALUES (?, ?, ?, ?, ?, ?, ?, 'running')""",
-        (session_id, workspace_id, prompt, skill, agent, model, workflow_id),
+        """INSERT INTO sessions
+             (id, workspace_id, prompt, skill, agent, model, workflow_id,
+              timeout_s, idle_timeout_s, parent_session_id, resume_cli_session_id,
+              fork_session, isolation, base_ref, attachments_ref, worktree_path, status)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'running')""",
+        (
+            session_id,
+            workspace_id,
+            prompt,
+            skill,
+            agent,
+            model,
+            workflow_id,
+            timeout_s,
+            idle_timeout_s,
+            parent_session_id,
+            resume_cli_session_id,
+            int(fork_session),
+            isolation,
+            base_ref,
+            attachments_ref,
+            worktree_path,
+        ),
     )
     await db.commit()
     return session_id
@@ -173,6 +214,45 @@ async def update_session_finished(
     await db.commit()
 
 
+async def update_session_resources(
+    session_id: str,
+    peak_rss_bytes: int,
+    cpu_user_s: float,
+    cpu_sys_s: float,
+    io_read_bytes: int,
+    io_write_bytes: int,
+    max_children: int,
+) -> None:
+    db = await get_db()
+    await db.execute(
+        """UPDATE sessions SET
+             peak_rss_bytes=?, cpu_user_s=?, cpu_sys_s=?,
+             io_read_bytes=?, io_write_bytes=?, max_children=?
+           WHERE id=?""",
+        (
+            peak_rss_bytes,
+            cpu_user_s,
+            cpu_sys_s,
+            io_read_bytes,
+            io_write_bytes,
+            max_children,
+            session_id,
+        ),
+    )
+    await db.commit()
+
+
+async def update_session_worktree(
+    session_id: str, worktree_branch: str | None, worktree_path: str | None = None
+) -> None:
+    db = await get_db()
+    await db.execute(
+        "UPDATE sessions SET worktree_branch=?, worktree_path=? WHERE id=?",
+        (worktree_branch, worktree_path, session_id),
+    )
+    await db.commit()
+
+
 async def get_session(session_id: str) -> dict | None:
     db = await get_db()
     cursor = await db.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
@@ -180,6 +260,17 @@ async def get_session(session_id: str) -> dict | None:
     return dict(row) if row else None
 
 
+async def get_child_sessions(parent_session_id: str) -> list[dict]:
+    """Continuations and forks started from a session, oldest first."""
+    db = await get_db()
+    cursor = await db.execute(
+        "SELECT * FROM sessions WHERE parent_session_id = ? ORDER BY started_at, rowid",
+        (parent_session_id,),
+    )
+    rows = await cursor.fetchall()
+    return [dict(r) for r in rows]
+
+
 async def get_sessions(workspace_id: str | None = None, limit: int = 50) -> list[dict]:
     db = await get_db()
     if workspace_id:
@@ -212,12 +303,18 @@ async def insert_session_events_batch(
     await db.commit()
 
 
-async def get_session_events(session_id: str) -> list[dict]:
+async def get_session_events(session_id: str, after_seq: int | None = None) -> list[dict]:
     db = await get_db()
-    cursor = await db.execute(
-        "SELECT * FROM session_events WHERE session_id = ? ORDER BY seq",
-        (session_id,),
-    )
+    if after_seq is None:
+        cursor = await db.execute(
+            "SELECT * FROM session_events WHERE session_id = ? ORDER BY seq",
+            (session_id,),
+        )
+    else:
+        cursor = await db.execute(
+            "SELECT * FROM session_events WHERE session_id = ? AND seq > ? ORDER BY seq",
+            (session_id, after_seq),
+        )
     rows = await cursor.fetchall()
     return [dict(r) for r in rows]
 
@@ -281,14 +378,53 @@ async def insert_session_diff(
     files_changed: int = 0,
     insertions: int = 0,
     deletions: int = 0,
+    diff_sha256: str | None = None,
+    diff_size: int | None = None,
+    files: list[dict] | None = None,
 ) -> None:
+    """Store a session's diff summary. diff_sha256 names the full diff in the
+    blob store; files (path, old_path, status, insertions, deletions, binary,
+    offset, length) index it per file."""
     db = await get_db()
     await db.execute(
         """INSERT OR REPLACE INTO session_diffs
-             (session_id, diff_stat, diff_content, files_changed, insertions, deletions)
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (session_id, diff_stat, diff_content, files_changed, insertions, deletions),
+             (session_id, diff_stat, diff_content, files_changed, insertions, deletions,
+              diff_sha256, diff_size)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        (
+            session_id,
+            diff_stat,
+            diff_content,
+            files_changed,
+            insertions,
+            deletions,
+            diff_sha256,
+            diff_size,
+        ),
     )
+    await db.execute("DELETE FROM session_diff_files WHERE session_id = ?", (session_id,))
+    if files:
+        await db.executemany(
+            """INSERT INTO session_diff_files
+                 (session_id, idx, path, old_path, status, insertions, deletions, binary,
+                  byte_offset, byte_length)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [
+                (
+                    session_id,
+                    i,
+                    f["path"],
+                    f.get("old_path"),
+                    f.get("status", "M"),
+                    f.get("insertions", 0),
+                    f.get("deletions", 0),
+                    int(f.get("binary", False)),
+                    f["offset"],
+                    f["length"],
+                )
+                for i, f in enumerate(files)
+            ],
+        )
     await db.commit()
 
 
@@ -301,6 +437,64 @@ async def get_session_diff(session_id: str) -> dict | None:
     return dict(row) if row else None
 
 
+async def get_session_diff_files(session_id: str) -> list[dict]:
+    db = await get_db()
+    cursor = await db.execute(
+        "SELECT * FROM session_diff_files WHERE session_id = ? ORDER BY idx", (session_id,)
+    )
+    return [dict(r) for r in await cursor.fetchall()]
+
+
+async def get_session_diff_file(session_id: str, path: str) -> dict | None:
+    """Index row for one file of a session's diff, joined with its blob ref."""
+    db = await get_db()
+    cursor = await db.execute(
+        """SELECT f.*, d.diff_sha256 FROM session_diff_files f
+           JOIN session_diffs d ON d.session_id = f.session_id
+           WHERE f.session_id = ? AND f.path = ?""",
+        (session_id, path),
+    )
+    row = await cursor.fetchone()
+    return dict(row) if row else None
+
+
+# --- Session Tool Results ---
+
+
+async def insert_tool_result_blob(
+    session_id: str, tool_call_id: str, blob_sha256: str, size_bytes: int
+) -> None:
+    db = await get_db()
+    await db.execute(
+        """INSERT OR REPLACE INTO session_tool_results
+             (session_id, tool_call_id, blob_sha256, size_bytes)
+           VALUES (?, ?, ?, ?)""",
+        (session_id, tool_call_id, blob_sha256, size_bytes),
+    )
+    await db.commit()
+
+
+async def get_blob_refs() -> set[str]:
+    """Digests of every blob a row still points to (tool results, diffs, attachments)."""
+    db = await get_db()
+    cursor = await db.execute(
+        """SELECT blob_sha256 FROM session_tool_results
+           UNION SELECT diff_sha256 FROM session_diffs WHERE diff_sha256 IS NOT NULL
+           UNION SELECT attachments_ref FROM sessions WHERE attachments_ref IS NOT NULL"""
+    )
+    return {row[0] for row in await cursor.fetchall()}
+
+
+async def get_tool_result_blob(session_id: str, tool_call_id: str) -> dict | None:
+    db = await get_db()
+    cursor = await db.execute(
+        "SELECT * FROM session_tool_results WHERE session_id = ? AND tool_call_id = ?",
+        (session_id, tool_call_id),
+    )
+    row = await cursor.fetchone()
+    return dict(row) if row else None
+
+
 # --- Delete ---
 
 
@@ -329,7 +523,8 @@ async def get_analytics_summary() -> dict:
              COUNT(*) as total_sessions,
              COALESCE(SUM(cost_usd), 0) as total_cost,
              COALESCE(SUM(input_tokens), 0) as total_input_tokens,
-             COALESCE(SUM(output_tokens), 0) as total_output_tokens
+             COALESCE(SUM(output_tokens), 0) as total_output_tokens,
+             ROUND(COALESCE(SUM(cpu_user_s + cpu_sys_s), 0), 2) as total_cpu_s
            FROM sessions"""
     )
     totals = dict(await cursor.fetchone())
@@ -364,7 +559,9 @@ async def get_cost_by_workspace() -> list[dict]:
                   COUNT(*) as session_count,
                   COALESCE(SUM(s.cost_usd), 0) as total_cost,
                   COALESCE(SUM(s.input_tokens), 0) as total_input_tokens,
-                  COALESCE(SUM(s.output_tokens), 0) as total_output_tokens
+                  COALESCE(SUM(s.output_tokens), 0) as total_output_tokens,
+                  ROUND(COALESCE(SUM(s.cpu_user_s + s.cpu_sys_s), 0), 2) as total_cpu_s,
+                  MAX(s.peak_rss_bytes) as max_peak_rss_bytes
            FROM sessions s
            JOIN workspaces w ON s.workspace_id = w.id
            JOIN tenants t ON w.tenant_id = t.id
@@ -415,6 +612,29 @@ async def get_top_skills(limit: int = 10) -> list[dict]:
     return [dict(r) for r in await cursor.fetchall()]
 
 
+async def get_resource_usage(days: int = 30) -> list[dict]:
+    """Daily host resource usage of CLI runs, for capacity planning."""
+    db = await get_db()
+    cursor = await db.execute(
+        """SELECT DATE(started_at) as date,
+                  COUNT(peak_rss_bytes) as sessions,
+                  ROUND(COALESCE(SUM(cpu_user_s), 0), 2) as cpu_user_s,
+                  ROUND(COALESCE(SUM(cpu_sys_s), 0), 2) as cpu_sys_s,
+                  MAX(peak_rss_bytes) as max_peak_rss_bytes,
+                  ROUND(AVG(peak_rss_bytes)) as avg_peak_rss_bytes,
+                  COALESCE(SUM(io_read_bytes), 0) as io_read_bytes,
+                  COALESCE(SUM(io_write_bytes), 0) as io_write_bytes,
+                  MAX(max_children) as max_children
+           FROM sessions
+           WHERE started_at >= datetime('now', ? || ' days')
+             AND peak_rss_bytes IS NOT NULL
+           GROUP BY DATE(started_at)
+           ORDER BY date""",
+        (f"-{days}",),
+    )
+    return [dict(r) for r in await cursor.fetchall()]
+
+
 async def get_token_efficiency() -> dict:
     db = await get_db()
     cursor = await db.execute(
@@ -455,6 +675,10 @@ def _parse_workflow(row: dict) -> dict:
         wf["parameters"] = json.loads(raw) if raw else []
     except (json.JSONDecodeError, TypeError):
         wf["parameters"] = []
+    try:
+        wf["resource_limits"] = json.loads(wf.get("resource_limits") or "null")
+    except (json.JSONDecodeError, TypeError):
+        wf["resource_limits"] = None
     wf["is_builtin"] = bool(wf.get("is_builtin", 0))
     return wf
 
@@ -469,13 +693,17 @@ async def create_workflow(
     parameters: list[dict] | None = None,
     model: str | None = None,
     is_builtin: bool = False,
+    timeout_s: float | None = None,
+    idle_timeout_s: float | None = None,
+    resource_limits: dict | None = None,
 ) -> str:
     workflow_id = str(uuid.uuid4())
     db = await get_db()
     await db.execute(
         """INSERT INTO workflows
-             (id, workspace_id, name, prompt_template, description, category, icon, parameters, model, is_builtin)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+             (id, workspace_id, name, prompt_template, description, category, icon, parameters, model, is_builtin,
+              timeout_s, idle_timeout_s, resource_limits)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
         (
             workflow_id,
             workspace_id,
@@ -487,6 +715,9 @@ async def create_workflow(
             json.dumps(parameters or []),
             model,
             int(is_builtin),
+            timeout_s,
+            idle_timeout_s,
+            json.dumps(resource_limits) if resource_limits else None,
         ),
     )
     await db.commit()
@@ -531,6 +762,9 @@ async def update_workflow(workflow_id: str, **kwargs: str | list | None) -> None
         if key == "parameters" and isinstance(value, list):
             sets.append("parameters = ?")
             params.append(json.dumps(value))
+        elif key == "resource_limits" and isinstance(value, dict):
+            sets.append("resource_limits = ?")
+            params.append(json.dumps(value) if value else None)
         elif value is not None:
             sets.append(f"{key} = ?")
             params.append(value)
@@ -762,7 +996,10 @@ async def get_agent_usage_stats(workspace_id: str | None = None) -> list[dict]:
                    COALESCE(SUM(s.cost_usd), 0) as total_cost,
                    ROUND(AVG(s.duration_ms)) as avg_duration_ms,
                    ROUND(100.0 * SUM(CASE WHEN s.status = 'completed' THEN 1 ELSE 0 END)
-                         / COUNT(*), 1) as success_rate
+                         / COUNT(*), 1) as success_rate,
+                   ROUND(COALESCE(SUM(s.cpu_user_s + s.cpu_sys_s), 0), 2) as total_cpu_s,
+                   ROUND(AVG(s.peak_rss_bytes)) as avg_peak_rss_bytes,
+                   MAX(s.peak_rss_bytes) as max_peak_rss_bytes
             FROM sessions s{where}
             GROUP BY s.agent
             ORDER BY sessions DESC""",
@@ -0,0 +1,53 @@
+"""Periodic garbage collection of the blob store.
+
+Tool results, session diffs and attachments are stored as blobs; once the
+rows pointing at them are gone (or never got written), the blobs are deleted
+after a grace period. settings.blob_max_bytes additionally caps the store.
+"""
+
+import asyncio
+import logging
+
+from dcc.config import settings
+from dcc.db import repository
+from dcc.engine.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+
+class BlobCollector:
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+
+    async def collect(self) -> tuple[int, int]:
+        """One pass now. Returns (blobs removed, bytes freed)."""
+        referenced = await repository.get_blob_refs()
+        removed, freed = await asyncio.to_thread(
+            get_blob_store().collect,
+            referenced,
+            settings.blob_gc_grace_s,
+            settings.blob_max_bytes,
+        )
+        if removed:
+            logger.info("Blob GC removed %d blobs (%d bytes)", removed, freed)
+        return removed, freed
+
+    def start(self) -> None:
+        if settings.blob_gc_interval_s > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.blob_gc_interval_s)
+            try:
+                await self.collect()
+            except Exception:
+                logger.exception("Blob GC failed")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+blob_collector = BlobCollector()
@@ -0,0 +1,161 @@
+"""Content-addressed, zlib-compressed blob store on local disk.
+
+Used for full tool results: events carry a bounded preview plus the blob's
+sha256, and the full content is streamed on demand. Identical content across
+sessions is stored once. Blobs no row refers to any more are removed by
+collect() (see blob_gc).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from dcc.config import settings
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK = 64 * 1024
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobStore:
+    def __init__(self, root: str | Path, level: int = 6):
+        self.root = Path(root)
+        self.level = level
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.z"
+
+    def put_chunks(self, chunks: Iterable[bytes]) -> tuple[str, int]:
+        """Store the concatenation of chunks. Returns (sha256 hex, size in bytes).
+
+        Hashes first so content that is already stored is never recompressed.
+        That takes two passes: pass a re-iterable (a list, or an object whose
+        __iter__ starts over) to avoid buffering; a one-shot iterator is
+        buffered. Blocking: call it from a thread in async code.
+        """
+        if iter(chunks) is chunks:
+            chunks = list(chunks)
+        h = hashlib.sha256()
+        size = 0
+        for chunk in chunks:
+            h.update(chunk)
+            size += len(chunk)
+        digest = h.hexdigest()
+
+        path = self._path(digest)
+        try:
+            # Stored again: counts as new for collect()'s grace period
+            os.utime(path)
+            return digest, size
+        except FileNotFoundError:
+            pass
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        comp = zlib.compressobj(self.level)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(comp.compress(chunk))
+                f.write(comp.flush())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return digest, size
+
+    def put(self, data: bytes) -> tuple[str, int]:
+        return self.put_chunks([data])
+
+    def exists(self, digest: str) -> bool:
+        return bool(_DIGEST_RE.match(digest)) and self._path(digest).exists()
+
+    def iter_blob(self, digest: str) -> Iterator[bytes]:
+        """Yield the decompressed content in chunks. Raises FileNotFoundError."""
+        if not _DIGEST_RE.match(digest):
+            raise FileNotFoundError(digest)
+        decomp = zlib.decompressobj()
+        with open(self._path(digest), "rb") as f:
+            while chunk := f.read(READ_CHUNK):
+                out = decomp.decompress(chunk)
+                if out:
+                    yield out
+        tail = decomp.flush()
+        if tail:
+            yield tail
+
+    def iter_range(self, digest: str, offset: int, length: int) -> Iterator[bytes]:
+        """Yield bytes [offset, offset + length) of the content, decompressing
+        only up to the end of the range. Raises FileNotFoundError."""
+        end = offset + length
+        pos = 0
+        blob = self.iter_blob(digest)
+        try:
+            for chunk in blob:
+                next_pos = pos + len(chunk)
+                if next_pos > offset:
+                    yield chunk[max(offset - pos, 0) : end - pos]
+                pos = next_pos
+                if pos >= end:
+                    break
+        finally:
+            blob.close()
+
+    def get(self, digest: str) -> bytes:
+        return b"".join(self.iter_blob(digest))
+
+    def collect(self, referenced: set[str], grace_s: float, max_bytes: int = 0) -> tuple[int, int]:
+        """Delete blobs not in referenced that were stored more than grace_s
+        ago (leftover temp files too). Then, if the rest is still over
+        max_bytes (0 = no cap), the least recently stored go, referenced or
+        not. Returns (blobs removed, bytes freed). Blocking.
+        """
+        cutoff = time.time() - grace_s
+        kept: list[tuple[float, int, Path]] = []
+        removed = freed = 0
+        for path in self.root.glob("??/*"):
+            try:
+                st = path.stat()
+                if st.st_mtime >= cutoff or path.stem in referenced:
+                    if path.suffix == ".z":
+                        kept.append((st.st_mtime, st.st_size, path))
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            removed += path.suffix == ".z"
+            freed += st.st_size
+
+        total = sum(size for _, size, _ in kept)
+        if max_bytes and total > max_bytes:
+            for _, size, path in sorted(kept):
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                removed += 1
+                freed += size
+                total -= size
+                if total <= max_bytes:
+                    break
+        return removed, freed
+
+
+_store: BlobStore | None = None
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None or _store.root != Path(settings.blob_dir):
+        _store = BlobStore(settings.blob_dir)
+    return _store
@@ -1,18 +1,56 @@
 import asyncio
+import json
 import logging
 import os
 import time
 from collections.abc import AsyncIterator
 
 from dcc.config import settings
-from dcc.engine.event_converter import convert_cli_event
-from dcc.engine.git_diff import DiffCapture, capture_head_ref, compute_session_diff
-from dcc.engine.stream_parser import parse_cli_line
+from dcc.engine.blob_store import BlobStore, get_blob_store
+from dcc.engine.event_converter import (
+    MAX_TOOL_RESULT_LEN,
+    PartialMessageConverter,
+    convert_cli_event,
+)
+from dcc.engine.fs_manifest import Manifest, compute_manifest_diff, snapshot_manifest
+from dcc.engine.fs_watcher import FileWatcher
+from dcc.engine.git_diff import (
+    DiffCapture,
+    capture_head_ref,
+    compute_session_diff,
+    snapshot_tree,
+)
+from dcc.engine.line_reader import DEFAULT_CHUNK_SIZE, OversizedLine, iter_ndjson_lines
+from dcc.engine.proc_stats import ResourceSampler, ResourceUsage
+from dcc.engine.resource_limits import (
+    ResourceLimits,
+    RunCgroup,
+    cgroup_name,
+    classify_breach,
+    make_preexec,
+)
+from dcc.engine.stderr_tail import StderrTail
+from dcc.engine.stream_parser import parse_cli_bytes
 from dcc.engine.types import AgUiEvent, AgUiEventType
+from dcc.engine.warm_pool import SpawnSpec, warm_pool
+from dcc.engine.worktree_pool import ISOLATION_WORKTREE, Worktree, WorktreeError, worktree_pool
 
 logger = logging.getLogger(__name__)
 
-RESULT_TIMEOUT_S = 300  # 5 min max for a CLI run
+TERMINATE_GRACE_S = 5  # SIGTERM -> SIGKILL escalation
+ERROR_STDERR_CHARS = 2000  # stderr tail included in RunError
+# Tree CPU (as a share of wall time) that counts as activity for the idle
+# watchdog while stdout is silent
+IDLE_CPU_SHARE = 0.01
+# Lines this big may carry a tool result bound for the blob store: convert them
+# in a worker thread
+OFFLOAD_LINE_BYTES = MAX_TOOL_RESULT_LEN
+# How often stderr lines and touched files are pushed while stdout is silent
+SIDE_EVENT_INTERVAL_S = 0.25
+# stdout lines read ahead of the consumer (keeps the pipe's backpressure)
+STDOUT_QUEUE_LINES = 8
+_STDOUT_EOF = object()
+_SIDE_EVENTS_DUE = object()
 
 
 class CliRunner:
@@ -27,6 +65,16 @@ class CliRunner:
         skill: str | None = None,
         agent: str | None = None,
         model: str | None = None,
+        partial_messages: bool = False,
+        timeout_s: float | None = None,
+        idle_timeout_s: float | None = None,
+        resume_cli_session_id: str | None = None,
+        fork_session: bool = False,
+        resource_limits: ResourceLimits | None = None,
+        isolation: str | None = None,
+        base_ref: str | None = None,
+        attachments: list[dict] | None = None,
+        worktree_path: str | None = None,
     ):
         self.session_id = session_id
         self.workspace_path = workspace_path
@@ -35,12 +83,50 @@ class CliRunner:
         self.skill = skill
         self.agent = agent
         self.model = model
+        self.partial_messages = partial_messages
+        # Extra content blocks (images, documents) sent after the prompt text
+        self.attachments = attachments or []
+        # Continue an earlier CLI conversation; fork_session branches it off
+        # under a new CLI session id instead of appending to it
+        self.resume_cli_session_id = resume_cli_session_id
+        self.fork_session = fork_session
+        self.cli_session_id: str | None = None
+        self.resource_limits = resource_limits or ResourceLimits()
+        # isolation="worktree": run in a pooled git worktree checked out at
+        # base_ref (default HEAD) instead of the workspace itself;
+        # worktree_path asks for a particular one (a continuation's CLI
+        # conversation is stored under its parent's cwd)
+        self.isolation = isolation
+        self.base_ref = base_ref
+        self.worktree_path = worktree_path
+        self.cwd = workspace_path
+        self._worktree: Worktree | None = None
+        self.worktree_branch: str | None = None
+        self._cgroup: RunCgroup | None = None
+        # None falls back to settings; 0 disables the budget
+        self.timeout_s = settings.run_timeout_s if timeout_s is None else timeout_s
+        self.idle_timeout_s = (
+            settings.run_idle_timeout_s if idle_timeout_s is None else idle_timeout_s
+        )
+        self._last_output = 0.0
+        # (checked at, stderr bytes, tree CPU seconds) for the idle watchdog
+        self._liveness: tuple[float, int, float] = (0.0, 0, 0.0)
+        self._expired: str | None = None
+        self.stderr_tail = StderrTail(settings.cli_stderr_tail_bytes)
+        self._stderr_seen = 0
+        self._sampler: ResourceSampler | None = None
+        self.resource_usage: ResourceUsage | None = None
         self._process: asyncio.subprocess.Process | None = None
         self._cancelled = False
         self._head_before: str | None = None
+        self._tree_before: str | None = None
+        self._manifest_before: Manifest | None = None
+        self._watcher: FileWatcher | None = None
         self._diff_capture: DiffCapture | None = None
 
     def _build_command(self) -> list[str]:
+        """CLI argv. The prompt is not part of it: it goes to stdin as a
+        stream-json user message (no ARG_MAX ceiling, not visible in ps)."""
         cmd = [
             settings.claude_bin,
             "--print",
@@ -48,21 +134,69 @@ class CliRunner:
             "stream-json",
             "--verbose",
             "--dangerously-skip-permissions",
+            "--input-format",
+            "stream-json",
         ]
 
+        if self.partial_messages:
+            cmd.append("--include-partial-messages")
+
         if self.model:
             cmd.extend(["--model", self.model])
 
         if self.agent:
             cmd.extend(["--agent", self.agent])
 
+        if self.resume_cli_session_id:
+            cmd.extend(["--resume", self.resume_cli_session_id])
+            if self.fork_session:
+                cmd.append("--fork-session")
+        return cmd
+
+    def _resolved_prompt(self) -> str:
         # Build the prompt: if skill, prefix with /skill_name
-        prompt = self.prompt
         if self.skill:
-            prompt = f"/{self.skill} {prompt}"
+            return f"/{self.skill} {self.prompt}"
+        return self.prompt
 
-        cmd.append(prompt)
-        return cmd
+    @property
+    def pool_key(self) -> tuple:
+        """Processes are interchangeable when everything but the prompt matches."""
+        return (
+            self.config_dir,
+            self.workspace_path,
+            self.model,
+            self.agent,
+            self.partial_messages,
+            self.resume_cli_session_id,
+            self.fork_session,
+        )
+
+    def spawn_spec(self) -> SpawnSpec:
+        return SpawnSpec(
+            key=self.pool_key,
+            cmd=self._build_command(),
+            env=self._build_env(),
+            cwd=self.workspace_path,
+        )
+
+    def _stdin_message(self) -> bytes:
+        content = [{"type": "text", "text": self._resolved_prompt()}, *self.attachments]
+        message = {"type": "user", "message": {"role": "user", "content": content}}
+        return json.dumps(message, ensure_ascii=False).encode() + b"\n"
+
+    async def _send_stdin_prompt(self) -> None:
+        """Write the prompt message and close stdin. Runs alongside the stdout
+        reader so a large prompt can't deadlock against a full stdout pipe."""
+        assert self._process is not None and self._process.stdin is not None
+        stdin = self._process.stdin
+        try:
+            stdin.write(self._stdin_message())
+            await stdin.drain()
+            stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            # The CLI died before reading it; its exit code tells the story
+            logger.warning("CLI closed stdin before the prompt was sent (%s)", self.session_id)
 
     def _build_env(self) -> dict[str, str]:
         env = os.environ.copy()
@@ -71,6 +205,161 @@ class CliRunner:
         env.pop("CLAUDECODE", None)
         return env
 
+    def _busy_since_last_check(self, now: float) -> bool:
+        """stderr output, or real CPU use by the process tree, since the last call.
+
+        A long tool call (a build, a test run) prints nothing on stdout until it
+        returns; this keeps it from counting as idle.
+        """
+        stderr_bytes = self.stderr_tail.total_bytes
+        cpu_s = 0.0
+        if self._sampler is not None:
+            cpu_s = self._sampler.usage.cpu_user_s + self._sampler.usage.cpu_sys_s
+        last_at, last_stderr, last_cpu = self._liveness
+        self._liveness = (now, stderr_bytes, cpu_s)
+        # An idle node process still ticks a little CPU; don't count that
+        return stderr_bytes > last_stderr or cpu_s - last_cpu > IDLE_CPU_SHARE * (now - last_at)
+
+    async def _watchdog(self, start_time: float) -> None:
+        """Kill the process once the total or idle budget runs out.
+
+        Idle means no stdout line and no other sign of work (see
+        _busy_since_last_check) for idle_timeout_s.
+        """
+        self._liveness = (start_time, 0, 0.0)
+        while True:
+            deadlines = []
+            if self.timeout_s:
+                deadlines.append((start_time + self.timeout_s, "timeout"))
+            if self.idle_timeout_s:
+                deadlines.append((self._last_output + self.idle_timeout_s, "idle_timeout"))
+            if not deadlines:
+                return
+            deadline, reason = min(deadlines)
+            now = time.monotonic()
+            if now < deadline:
+                await asyncio.sleep(deadline - now)
+                continue
+            if reason == "idle_timeout" and self._busy_since_last_check(now):
+                self._last_output = now
+                continue
+            logger.warning(
+                "Session %s hit %s, stopping CLI (pid=%s)",
+                self.session_id,
+                reason,
+                self._process.pid if self._process else None,
+            )
+            self._expired = reason
+            await self._terminate()
+            return
+
+    async def _terminate(self) -> None:
+        """SIGTERM, then SIGKILL after a grace period. Unblocks the stdout reader."""
+        process = self._process
+        if process is None:
+            return
+        if process.returncode is None:
+            try:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), timeout=TERMINATE_GRACE_S)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+            except ProcessLookupError:
+                pass
+        # Children (MCP servers) may still hold the pipe open
+        if process.stdout is not None:
+            process.stdout.feed_eof()
+
+    def _stderr_events(self) -> list[AgUiEvent]:
+        """New stderr lines as Custom `stderr` events (if enabled)."""
+        if not settings.cli_stderr_events or self.stderr_tail.line_count == self._stderr_seen:
+            return []
+        lines = self.stderr_tail.lines_since(self._stderr_seen)
+        self._stderr_seen = self.stderr_tail.line_count
+        return [
+            AgUiEvent(
+                type=AgUiEventType.CUSTOM,
+                session_id=self.session_id,
+                custom_type="stderr",
+                data={"lines": lines},
+            )
+        ]
+
+    def _file_events(self) -> list[AgUiEvent]:
+        """Newly touched files as a Custom `files_touched` event (if watching)."""
+        paths = self._watcher.drain() if self._watcher is not None else []
+        if not paths:
+            return []
+        return [
+            AgUiEvent(
+                type=AgUiEventType.CUSTOM,
+                session_id=self.session_id,
+                custom_type="files_touched",
+                data={"paths": paths},
+            )
+        ]
+
+    async def _pump_stdout(self, queue: asyncio.Queue) -> None:
+        """Feed stdout lines into queue, then _STDOUT_EOF (or the read error)."""
+        try:
+            async for raw_line in iter_ndjson_lines(
+                self._process.stdout, settings.cli_max_line_bytes
+            ):
+                await queue.put(raw_line)
+            await queue.put(_STDOUT_EOF)
+        except Exception as e:
+            await queue.put(e)
+
+    async def _tick_side_events(self, queue: asyncio.Queue) -> None:
+        """Wake the reader loop to emit stderr and files_touched events.
+
+        A long tool call can keep stdout silent for minutes; those events
+        shouldn't wait for its next line. While lines are queued they go out
+        with the lines anyway.
+        """
+        while True:
+            await asyncio.sleep(SIDE_EVENT_INTERVAL_S)
+            if queue.empty():
+                queue.put_nowait(_SIDE_EVENTS_DUE)
+
+    async def _stop_watcher(self) -> None:
+        if self._watcher is not None:
+            await asyncio.to_thread(self._watcher.stop)
+
+    def _touched_paths(self) -> list[str] | None:
+        """Paths changed during the run, if the watcher saw all of them."""
+        if self._watcher is None or not self._watcher.complete:
+            return None
+        return sorted(self._watcher.touched)
+
+    async def _stop_sampler(self) -> None:
+        if self._sampler is not None:
+            self.resource_usage = await self._sampler.stop()
+            self._sampler = None
+
+    def _convert_line(
+        self,
+        raw_line: bytes,
+        partial: PartialMessageConverter | None,
+        blob_store: BlobStore,
+    ) -> list[AgUiEvent]:
+        cli_event = parse_cli_bytes(raw_line)
+        if cli_event is None:
+            return []
+        if partial is not None:
+            return partial.convert(cli_event)
+        return convert_cli_event(cli_event, self.session_id, blob_store)
+
+    def _cancelled_before_start(self) -> AgUiEvent:
+        return AgUiEvent(
+            type=AgUiEventType.RUN_ERROR,
+            session_id=self.session_id,
+            error="Cancelled before the CLI started",
+            error_code="cancelled",
+        )
+
     @property
     def diff_capture(self) -> DiffCapture | None:
         return self._diff_capture
@@ -80,60 +369,235 @@ class CliRunner:
         cmd = self._build_command()
         env = self._build_env()
 
-        logger.info("Starting CLI: %s (cwd=%s)", " ".join(cmd), self.workspace_path)
-
-        # Capture HEAD before run for diff
-        self._head_before = await capture_head_ref(self.workspace_path)
-
         # Emit RunStarted
         yield AgUiEvent(
             type=AgUiEventType.RUN_STARTED,
             session_id=self.session_id,
         )
+        if self._cancelled:
+            yield self._cancelled_before_start()
+            return
+
+        if self.isolation == ISOLATION_WORKTREE:
+            try:
+                self._worktree = await worktree_pool.acquire(
+                    self.workspace_path, self.base_ref, self.worktree_path
+                )
+            except WorktreeError as e:
+                yield AgUiEvent(
+                    type=AgUiEventType.RUN_ERROR,
+                    session_id=self.session_id,
+                    error=str(e),
+                    error_code="worktree",
+                )
+                return
+            self.cwd = self.worktree_path = self._worktree.path
+            yield AgUiEvent(
+                type=AgUiEventType.CUSTOM,
+                session_id=self.session_id,
+                custom_type="worktree",
+                data={"path": self._worktree.path, "base_ref": self._worktree.base_ref},
+            )
+
+        logger.info(
+            "Starting CLI: %s (cwd=%s, prompt %d chars, %d attachments)",
+            " ".join(cmd),
+            self.cwd,
+            len(self._resolved_prompt()),
+            len(self.attachments),
+        )
+
+        # Capture HEAD and the working tree (untracked files included) for the diff
+        self._head_before, self._tree_before = await asyncio.gather(
+            capture_head_ref(self.cwd), snapshot_tree(self.cwd)
+        )
+        if self._tree_before is None:
+            # Not a git repo: fall back to a file manifest
+            self._manifest_before = await asyncio.to_thread(snapshot_manifest, self.cwd)
 
         start_time = time.monotonic()
+        self._last_output = start_time
+        watchdog: asyncio.Task | None = None
+        stderr_drain: asyncio.Task | None = None
+        stdin_writer: asyncio.Task | None = None
+        stdout_reader: asyncio.Task | None = None
+        side_events: asyncio.Task | None = None
         got_result = False
+        blob_store = get_blob_store()
+        partial = (
+            PartialMessageConverter(self.session_id, blob_store) if self.partial_messages else None
+        )
 
         try:
-            self._process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=self.workspace_path,
-                env=env,
+            # cancel() may have landed while we set up; don't spawn for nothing
+            if self._cancelled:
+                yield self._cancelled_before_start()
+                got_result = True
+                return
+
+            if settings.run_file_watch:
+                self._watcher = FileWatcher(
+                    self.cwd, settings.file_watch_debounce_ms / 1000, settings.file_watch_poll_s
+                )
+                await asyncio.to_thread(self._watcher.start)
+
+            # Resumed, resource-capped or isolated runs are one-off spawns;
+            # don't pool them
+            poolable = (
+                warm_pool.enabled
+                and not self.resume_cli_session_id
+                and self.resource_limits.is_empty()
+                and self._worktree is None
             )
+            pooled = warm_pool.acquire(self.pool_key) if poolable else None
+            if pooled is not None:
+                logger.info("Using pre-spawned CLI (pid=%s)", pooled.pid)
+                self._process = pooled
+            else:
+                preexec = None
+                if not self.resource_limits.is_empty():
+                    self._cgroup = await asyncio.to_thread(
+                        RunCgroup.create, cgroup_name(self.session_id), self.resource_limits
+                    )
+                    preexec = make_preexec(self.resource_limits, self._cgroup)
+                self._process = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    cwd=self.cwd,
+                    env=env,
+                    # Let the pipe buffer hold a full read chunk before pausing
+                    limit=DEFAULT_CHUNK_SIZE,
+                    preexec_fn=preexec,
+                )
+            if self._cancelled:
+                # Cancelled while spawning: cancel() saw no process yet
+                await self._terminate()
+            else:
+                stdin_writer = asyncio.create_task(self._send_stdin_prompt())
+            # Replace what we took (or start warming this key for the next run)
+            if poolable:
+                warm_pool.prewarm(self.spawn_spec())
+            watchdog = asyncio.create_task(self._watchdog(start_time))
+            if settings.resource_sample_interval_s > 0:
+                self._sampler = ResourceSampler(
+                    self._process.pid, settings.resource_sample_interval_s
+                )
+                self._sampler.start()
+            if self._process.stderr is not None:
+                stderr_drain = asyncio.create_task(self.stderr_tail.drain(self._process.stderr))
 
             assert self._process.stdout is not None
 
-            async for raw_line in self._process.stdout:
+            # stdout lines and side events (stderr, touched files) share one queue
+            queue: asyncio.Queue = asyncio.Queue(STDOUT_QUEUE_LINES)
+            stdout_reader = asyncio.create_task(self._pump_stdout(queue))
+            if settings.cli_stderr_events or self._watcher is not None:
+                side_events = asyncio.create_task(self._tick_side_events(queue))
+
+            while (raw_line := await queue.get()) is not _STDOUT_EOF:
+                if isinstance(raw_line, Exception):
+                    raise raw_line
+                if raw_line is not _SIDE_EVENTS_DUE:
+                    self._last_output = time.monotonic()
                 if self._cancelled:
+                    # Stop the CLI before waiting on it: nobody drains stdout now
+                    await self._terminate()
                     break
 
-                line = raw_line.decode("utf-8", errors="replace")
-                cli_event = parse_cli_line(line)
-                if cli_event is None:
+                for ev in self._stderr_events():
+                    yield ev
+                for ev in self._file_events():
+                    yield ev
+                if raw_line is _SIDE_EVENTS_DUE:
+                    continue
+
+                if isinstance(raw_line, OversizedLine):
+                    logger.warning(
+                        "Skipping %d-byte CLI line over cap (session %s): %r",
+                        raw_line.size,
+                        self.session_id,
+                        raw_line.head[:80],
+                    )
+                    yield AgUiEvent(
+                        type=AgUiEventType.CUSTOM,
+                        session_id=self.session_id,
+                        custom_type="line_truncated",
+                        data={"size": raw_line.size, "max": settings.cli_max_line_bytes},
+                    )
                     continue
 
-                ag_events = convert_cli_event(cli_event, self.session_id)
+                if len(raw_line) > OFFLOAD_LINE_BYTES:
+                    # Big tool results are hashed, compressed and written to the
+                    # blob store; keep that off the loop shared by every run
+                    ag_events = await asyncio.to_thread(
+                        self._convert_line, raw_line, partial, blob_store
+                    )
+                else:
+                    ag_events = self._convert_line(raw_line, partial, blob_store)
                 for ev in ag_events:
+                    if ev.cli_session_id:
+                        self.cli_session_id = ev.cli_session_id
+                    elif ev.type in (AgUiEventType.RUN_FINISHED, AgUiEventType.RUN_ERROR):
+                        ev.cli_session_id = self.cli_session_id
                     yield ev
                     if ev.type == AgUiEventType.RUN_FINISHED:
                         got_result = True
                     elif ev.type == AgUiEventType.RUN_ERROR:
                         got_result = True
 
+            if side_events is not None:
+                side_events.cancel()
+            # Last sample while the tree is still (mostly) there
+            await self._stop_sampler()
             await self._process.wait()
+            if stderr_drain is not None:
+                # Orphaned children may keep stderr open; don't wait on them
+                try:
+                    await asyncio.wait_for(asyncio.shield(stderr_drain), timeout=1)
+                except asyncio.TimeoutError:
+                    pass
+            for ev in self._stderr_events():
+                yield ev
+            await self._stop_watcher()
+            for ev in self._file_events():
+                yield ev
+
+            if self._expired and not got_result:
+                budget = self.timeout_s if self._expired == "timeout" else self.idle_timeout_s
+                yield AgUiEvent(
+                    type=AgUiEventType.RUN_ERROR,
+                    session_id=self.session_id,
+                    error=f"CLI stopped: {self._expired.replace('_', ' ')} after {budget:g}s",
+                    error_code=self._expired,
+                    cli_session_id=self.cli_session_id,
+                    data={"stderr_tail": self.stderr_tail.text(ERROR_STDERR_CHARS)},
+                )
+                got_result = True
 
             # Check stderr for errors
             if self._process.returncode != 0 and not got_result:
-                stderr = ""
-                if self._process.stderr:
-                    stderr_bytes = await self._process.stderr.read()
-                    stderr = stderr_bytes.decode("utf-8", errors="replace")[:500]
+                stderr = self.stderr_tail.text(ERROR_STDERR_CHARS)
+                breach = classify_breach(
+                    self.resource_limits,
+                    self._process.returncode,
+                    stderr,
+                    self._cgroup.events() if self._cgroup else None,
+                )
+                data = {"stderr_tail": stderr}
+                if breach:
+                    error = f"CLI exceeded resource limit ({breach}): {stderr}"
+                    data["limits"] = self.resource_limits.to_dict()
+                else:
+                    error = f"CLI exited with code {self._process.returncode}: {stderr}"
                 yield AgUiEvent(
                     type=AgUiEventType.RUN_ERROR,
                     session_id=self.session_id,
-                    error=f"CLI exited with code {self._process.returncode}: {stderr}",
+                    error=error,
+                    error_code=breach,
+                    cli_session_id=self.cli_session_id,
+                    data=data,
                 )
                 got_result = True
 
@@ -143,18 +607,51 @@ class CliRunner:
                 type=AgUiEventType.RUN_ERROR,
                 session_id=self.session_id,
                 error=str(e),
+                cli_session_id=self.cli_session_id,
             )
             got_result = True
 
         finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            if stderr_drain is not None:
+                stderr_drain.cancel()
+            if stdin_writer is not None:
+                stdin_writer.cancel()
+            if stdout_reader is not None:
+                stdout_reader.cancel()
+            if side_events is not None:
+                side_events.cancel()
+            await self._stop_sampler()
+            await self._stop_watcher()
+            if self._cgroup is not None:
+                await asyncio.to_thread(self._cgroup.remove)
+                self._cgroup = None
+
             # Capture diff after CLI run
             try:
-                self._diff_capture = await compute_session_diff(
-                    self.workspace_path, self._head_before
-                )
+                if self._manifest_before is not None:
+                    self._diff_capture = await compute_manifest_diff(
+                        self.cwd, self._manifest_before, self._touched_paths()
+                    )
+                else:
+                    self._diff_capture = await compute_session_diff(
+                        self.cwd, self._head_before, self._tree_before, self._touched_paths()
+                    )
             except Exception:
                 logger.exception("Failed to capture diff for session %s", self.session_id)
 
+            if self._worktree is not None:
+                self.worktree_branch = await worktree_pool.release(self._worktree, self.session_id)
+                self._worktree = None
+                if self.worktree_branch:
+                    yield AgUiEvent(
+                        type=AgUiEventType.CUSTOM,
+                        session_id=self.session_id,
+                        custom_type="worktree_branch",
+                        data={"branch": self.worktree_branch},
+                    )
+
             # Fallback: synthetic RunFinished if no result event arrived (bug #1920)
             if not got_result:
                 elapsed_ms = int((time.monotonic() - start_time) * 1000)
@@ -163,6 +660,7 @@ class CliRunner:
                     type=AgUiEventType.RUN_FINISHED,
                     session_id=self.session_id,
                     duration_ms=elapsed_ms,
+                    cli_session_id=self.cli_session_id,
                 )
 
     async def cancel(self):
@@ -170,12 +668,4 @@ class CliRunner:
         self._cancelled = True
         if self._process and self._process.returncode is None:
             logger.info("Cancelling CLI subprocess (pid=%s)", self._process.pid)
-            try:
-                self._process.terminate()
-                try:
-                    await asyncio.wait_for(self._process.wait(), timeout=5)
-                except asyncio.TimeoutError:
-                    self._process.kill()
-                    await self._process.wait()
-            except ProcessLookupError:
-                pass
+            await self._terminate()
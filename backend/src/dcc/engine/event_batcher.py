@@ -0,0 +1,78 @@
+"""Coalesce bursts of AG-UI events into micro-batches for SSE."""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+from dcc.engine.types import AgUiEvent, AgUiEventType
+
+TERMINAL_EVENTS = (AgUiEventType.RUN_FINISHED, AgUiEventType.RUN_ERROR)
+
+_DONE = object()
+
+
+async def coalesce_events(
+    events: AsyncIterator[AgUiEvent],
+    window_s: float,
+    max_events: int,
+) -> AsyncIterator[list[AgUiEvent]]:
+    """Yield events in batches.
+
+    A batch opens with the first event that arrives and is flushed when
+    window_s has passed since then, when it holds max_events, or right
+    away on a terminal event. An idle stream therefore adds at most
+    window_s of latency, while a burst (one assistant message = 3+ events)
+    goes out as a single frame.
+
+    The source is drained by a pump task so a flush timeout never cancels
+    the source generator mid-await.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for ev in events:
+                await queue.put(ev)
+        except Exception as e:  # surfaced to the consumer below
+            await queue.put(e)
+        finally:
+            await queue.put(_DONE)
+
+    pump_task = asyncio.create_task(pump())
+    loop = asyncio.get_running_loop()
+
+    try:
+        done = False
+        while not done:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            batch = [item]
+            deadline = loop.time() + window_s
+
+            while item.type not in TERMINAL_EVENTS and len(batch) < max_events:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                if isinstance(item, Exception):
+                    yield batch
+                    raise item
+                batch.append(item)
+
+            yield batch
+    finally:
+        if not pump_task.done():
+            pump_task.cancel()
+            try:
+                await pump_task
+            except asyncio.CancelledError:
+                pass
@@ -1,9 +1,14 @@
 import json
+import logging
 import uuid
+from collections.abc import Iterator
 from datetime import datetime, timezone
 
+from dcc.engine.blob_store import BlobStore
 from dcc.engine.types import AgUiEvent, AgUiEventType, CliEvent
 
+logger = logging.getLogger(__name__)
+
 MAX_TOOL_RESULT_LEN = 2000
 
 
@@ -15,8 +20,54 @@ def _make_message_id() -> str:
     return str(uuid.uuid4())[:8]
 
 
-def convert_cli_event(cli: CliEvent, session_id: str) -> list[AgUiEvent]:
-    """Convert a CLI event to one or more AG-UI events."""
+def _tool_input_str(tool_input) -> str:
+    return (
+        json.dumps(tool_input, ensure_ascii=False)
+        if isinstance(tool_input, dict)
+        else str(tool_input)
+    )
+
+
+def _result_preview(parts: list[str]) -> tuple[str, bool]:
+    """'\n'.join(parts) cut to MAX_TOOL_RESULT_LEN, without joining all of it.
+
+    Returns (preview, truncated).
+    """
+    pieces: list[str] = []
+    length = 0
+    for i, part in enumerate(parts):
+        if i:
+            pieces.append("\n")
+            length += 1
+        pieces.append(part)
+        length += len(part)
+        if length > MAX_TOOL_RESULT_LEN:
+            return "".join(pieces)[:MAX_TOOL_RESULT_LEN] + "\n... [truncated]", True
+    return "".join(pieces), False
+
+
+class _JoinedChunks:
+    """'\n'.join(parts) as UTF-8 chunks, re-iterable so the blob store can
+    hash and then compress it without holding an encoded copy."""
+
+    def __init__(self, parts: list[str]):
+        self.parts = parts
+
+    def __iter__(self) -> Iterator[bytes]:
+        for i, part in enumerate(self.parts):
+            if i:
+                yield b"\n"
+            yield part.encode("utf-8", errors="replace")
+
+
+def convert_cli_event(
+    cli: CliEvent, session_id: str, blob_store: BlobStore | None = None
+) -> list[AgUiEvent]:
+    """Convert a CLI event to one or more AG-UI events.
+
+    With a blob_store, tool results longer than MAX_TOOL_RESULT_LEN are stored
+    in full and the event carries the preview plus tool_result_ref/size.
+    """
     events: list[AgUiEvent] = []
     ts = _now_iso()
 
@@ -82,12 +133,7 @@ def convert_cli_event(cli: CliEvent, session_id: str) -> list[AgUiEvent]:
             elif block_type == "tool_use":
                 tool_id = block.get("id", _make_message_id())
                 tool_name = block.get("name", "unknown")
-                tool_input = block.get("input", {})
-                input_str = (
-                    json.dumps(tool_input, ensure_ascii=False)
-                    if isinstance(tool_input, dict)
-                    else str(tool_input)
-                )
+                input_str = _tool_input_str(block.get("input", {}))
                 events.append(
                     AgUiEvent(
                         type=AgUiEventType.TOOL_CALL_START,
@@ -124,17 +170,22 @@ def convert_cli_event(cli: CliEvent, session_id: str) -> list[AgUiEvent]:
 
                 # Content can be string or list of content blocks
                 if isinstance(content, list):
-                    parts = []
-                    for part in content:
-                        if isinstance(part, dict) and part.get("type") == "text":
-                            parts.append(part.get("text", ""))
-                    result_text = "\n".join(parts)
+                    parts = [
+                        part.get("text", "")
+                        for part in content
+                        if isinstance(part, dict) and part.get("type") == "text"
+                    ]
                 else:
-                    result_text = str(content)
+                    parts = [str(content)]
 
-                # Truncate large results
-                if len(result_text) > MAX_TOOL_RESULT_LEN:
-                    result_text = result_text[:MAX_TOOL_RESULT_LEN] + "\n... [truncated]"
+                # Truncate large results; the full text goes to the blob store
+                result_text, truncated = _result_preview(parts)
+                result_ref = result_size = None
+                if truncated and blob_store is not None:
+                    try:
+                        result_ref, result_size = blob_store.put_chunks(_JoinedChunks(parts))
+                    except OSError:
+                        logger.exception("Failed to store tool result %s", tool_id)
 
                 events.append(
                     AgUiEvent(
@@ -144,6 +195,8 @@ def convert_cli_event(cli: CliEvent, session_id: str) -> list[AgUiEvent]:
                         tool_call_id=tool_id,
                         tool_result=result_text,
                         tool_is_error=block.get("is_error", False),
+                        tool_result_ref=result_ref,
+                        tool_result_size=result_size,
                     )
                 )
 
@@ -161,6 +214,7 @@ def convert_cli_event(cli: CliEvent, session_id: str) -> list[AgUiEvent]:
                     session_id=session_id,
                     timestamp=ts,
                     error=raw.get("error", "Unknown error"),
+                    cli_session_id=cli.session_id,
                 )
             )
         else:
@@ -177,9 +231,156 @@ def convert_cli_event(cli: CliEvent, session_id: str) -> list[AgUiEvent]:
                     cache_read_tokens=usage.get("cache_read_tokens"),
                     cache_write_tokens=usage.get("cache_write_tokens"),
                     model=raw.get("model"),
+                    cli_session_id=cli.session_id,
                 )
             )
 
         return events
 
     return events
+
+
+class PartialMessageConverter:
+    """Stateful converter for runs with --include-partial-messages.
+
+    stream_event lines carry the Anthropic streaming events. Text block deltas
+    become TextMessageContent events sharing the block's message_id; tool_use
+    input_json_delta fragments are accumulated and emitted as one
+    ToolCallStart + ToolCallEnd when the block closes. The complete assistant
+    message the CLI sends afterwards is skipped for messages already streamed.
+    Everything else goes through convert_cli_event unchanged.
+    """
+
+    def __init__(self, session_id: str, blob_store: BlobStore | None = None):
+        self.session_id = session_id
+        self.blob_store = blob_store
+        self._streamed_ids: set[str] = set()
+        self._streaming = False
+        # block index → ("text", message_id) | ("tool_use", [id, name, parts])
+        self._blocks: dict[int, tuple[str, object]] = {}
+
+    def convert(self, cli: CliEvent) -> list[AgUiEvent]:
+        if cli.type == "stream_event":
+            raw = cli.raw or {}
+            event = raw.get("event")
+            if isinstance(event, dict):
+                return self._convert_stream_event(event)
+            return []
+
+        if cli.type == "assistant" and self._is_streamed(cli.message or {}):
+            return []
+
+        return convert_cli_event(cli, self.session_id, self.blob_store)
+
+    def _is_streamed(self, message: dict) -> bool:
+        msg_id = message.get("id")
+        if msg_id:
+            return msg_id in self._streamed_ids
+        # No id to match on: only suppress if a streamed message is in flight
+        return self._streaming
+
+    def _convert_stream_event(self, event: dict) -> list[AgUiEvent]:
+        event_type = event.get("type")
+        ts = _now_iso()
+
+        if event_type == "message_start":
+            message = event.get("message") or {}
+            if message.get("id"):
+                self._streamed_ids.add(message["id"])
+            self._streaming = True
+            self._blocks.clear()
+            return []
+
+        if event_type == "message_stop":
+            self._streaming = False
+            return []
+
+        index = event.get("index", 0)
+
+        if event_type == "content_block_start":
+            block = event.get("content_block") or {}
+            block_type = block.get("type")
+            if block_type == "text":
+                msg_id = _make_message_id()
+                self._blocks[index] = ("text", msg_id)
+                events = [
+                    AgUiEvent(
+                        type=AgUiEventType.TEXT_MESSAGE_START,
+                        session_id=self.session_id,
+                        timestamp=ts,
+                        message_id=msg_id,
+                        role="assistant",
+                    )
+                ]
+                if block.get("text"):
+                    events.append(self._text_delta(msg_id, block["text"], ts))
+                return events
+            if block_type == "tool_use":
+                initial = block.get("input")
+                parts = [] if not initial else [_tool_input_str(initial)]
+                tool_id = block.get("id", _make_message_id())
+                self._blocks[index] = ("tool_use", [tool_id, block.get("name", "unknown"), parts])
+            return []
+
+        if event_type == "content_block_delta":
+            delta = event.get("delta") or {}
+            kind, state = self._blocks.get(index, (None, None))
+            if kind == "text" and delta.get("type") == "text_delta":
+                text = delta.get("text", "")
+                return [self._text_delta(state, text, ts)] if text else []
+            if kind == "tool_use" and delta.get("type") == "input_json_delta":
+                state[2].append(delta.get("partial_json", ""))
+            return []
+
+        if event_type == "content_block_stop":
+            kind, state = self._blocks.pop(index, (None, None))
+            if kind == "text":
+                return [
+                    AgUiEvent(
+                        type=AgUiEventType.TEXT_MESSAGE_END,
+                        session_id=self.session_id,
+                        timestamp=ts,
+                        message_id=state,
+                    )
+                ]
+            if kind == "tool_use":
+                tool_id, tool_name, parts = state
+                return [
+                    AgUiEvent(
+                        type=AgUiEventType.TOOL_CALL_START,
+                        session_id=self.session_id,
+                        timestamp=ts,
+                        tool_call_id=tool_id,
+                        tool_name=tool_name,
+                        tool_input=self._join_input(parts),
+                    ),
+                    AgUiEvent(
+                        type=AgUiEventType.TOOL_CALL_END,
+                        session_id=self.session_id,
+                        timestamp=ts,
+                        tool_call_id=tool_id,
+                    ),
+                ]
+            return []
+
+        return []
+
+    def _text_delta(self, msg_id: str, text: str, ts: str) -> AgUiEvent:
+        return AgUiEvent(
+            type=AgUiEventType.TEXT_MESSAGE_CONTENT,
+            session_id=self.session_id,
+            timestamp=ts,
+            message_id=msg_id,
+            text=text,
+        )
+
+    @staticmethod
+    def _join_input(parts: list[str]) -> str:
+        raw = "".join(parts)
+        if not raw:
+            return "{}"
+        # Normalize to the same encoding convert_cli_event uses for full messages
+        try:
+            return _tool_input_str(json.loads(raw))
+        except json.JSONDecodeError:
+            return raw
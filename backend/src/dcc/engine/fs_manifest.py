@@ -0,0 +1,434 @@
+"""Diff capture for workspaces that aren't git repositories.
+
+Before a run the tree is recorded as a manifest of (path, size, mtime,
+content hash), hashed with blake2b. Text files up to
+settings.manifest_max_file_bytes also get a compressed pre-run copy, within a
+per-snapshot byte budget, so they can be diffed once the run has changed them;
+copies live apart from the blob store and expire after
+settings.manifest_copy_retention_s without use. Directories are scanned in
+parallel, and hashes are reused from the workspace's previous manifest for
+files whose stat info hasn't changed, so only new or edited files are read.
+After the run a second manifest is compared with the first and a git-style
+unified diff is built for the changed files only.
+"""
+
+import asyncio
+import difflib
+import hashlib
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dcc.config import settings
+from dcc.engine.git_diff import DiffCapture, DiffFile, format_diff_stat, index_patch
+
+logger = logging.getLogger(__name__)
+
+WALK_WORKERS = 8
+# Never descended into (VCS metadata, dependency and cache directories)
+SKIP_DIRS = frozenset(
+    {
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "__pycache__",
+        ".venv",
+        "venv",
+        ".mypy_cache",
+        ".pytest_cache",
+        ".ruff_cache",
+    }
+)
+# A file modified this close to when its manifest was taken may change again
+# without its mtime moving (coarse timestamps); such hashes aren't reused
+RACY_NS = 2_000_000_000
+MAX_CACHED_MANIFESTS = 32
+# Expired pre-run copies are swept at most this often
+PRUNE_INTERVAL_S = 3600
+_BINARY_SNIFF = 8000
+_HASH_CHUNK = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    size: int
+    mtime_ns: int
+    ino: int
+    mode: int
+    digest: str  # blake2b of the content
+    stored: bool  # a pre-run copy is kept under digest
+
+
+@dataclass
+class Manifest:
+    root: str
+    taken_ns: int
+    entries: dict[str, ManifestEntry] = field(default_factory=dict)
+
+
+class PreRunCopies:
+    """Compressed file contents keyed by manifest digest, for the diff.
+
+    A copy's mtime is its last use (written, or reused by a later manifest);
+    prune() removes those unused for longer than the retention.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / f"{digest}.z"
+
+    def put(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        if self.touch(digest):
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(zlib.compress(data, 1))
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def touch(self, digest: str) -> bool:
+        """Mark the copy as in use. False if there is none."""
+        try:
+            os.utime(self._path(digest))
+        except OSError:
+            return False
+        return True
+
+    def get(self, digest: str) -> bytes | None:
+        try:
+            return zlib.decompress(self._path(digest).read_bytes())
+        except (OSError, zlib.error):
+            return None
+
+    def prune(self, max_age_s: float) -> int:
+        """Remove copies unused for more than max_age_s. Returns how many."""
+        cutoff = time.time() - max_age_s
+        removed = 0
+        for path in self.root.glob("*/*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+_copies: PreRunCopies | None = None
+_last_prune = float("-inf")
+
+
+def get_copies() -> PreRunCopies:
+    global _copies
+    root = Path(settings.blob_dir) / "manifest"
+    if _copies is None or _copies.root != root:
+        _copies = PreRunCopies(root)
+    return _copies
+
+
+def prune_copies(force: bool = False) -> int:
+    """Sweep expired pre-run copies (at most every PRUNE_INTERVAL_S unless
+    force). Blocking."""
+    global _last_prune
+    now = time.monotonic()
+    if not force and now - _last_prune < PRUNE_INTERVAL_S:
+        return 0
+    _last_prune = now
+    removed = get_copies().prune(settings.manifest_copy_retention_s)
+    if removed:
+        logger.info("Pruned %d expired manifest copies", removed)
+    return removed
+
+
+class _CopyBudget:
+    """Bytes of pre-run copies one snapshot may still write (shared by the
+    hashing threads)."""
+
+    def __init__(self, limit: int):
+        self.left = limit
+        self._lock = threading.Lock()
+
+    def take(self, size: int) -> bool:
+        with self._lock:
+            if size > self.left:
+                return False
+            self.left -= size
+            return True
+
+
+def _scan_dir(root: str, rel: str, skip: str) -> tuple[list[str], list[tuple[str, os.stat_result]]]:
+    """(subdirectories, regular files with their stat) directly under rel.
+    skip is an absolute directory to leave out (the blob store)."""
+    dirs, files = [], []
+    try:
+        with os.scandir(os.path.join(root, rel)) as it:
+            for entry in it:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS and os.path.abspath(entry.path) != skip:
+                            dirs.append(child)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append((child, entry.stat(follow_symlinks=False)))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return dirs, files
+
+
+def _walk(
+    root: str, start: str, pool: ThreadPoolExecutor, limit: int
+) -> dict[str, os.stat_result] | None:
+    """Stat every file under start, one directory level at a time across the
+    pool. None if there are more than limit files."""
+    files: dict[str, os.stat_result] = {}
+    skip = os.path.abspath(settings.blob_dir)
+    level = [start]
+    while level:
+        subdirs = []
+        for dirs, found in pool.map(lambda rel: _scan_dir(root, rel, skip), level):
+            subdirs.extend(dirs)
+            files.update(found)
+        if len(files) > limit:
+            return None
+        level = subdirs
+    return files
+
+
+def _hash_file(
+    root: str, rel: str, st: os.stat_result, budget: _CopyBudget
+) -> ManifestEntry | None:
+    """Hash one file, keeping a copy of it if it's small text and budget allows."""
+    path = os.path.join(root, rel)
+    stored = False
+    try:
+        if st.st_size <= settings.manifest_max_file_bytes:
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+            if not _is_binary(data) and budget.take(len(data)):
+                get_copies().put(digest, data)
+                stored = True
+        else:
+            h = hashlib.blake2b(digest_size=20)
+            with open(path, "rb") as f:
+                while chunk := f.read(_HASH_CHUNK):
+                    h.update(chunk)
+            digest = h.hexdigest()
+    except OSError:
+        return None
+    return ManifestEntry(st.st_size, st.st_mtime_ns, st.st_ino, st.st_mode, digest, stored)
+
+
+def build_manifest(
+    root: str, previous: Manifest | None = None, paths: Iterable[str] | None = None
+) -> Manifest | None:
+    """Manifest of root, or None if it holds more than
+    settings.manifest_max_files files. Blocking.
+
+    Hashes are reused from previous where stat info matches. With paths (the
+    complete set of paths touched since previous), only those are re-examined.
+    """
+    taken_ns = time.time_ns()
+    limit = settings.manifest_max_files
+    with ThreadPoolExecutor(WALK_WORKERS, thread_name_prefix="dcc-manifest") as pool:
+        if previous is not None and paths is not None:
+            entries = dict(previous.entries)
+            stats: dict[str, os.stat_result] = {}
+            blob_dir = os.path.abspath(settings.blob_dir) + os.sep
+            for rel in paths:
+                full = os.path.join(root, rel)
+                skipped = SKIP_DIRS.intersection(rel.split("/"))
+                if skipped or os.path.abspath(full).startswith(blob_dir):
+                    continue
+                prefix = rel + "/"
+                for old in [p for p in entries if p == rel or p.startswith(prefix)]:
+                    del entries[old]
+                try:
+                    st = os.lstat(full)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    found = _walk(root, rel, pool, limit)
+                    if found is None:
+                        return None
+                    stats.update(found)
+                elif stat.S_ISREG(st.st_mode):
+                    stats[rel] = st
+            if len(entries) + len(stats) > limit:
+                return None
+        else:
+            entries = {}
+            found = _walk(root, "", pool, limit)
+            if found is None:
+                return None
+            stats = found
+
+        reusable = previous.entries if previous is not None else {}
+        racy_before = previous.taken_ns - RACY_NS if previous is not None else 0
+        budget = _CopyBudget(settings.manifest_copy_max_bytes)
+        copies = get_copies()
+        to_hash = []
+        for rel, st in stats.items():
+            old = reusable.get(rel)
+            if (
+                old is not None
+                and (old.size, old.mtime_ns, old.ino) == (st.st_size, st.st_mtime_ns, st.st_ino)
+                and old.mtime_ns < racy_before
+                # A pre-run copy must still exist (it may have expired)
+                and (not old.stored or copies.touch(old.digest))
+            ):
+                if old.stored:
+                    budget.take(old.size)
+                entries[rel] = old
+            else:
+                to_hash.append((rel, st))
+        for (rel, _), entry in zip(
+            to_hash, pool.map(lambda item: _hash_file(root, *item, budget), to_hash)
+        ):
+            if entry is not None:
+                entries[rel] = entry
+    return Manifest(root=root, taken_ns=taken_ns, entries=entries)
+
+
+class ManifestCache:
+    """Latest manifest per workspace, so the next run only rehashes what changed."""
+
+    def __init__(self, size: int = MAX_CACHED_MANIFESTS):
+        self.size = size
+        self._manifests: OrderedDict[str, Manifest] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, root: str) -> Manifest | None:
+        with self._lock:
+            manifest = self._manifests.get(root)
+            if manifest is not None:
+                self._manifests.move_to_end(root)
+            return manifest
+
+    def put(self, manifest: Manifest) -> None:
+        with self._lock:
+            self._manifests[manifest.root] = manifest
+            self._manifests.move_to_end(manifest.root)
+            while len(self._manifests) > self.size:
+                self._manifests.popitem(last=False)
+
+
+manifest_cache = ManifestCache()
+
+
+def snapshot_manifest(root: str) -> Manifest | None:
+    """Pre-run manifest of root (None if disabled or too big). Blocking."""
+    if settings.manifest_max_files <= 0:
+        return None
+    manifest = build_manifest(root, manifest_cache.get(root))
+    if manifest is not None:
+        manifest_cache.put(manifest)
+    return manifest
+
+
+def _is_binary(data: bytes) -> bool:
+    return b"\0" in data[:_BINARY_SNIFF]
+
+
+def _file_patch(
+    root: str, rel: str, old: ManifestEntry | None, new: ManifestEntry | None
+) -> tuple[str, DiffFile]:
+    """git-style patch section for one changed file."""
+    header = f"diff --git a/{rel} b/{rel}\n"
+    if old is None:
+        header += f"new file mode {new.mode:o}\n"
+    elif new is None:
+        header += f"deleted file mode {old.mode:o}\n"
+    before = get_copies().get(old.digest) if old is not None and old.stored else b""
+    after = b""
+    if new is not None:
+        try:
+            with open(os.path.join(root, rel), "rb") as f:
+                after = f.read(settings.manifest_max_file_bytes + 1)
+        except OSError:
+            pass
+    no_text = (old is not None and (not old.stored or before is None)) or (
+        new is not None and new.size > settings.manifest_max_file_bytes
+    )
+    src = "/dev/null" if old is None else f"a/{rel}"
+    dst = "/dev/null" if new is None else f"b/{rel}"
+    before = before or b""
+    if no_text or _is_binary(before) or _is_binary(after):
+        return f"{header}Binary files {src} and {dst} differ\n", DiffFile(path=rel, binary=True)
+
+    lines = list(
+        difflib.unified_diff(
+            before.decode(errors="replace").splitlines(),
+            after.decode(errors="replace").splitlines(),
+            src,
+            dst,
+            lineterm="",
+        )
+    )
+    body = lines[2:]
+    ins = sum(1 for line in body if line.startswith("+"))
+    dels = sum(1 for line in body if line.startswith("-"))
+    if not lines:  # e.g. an empty file added
+        lines = [f"--- {src}", f"+++ {dst}"]
+    text = header + "\n".join(lines) + "\n"
+    return text, DiffFile(path=rel, insertions=ins, deletions=dels)
+
+
+def diff_manifests(root: str, before: Manifest, after: Manifest) -> DiffCapture:
+    """Unified diff of the files whose content differs between the manifests.
+    Blocking."""
+    capture = DiffCapture()
+    sections = []
+    for rel in sorted(before.entries.keys() | after.entries.keys()):
+        old, new = before.entries.get(rel), after.entries.get(rel)
+        if old is not None and new is not None and old.digest == new.digest:
+            continue
+        text, diff_file = _file_patch(root, rel, old, new)
+        sections.append(text)
+        capture.files.append(diff_file)
+    if not sections:
+        return capture
+    patch = "".join(sections)
+    index_patch(capture.files, patch)
+    capture.diff_content = patch
+    capture.files_changed = len(capture.files)
+    capture.insertions = sum(f.insertions for f in capture.files)
+    capture.deletions = sum(f.deletions for f in capture.files)
+    capture.diff_stat = format_diff_stat(capture.files)
+    return capture
+
+
+async def compute_manifest_diff(
+    root: str, before: Manifest, paths: list[str] | None = None
+) -> DiffCapture:
+    """Post-run counterpart of snapshot_manifest(); paths as in build_manifest."""
+    after = await asyncio.to_thread(build_manifest, root, before, paths)
+    if after is None:
+        logger.warning("Too many files under %s for a manifest diff", root)
+        return DiffCapture()
+    capture = await asyncio.to_thread(diff_manifests, root, before, after)
+    manifest_cache.put(after)
+    await asyncio.to_thread(prune_copies)
+    return capture
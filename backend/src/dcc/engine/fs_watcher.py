@@ -0,0 +1,361 @@
+"""Live file-change tracking for a workspace while a run is active.
+
+A background thread watches the tree with inotify (through libc via ctypes;
+one watch per directory) or, where that is unavailable or the watch limit is
+hit, by polling stat info. Touched paths are debounced, filtered through the
+repo's ignore rules and handed out in batches (drain), and the full set
+(touched) lets the post-run diff look at those paths only.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Watches per run; bigger trees are polled instead
+MAX_WATCHES = 8192
+GIT_IGNORE_TIMEOUT_S = 10
+
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_DONT_FOLLOW = 0x02000000
+_IN_EXCL_UNLINK = 0x04000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_ONLYDIR
+    | _IN_DONT_FOLLOW
+    | _IN_EXCL_UNLINK
+)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then len bytes of name
+
+
+def _libc() -> ctypes.CDLL | None:
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, "inotify_init1") else None  # Linux only
+
+
+class FileWatcher:
+    """Tracks files created, modified or deleted under root.
+
+    start() and stop() block (initial walk, thread join): call them from a
+    thread in async code. drain() and touched are safe from any thread.
+    complete is False if events may have been lost (inotify queue overflow),
+    in which case touched is a hint, not the full set.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        debounce_s: float = 0.2,
+        poll_interval_s: float = 1.0,
+        use_inotify: bool = True,
+    ):
+        self.root = root
+        self.debounce_s = debounce_s
+        self.poll_interval_s = poll_interval_s
+        self.use_inotify = use_inotify
+        self.mode: str | None = None  # "inotify" or "poll" once started
+        self.complete = True
+        self._touched: set[str] = set()
+        self._ready: list[str] = []
+        self._lock = threading.Lock()
+        # Watcher thread only
+        self._raw: set[str] = set()
+        self._last_event = 0.0
+        self._is_git = False
+        self._ignored_paths: set[str] = set()
+        self._libc: ctypes.CDLL | None = None
+        self._fd = -1
+        self._wds: dict[int, str] = {}
+        self._stats: dict[str, tuple[int, int, int]] = {}
+        self._stop_r = self._stop_w = -1
+        self._thread: threading.Thread | None = None
+
+    @property
+    def touched(self) -> set[str]:
+        """Every (non-ignored) path touched so far, relative to root."""
+        with self._lock:
+            return set(self._touched)
+
+    def drain(self) -> list[str]:
+        """Paths first touched since the last drain, after debouncing."""
+        with self._lock:
+            ready, self._ready = self._ready, []
+        return ready
+
+    def start(self) -> None:
+        self._load_ignored()
+        if not (self.use_inotify and self._start_inotify()):
+            self.mode = "poll"
+            self._stats = self._scan()
+        else:
+            self.mode = "inotify"
+        self._stop_r, self._stop_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, name="dcc-fs-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching; changes made before the call are still picked up."""
+        if self._thread is None:
+            return
+        os.write(self._stop_w, b"x")
+        self._thread.join()
+        self._thread = None
+        if self.mode == "inotify":
+            self._read_events()
+        else:
+            self._poll()
+        if self._raw:
+            self._flush()
+        for fd in (self._fd, self._stop_r, self._stop_w):
+            if fd >= 0:
+                os.close(fd)
+        self._fd = self._stop_r = self._stop_w = -1
+        self._wds.clear()
+
+    # --- ignore rules ---
+
+    def _load_ignored(self) -> None:
+        """Ignored files and (collapsed) directories that exist now."""
+        try:
+            proc = subprocess.run(
+                [
+                    "git",
+                    "ls-files",
+                    "-z",
+                    "--others",
+                    "--ignored",
+                    "--exclude-standard",
+                    "--directory",
+                ],
+                cwd=self.root,
+                capture_output=True,
+                timeout=GIT_IGNORE_TIMEOUT_S,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return
+        if proc.returncode != 0:
+            return  # not a git repo: only .git itself is skipped
+        self._is_git = True
+        self._ignored_paths = {p.rstrip("/") for p in os.fsdecode(proc.stdout).split("\0") if p}
+
+    def _ignored(self, rel: str) -> bool:
+        parts = rel.split("/")
+        if parts[0] == ".git":
+            return True
+        return any("/".join(parts[:i]) in self._ignored_paths for i in range(1, len(parts) + 1))
+
+    def _filter_ignored(self, paths: list[str]) -> list[str]:
+        """Drop paths matching ignore rules (e.g. a new *.log file)."""
+        if not self._is_git or not paths:
+            return paths
+        try:
+            proc = subprocess.run(
+                ["git", "check-ignore", "-z", "--stdin"],
+                input=b"".join(os.fsencode(p) + b"\0" for p in paths),
+                cwd=self.root,
+                capture_output=True,
+                timeout=GIT_IGNORE_TIMEOUT_S,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return paths
+        ignored = set(os.fsdecode(proc.stdout).split("\0"))
+        return [p for p in paths if p not in ignored]
+
+    # --- tree walking ---
+
+    def _walk(self, start: str):
+        """(relative dir, scandir entries) for start and its non-ignored subdirectories."""
+        stack = [start]
+        while stack:
+            rel = stack.pop()
+            try:
+                with os.scandir(os.path.join(self.root, rel)) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            yield rel, entries
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                if entry.is_dir(follow_symlinks=False) and not self._ignored(child):
+                    stack.append(child)
+
+    def _scan(self) -> dict[str, tuple[int, int, int]]:
+        stats = {}
+        for rel, entries in self._walk(""):
+            for entry in entries:
+                child = f"{rel}/{entry.name}" if rel else entry.name
+                if entry.is_dir(follow_symlinks=False) or self._ignored(child):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                stats[child] = (st.st_mtime_ns, st.st_size, st.st_mode)
+        return stats
+
+    # --- inotify ---
+
+    def _start_inotify(self) -> bool:
+        self._libc = _libc()
+        if self._libc is None:
+            return False
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return False
+        self._fd = fd
+        self._watch_tree("", note=False)
+        if self.complete:
+            return True
+        # Watch limit reached: polling sees the whole tree
+        logger.info("Too many directories to watch under %s; polling instead", self.root)
+        os.close(self._fd)
+        self._fd = -1
+        self._wds.clear()
+        self.complete = True
+        return False
+
+    def _watch_tree(self, start: str, note: bool) -> None:
+        """Watch start and its subdirectories; with note, record the files
+        already in them (they may have landed before the watch did)."""
+        assert self._libc is not None
+        for rel, entries in self._walk(start):
+            if len(self._wds) >= MAX_WATCHES:
+                self.complete = False
+                return
+            path = os.fsencode(os.path.join(self.root, rel))
+            wd = self._libc.inotify_add_watch(self._fd, path, _WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err in (errno.ENOENT, errno.ENOTDIR):
+                    continue  # gone already
+                self.complete = False
+                return
+            self._wds[wd] = rel
+            if note:
+                for entry in entries:
+                    child = f"{rel}/{entry.name}" if rel else entry.name
+                    if not entry.is_dir(follow_symlinks=False) and not self._ignored(child):
+                        self._note(child)
+
+    def _unwatch_tree(self, rel: str) -> None:
+        """Drop watches for a directory moved or deleted away (moved watches
+        would keep reporting under the old path)."""
+        assert self._libc is not None
+        prefix = rel + "/"
+        for wd, path in list(self._wds.items()):
+            if path == rel or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._wds[wd]
+
+    def _read_events(self) -> None:
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return
+            if not data:
+                return
+            pos = 0
+            while pos + _EVENT.size <= len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size : pos + _EVENT.size + length].split(b"\0", 1)[0]
+                pos += _EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    logger.warning("inotify queue overflow under %s", self.root)
+                    self.complete = False
+                    continue
+                if mask & _IN_IGNORED:
+                    self._wds.pop(wd, None)
+                    continue
+                base = self._wds.get(wd)
+                if base is None or not name:
+                    continue
+                rel = f"{base}/{os.fsdecode(name)}" if base else os.fsdecode(name)
+                if self._ignored(rel):
+                    continue
+                if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                    self._watch_tree(rel, note=True)  # notes the files, not the dir
+                    continue
+                self._note(rel)
+                if mask & _IN_ISDIR and mask & (_IN_DELETE | _IN_MOVED_FROM):
+                    self._unwatch_tree(rel)
+
+    # --- polling ---
+
+    def _poll(self) -> None:
+        stats = self._scan()
+        for path in stats.keys() ^ self._stats.keys():
+            self._note(path)
+        for path, st in stats.items():
+            if self._stats.get(path, st) != st:
+                self._note(path)
+        self._stats = stats
+
+    # --- debounced delivery ---
+
+    def _note(self, rel: str) -> None:
+        self._raw.add(rel)
+        self._last_event = time.monotonic()
+
+    def _flush(self) -> None:
+        paths = self._filter_ignored(sorted(self._raw))
+        self._raw.clear()
+        with self._lock:
+            new = [p for p in paths if p not in self._touched]
+            self._touched.update(new)
+            self._ready.extend(new)
+
+    def _run(self) -> None:
+        next_poll = time.monotonic() + self.poll_interval_s
+        fds = [self._stop_r] + ([self._fd] if self.mode == "inotify" else [])
+        while True:
+            now = time.monotonic()
+            waits = []
+            if self._raw:
+                waits.append(self._last_event + self.debounce_s - now)
+            if self.mode == "poll":
+                waits.append(next_poll - now)
+            timeout = max(0.0, min(waits)) if waits else None
+            readable, _, _ = select.select(fds, [], [], timeout)
+            if self._stop_r in readable:
+                return
+            try:
+                if self._fd in readable:
+                    self._read_events()
+                now = time.monotonic()
+                if self.mode == "poll" and now >= next_poll:
+                    self._poll()
+                    next_poll = now + self.poll_interval_s
+                if self._raw and now - self._last_event >= self.debounce_s:
+                    self._flush()
+            except Exception:
+                logger.exception("File watcher failed for %s", self.root)
+                self.complete = False
+                return
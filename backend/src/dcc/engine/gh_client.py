@@ -1,12 +1,24 @@
-"""GitHub API client via `gh` CLI subprocess."""
+"""GitHub REST API client with a pooled keep-alive HTTP connection.
+
+Authenticates as the `gh` CLI user: the token is read once with
+`gh auth token` (re-read after a 401). Responses and errors match what the
+earlier `gh api` subprocess client returned.
+"""
 
 import asyncio
 import json
 import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+from dcc.config import settings
 
 logger = logging.getLogger(__name__)
 
 GH_TIMEOUT_S = 15
+GH_API_VERSION = "2022-11-28"
+GITHUB_API_HOST = "api.github.com"
 
 
 class GhError(Exception):
@@ -17,47 +29,115 @@ class GhError(Exception):
         self.exit_code = exit_code
 
 
-async def gh_api(
-    path: str, method: str = "GET", body: dict | None = None
-) -> dict | list:
-    """Execute GitHub API call via `gh api` subprocess.
+def _auth_token_args() -> list[str]:
+    """`gh auth token` for the host settings.github_api_url points at."""
+    host = urlsplit(settings.github_api_url).hostname
+    if not host or host == GITHUB_API_HOST:
+        return ["auth", "token"]
+    # GitHub Enterprise (https://<host>/api/v3): gh keeps a token per host
+    return ["auth", "token", "--hostname", host]
 
-    Uses asyncio.create_subprocess_exec (same pattern as CliRunner).
-    Timeout: 15s.
-    """
-    cmd = ["gh", "api", path, "--method", method]
-
-    if body is not None:
-        cmd.extend(["--input", "-"])
-
-    logger.debug("gh api: %s %s", method, path)
 
+async def _gh_auth_token() -> str:
+    """The token `gh` is logged in with (or GH_TOKEN/GH_ENTERPRISE_TOKEN,
+    which gh honors)."""
     try:
         proc = await asyncio.create_subprocess_exec(
-            *cmd,
+            "gh",
+            *_auth_token_args(),
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
-            stdin=asyncio.subprocess.PIPE if body else None,
         )
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=GH_TIMEOUT_S)
+    except asyncio.TimeoutError as e:
+        raise GhError(f"gh auth token timeout after {GH_TIMEOUT_S}s") from e
+    except OSError as e:
+        raise GhError(f"gh api error: {e}") from e
+    if proc.returncode != 0:
+        err_msg = stderr.decode("utf-8", errors="replace").strip()
+        raise GhError(f"gh api error: {err_msg}", exit_code=proc.returncode or 1)
+    return stdout.decode().strip()
+
+
+class GhClient:
+    """One httpx client (connection pool) per event loop, token cached."""
+
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._token: str | None = None
+        self._token_lock = asyncio.Lock()
+
+    async def _token_value(self) -> str:
+        async with self._token_lock:
+            if self._token is None:
+                self._token = await _gh_auth_token()
+            return self._token
+
+    def _http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Pooled connections belong to the loop that opened them
+            self._client = httpx.AsyncClient(
+                base_url=settings.github_api_url,
+                headers={
+                    "Accept": "application/vnd.github+json",
+                    "X-GitHub-Api-Version": GH_API_VERSION,
+                    "User-Agent": "dcc",
+                },
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+            )
+            self._loop = loop
+        return self._client
+
+    async def request(
+        self, path: str, method: str = "GET", body: dict | None = None
+    ) -> dict | list:
+        token = await self._token_value()
+        logger.debug("gh api: %s %s", method, path)
+        try:
+            resp = await self._http().request(
+                method,
+                path if path.startswith("/") else f"/{path}",
+                json=body,
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=GH_TIMEOUT_S,
+            )
+        except httpx.TimeoutException as e:
+            raise GhError(f"gh api timeout after {GH_TIMEOUT_S}s: {method} {path}") from e
+        except httpx.HTTPError as e:
+            raise GhError(f"gh api error: {e}") from e
+
+        if resp.status_code >= 400:
+            if resp.status_code == 401:
+                self._token = None  # logged out or rotated: read it again next time
+            try:
+                message = resp.json().get("message") or resp.reason_phrase
+            except (ValueError, AttributeError):
+                message = resp.reason_phrase
+            # Same wording as `gh api` on stderr
+            raise GhError(f"gh api error: gh: {message} (HTTP {resp.status_code})")
+
+        output = resp.text.strip()
+        if not output:
+            return {}
+        try:
+            return json.loads(output)
+        except json.JSONDecodeError as e:
+            raise GhError(f"gh api returned invalid JSON: {e}") from e
 
-        stdin_data = json.dumps(body).encode() if body else None
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
 
-        stdout, stderr = await asyncio.wait_for(
-            proc.communicate(input=stdin_data),
-            timeout=GH_TIMEOUT_S,
-        )
 
-        if proc.returncode != 0:
-            err_msg = stderr.decode("utf-8", errors="replace").strip()
-            raise GhError(f"gh api error: {err_msg}", exit_code=proc.returncode or 1)
+gh_client = GhClient()
 
-        output = stdout.decode("utf-8", errors="replace").strip()
-        if not output:
-            return {}
 
-        return json.loads(output)
+async def gh_api(path: str, method: str = "GET", body: dict | None = None) -> dict | list:
+    """Execute a GitHub API call (same contract as `gh api <path>`).
 
-    except asyncio.TimeoutError as e:
-        raise GhError(f"gh api timeout after {GH_TIMEOUT_S}s: {method} {path}") from e
-    except json.JSONDecodeError as e:
-        raise GhError(f"gh api returned invalid JSON: {e}") from e
+    Reuses pooled HTTPS connections; timeout 15s.
+    """
+    return await gh_client.request(path, method=method, body=body)
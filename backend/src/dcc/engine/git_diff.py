@@ -2,12 +2,35 @@
 
 import asyncio
 import logging
+import os
 import re
+import shutil
+import tempfile
 from dataclasses import dataclass, field
 
+from dcc.engine.git_helper import git_helpers
+
 logger = logging.getLogger(__name__)
 
-MAX_DIFF_SIZE = 50_000  # 50KB max diff content
+# Inline preview kept in session_diffs.diff_content; the full diff goes to the
+# blob store with a per-file index (session_diff_files)
+DIFF_PREVIEW_SIZE = 50_000
+DIFF_TIMEOUT_S = 60  # a full patch of a large change set
+# Most touched paths a snapshot restages individually; more means a full `add -A`
+SNAPSHOT_MAX_PATHS = 1000
+
+
+@dataclass
+class DiffFile:
+    path: str
+    old_path: str | None = None  # set for renames
+    insertions: int = 0
+    deletions: int = 0
+    binary: bool = False
+    status: str = "M"  # A, M, D, R or C, as in `git diff --name-status`
+    # Byte range of this file's patch within DiffCapture.diff_content (UTF-8)
+    offset: int = 0
+    length: int = 0
 
 
 @dataclass
@@ -17,9 +40,12 @@ class DiffCapture:
     files_changed: int = 0
     insertions: int = 0
     deletions: int = 0
+    files: list[DiffFile] = field(default_factory=list)  # in diff_content order
 
 
-async def _run_git(workspace_path: str, *args: str) -> str | None:
+async def _run_git(
+    workspace_path: str, *args: str, timeout: float = 10, env: dict[str, str] | None = None
+) -> str | None:
     """Run a git command and return stdout, or None on error."""
     try:
         proc = await asyncio.create_subprocess_exec(
@@ -27,8 +53,9 @@ async def _run_git(workspace_path: str, *args: str) -> str | None:
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
             cwd=workspace_path,
+            env={**os.environ, **env} if env else None,
         )
-        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=10)
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=timeout)
         if proc.returncode != 0:
             return None
         return stdout.decode("utf-8", errors="replace").strip()
@@ -38,72 +65,224 @@ async def _run_git(workspace_path: str, *args: str) -> str | None:
 
 async def capture_head_ref(workspace_path: str) -> str | None:
     """Get current HEAD commit hash."""
-    return await _run_git(workspace_path, "rev-parse", "HEAD")
+    return await git_helpers.get(workspace_path).head()
+
+
+async def snapshot_tree(
+    workspace_path: str, base_tree: str | None = None, paths: list[str] | None = None
+) -> str | None:
+    """Tree id of the whole working tree, untracked files included (ignored
+    ones excluded), or None outside a git repo.
+
+    Stages everything into a throwaway copy of the index and runs write-tree,
+    so the user's index is never touched. Seeding the copy from the real index
+    lets `add -A` skip re-hashing files whose stat info is unchanged.
+
+    Given base_tree (an earlier snapshot) and the paths touched since, only
+    those paths are restaged on top of it.
+    """
+    if base_tree and paths is not None and len(paths) <= SNAPSHOT_MAX_PATHS:
+        if not paths:
+            return base_tree
+        present = [p for p in paths if os.path.lexists(os.path.join(workspace_path, p))]
+        gone = [p for p in paths if p not in set(present)]
+        steps = [["read-tree", base_tree]]
+        if gone:
+            steps.append(["rm", "-r", "-q", "--cached", "--ignore-unmatch", "--", *gone])
+        if present:
+            steps.append(["add", "-A", "--", *present])
+        tree = await _write_tree(workspace_path, steps)
+        if tree:
+            return tree
+        # e.g. a path that has become ignored; take the full snapshot instead
+
+    index = await _run_git(workspace_path, "rev-parse", "--git-path", "index")
+    if index is None:
+        return None
+    return await _write_tree(
+        workspace_path, [["add", "-A"]], seed_index=os.path.join(workspace_path, index)
+    )
+
+
+async def _write_tree(
+    workspace_path: str, steps: list[list[str]], seed_index: str | None = None
+) -> str | None:
+    """Run steps against a temporary index (a copy of seed_index, if given)
+    and return the resulting write-tree id."""
+    tmp_dir = tempfile.mkdtemp(prefix="dcc-index-")
+    tmp_index = os.path.join(tmp_dir, "index")
+    env = {"GIT_INDEX_FILE": tmp_index, "GIT_LITERAL_PATHSPECS": "1"}
+    try:
+        if seed_index:
+            try:
+                await asyncio.to_thread(shutil.copyfile, seed_index, tmp_index)
+            except OSError:
+                pass  # no index yet (fresh repo): start empty
+        for args in steps:
+            if await _run_git(workspace_path, *args, timeout=DIFF_TIMEOUT_S, env=env) is None:
+                return None
+        return await _run_git(workspace_path, "write-tree", env=env)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+async def _commit_log(workspace_path: str, head_before: str) -> str | None:
+    """`git log --oneline head_before..HEAD`, from the git helper when the
+    history is a plain chain (the usual case), else from git log."""
+    helper = git_helpers.get(workspace_path)
+    head_after = await helper.head()
+    if head_after is None or head_after == head_before:
+        return None
+    log = await helper.log_oneline(head_before, head_after)
+    if log is None:
+        log = await _run_git(workspace_path, "log", "--oneline", f"{head_before}..{head_after}")
+    return log
 
 
 async def compute_session_diff(
-    workspace_path: str, head_before: str | None
+    workspace_path: str,
+    head_before: str | None,
+    tree_before: str | None = None,
+    paths: list[str] | None = None,
 ) -> DiffCapture:
     """Compute diff after CLI run.
 
-    If head_before is available, shows committed changes (log + diff).
-    Also captures any uncommitted changes (working tree diff).
+    With tree_before (a snapshot_tree taken before the run), exactly what
+    the run changed: snapshot tree against snapshot tree, new untracked files
+    included and edits that were already there excluded. paths, when the
+    complete set of paths touched during the run is known, limits the second
+    snapshot to them. Otherwise the net change from head_before to the
+    working tree's tracked files.
+
+    One `git diff --numstat --patch` pass; the commit log is read concurrently.
+    diff_content is the whole diff (commit log, then the patch), untruncated.
     """
     capture = DiffCapture()
 
-    parts: list[str] = []
-
-    # Committed changes since head_before
+    diff_args = ["diff", "-z", "--numstat", "--patch", "-M"]
+    tree_after = await snapshot_tree(workspace_path, tree_before, paths) if tree_before else None
+    if tree_after:
+        diff_args += [tree_before, tree_after]
+    elif head_before:
+        diff_args.append(head_before)
     if head_before:
-        head_after = await _run_git(workspace_path, "rev-parse", "HEAD")
-        if head_after and head_after != head_before:
-            # Log of commits
-            log = await _run_git(
-                workspace_path, "log", "--oneline", f"{head_before}..{head_after}"
-            )
-            if log:
-                parts.append(f"# Commits\n{log}\n")
+        log, out = await asyncio.gather(
+            _commit_log(workspace_path, head_before),
+            _run_git(workspace_path, *diff_args, timeout=DIFF_TIMEOUT_S),
+        )
+    else:
+        log, out = None, await _run_git(workspace_path, *diff_args, timeout=DIFF_TIMEOUT_S)
+    if not out:
+        return capture
 
-            # Diff stat
-            stat = await _run_git(
-                workspace_path, "diff", "--stat", f"{head_before}..{head_after}"
-            )
-            if stat:
-                capture.diff_stat = stat
-                fc, ins, dels = parse_diff_stat(stat)
-                capture.files_changed = fc
-                capture.insertions = ins
-                capture.deletions = dels
-
-            # Diff content
-            diff = await _run_git(
-                workspace_path, "diff", f"{head_before}..{head_after}"
-            )
-            if diff:
-                parts.append(diff)
-
-    # Uncommitted changes (working tree)
-    wt_stat = await _run_git(workspace_path, "diff", "--stat")
-    if wt_stat:
-        if not capture.diff_stat:
-            capture.diff_stat = wt_stat
-            fc, ins, dels = parse_diff_stat(wt_stat)
-            capture.files_changed = fc
-            capture.insertions = ins
-            capture.deletions = dels
-
-        wt_diff = await _run_git(workspace_path, "diff")
-        if wt_diff:
-            parts.append(f"\n# Uncommitted changes\n{wt_diff}")
-
-    if parts:
-        full = "\n".join(parts)
-        # Truncate if too large
-        capture.diff_content = full[:MAX_DIFF_SIZE]
+    files, patch = parse_numstat_patch(out)
+    capture.files = files
+    capture.files_changed = len(files)
+    capture.insertions = sum(f.insertions for f in files)
+    capture.deletions = sum(f.deletions for f in files)
+    capture.diff_stat = format_diff_stat(files)
+
+    prefix = f"# Commits\n{log}\n\n" if log else ""
+    if prefix or patch:
+        capture.diff_content = prefix + patch
+        index_patch(files, patch, base=len(prefix.encode()))
 
     return capture
 
 
+def parse_numstat_patch(output: str) -> tuple[list[DiffFile], str]:
+    """Split `git diff -z --numstat --patch` output into per-file stats and
+    the patch text.
+
+    numstat records are NUL-terminated ("ins\tdels\tpath"; renames leave the
+    path empty and follow with old and new path records; binary files
+    count "-"). An empty record separates them from the patch.
+    """
+    files: list[DiffFile] = []
+    pos = 0
+    while pos < len(output):
+        end = output.find("\0", pos)
+        if end < 0:
+            break
+        record = output[pos:end]
+        pos = end + 1
+        if not record:
+            break
+        ins, dels, path = record.split("\t", 2)
+        old_path = None
+        if not path:
+            old_end = output.find("\0", pos)
+            new_end = output.find("\0", old_end + 1)
+            old_path, path = output[pos:old_end], output[old_end + 1 : new_end]
+            pos = new_end + 1
+        binary = ins == "-"
+        files.append(
+            DiffFile(
+                path=path,
+                old_path=old_path,
+                insertions=0 if binary else int(ins),
+                deletions=0 if binary else int(dels),
+                binary=binary,
+            )
+        )
+    return files, output[pos:]
+
+
+_FILE_HEADER_RE = re.compile(rb"^diff --git ", re.MULTILINE)
+_STATUS_HEADERS = (
+    (b"\nnew file mode ", "A"),
+    (b"\ndeleted file mode ", "D"),
+    (b"\nrename from ", "R"),
+    (b"\ncopy from ", "C"),
+)
+
+
+def index_patch(files: list[DiffFile], patch: str, base: int = 0) -> None:
+    """Fill in each file's status and byte range from the patch.
+
+    git emits one "diff --git" section per numstat record, in the same order;
+    base is the byte offset of the patch within the stored diff.
+    """
+    data = patch.encode()
+    starts = [m.start() for m in _FILE_HEADER_RE.finditer(data)]
+    ends = starts[1:] + [len(data)]
+    for f, start, end in zip(files, starts, ends):
+        # Extended headers end where the hunks (or "Binary files") begin
+        header = data[start:end]
+        cut = header.find(b"\n@@")
+        header = header[:cut] if cut >= 0 else header
+        f.status = next((s for marker, s in _STATUS_HEADERS if marker in header), "M")
+        f.offset = base + start
+        f.length = end - start
+
+
+def format_diff_stat(files: list[DiffFile], width: int = 40) -> str:
+    """`git diff --stat`-style text built from numstat (parse_diff_stat reads it)."""
+    if not files:
+        return ""
+    names = [f"{f.old_path} => {f.path}" if f.old_path else f.path for f in files]
+    name_w = max(len(n) for n in names)
+    most = max((f.insertions + f.deletions for f in files), default=0)
+    scale = min(1.0, width / most) if most else 1.0
+    lines = []
+    for name, f in zip(names, files):
+        if f.binary:
+            lines.append(f" {name:<{name_w}} | Bin")
+            continue
+        total = f.insertions + f.deletions
+        bar = "+" * round(f.insertions * scale) + "-" * round(f.deletions * scale)
+        lines.append(f" {name:<{name_w}} | {total} {bar}".rstrip())
+    ins = sum(f.insertions for f in files)
+    dels = sum(f.deletions for f in files)
+    summary = f" {len(files)} file{'s' if len(files) != 1 else ''} changed"
+    if ins:
+        summary += f", {ins} insertion{'s' if ins != 1 else ''}(+)"
+    if dels:
+        summary += f", {dels} deletion{'s' if dels != 1 else ''}(-)"
+    lines.append(summary)
+    return "\n".join(lines)
+
+
 def parse_diff_stat(stat_output: str) -> tuple[int, int, int]:
     """Parse git diff --stat summary line.
 
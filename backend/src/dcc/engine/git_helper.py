@@ -0,0 +1,282 @@
+"""Fork-free git queries for a workspace.
+
+HEAD is resolved by reading .git/HEAD, loose refs and packed-refs directly
+(worktrees included). Object lookups (rev resolution, existence, commit
+metadata) go to one long-lived `git cat-file --batch` process per repo,
+started on first use and stopped after settings.git_helper_idle_s without
+queries. Anything the pure-Python reader can't handle (reftable, odd setups)
+falls back to the batch process.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from dcc.config import settings
+
+logger = logging.getLogger(__name__)
+
+GIT_HELPER_TIMEOUT_S = 10
+_OID_RE = re.compile(r"^[0-9a-f]{40}([0-9a-f]{24})?$")
+
+
+@dataclass
+class CommitInfo:
+    oid: str
+    tree: str
+    parents: list[str] = field(default_factory=list)
+    author: str = ""
+    committed_at: int = 0  # unix seconds
+    subject: str = ""
+
+
+def _find_dot_git(workspace_path: str) -> Path | None:
+    """The .git entry of the repo containing workspace_path (which may be a
+    subdirectory of it), like git's own discovery walking up parents."""
+    path = Path(workspace_path).absolute()
+    for directory in (path, *path.parents):
+        dot_git = directory / ".git"
+        if dot_git.exists():
+            return dot_git
+    return None
+
+
+def _git_dirs(workspace_path: str) -> tuple[Path, Path] | None:
+    """(git dir, common dir) of a repo or linked worktree, or None."""
+    try:
+        dot_git = _find_dot_git(workspace_path)
+        if dot_git is None:
+            return None
+        if dot_git.is_dir():
+            git_dir = dot_git
+        else:
+            line = dot_git.read_text().strip()
+            if not line.startswith("gitdir:"):
+                return None
+            git_dir = (dot_git.parent / line[len("gitdir:") :].strip()).resolve()
+        common = git_dir
+        commondir = git_dir / "commondir"
+        if commondir.is_file():
+            common = (git_dir / commondir.read_text().strip()).resolve()
+        return git_dir, common
+    except OSError:
+        return None
+
+
+def read_head(workspace_path: str) -> str | None:
+    """HEAD's commit id from the ref files, or None if it can't be read that way."""
+    dirs = _git_dirs(workspace_path)
+    if dirs is None:
+        return None
+    git_dir, common = dirs
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+        # Follow symbolic refs (HEAD -> branch; rarely a branch -> branch)
+        for _ in range(5):
+            if _OID_RE.match(head):
+                return head
+            if not head.startswith("ref: "):
+                return None
+            ref = head[len("ref: ") :]
+            loose = common / ref
+            if loose.is_file():
+                head = loose.read_text().strip()
+                continue
+            return _packed_ref(common, ref)
+    except OSError:
+        return None
+    return None
+
+
+def _packed_ref(common: Path, ref: str) -> str | None:
+    try:
+        lines = (common / "packed-refs").read_text().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        if line.startswith(("#", "^")):
+            continue
+        oid, _, name = line.partition(" ")
+        if name == ref:
+            return oid
+    return None
+
+
+class GitHelper:
+    """Queries against one repo, answered without forking git per call."""
+
+    def __init__(self, workspace_path: str):
+        self.workspace_path = workspace_path
+        self._proc: asyncio.subprocess.Process | None = None
+        self._lock = asyncio.Lock()
+        self._idle_handle: asyncio.TimerHandle | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def head(self) -> str | None:
+        oid = read_head(self.workspace_path)
+        if oid is not None:
+            return oid
+        if _find_dot_git(self.workspace_path) is None and "GIT_DIR" not in os.environ:
+            return None  # not a repository: don't spawn git just to hear that
+        # Reftable, unborn branch...: let git decide
+        return await self.resolve("HEAD")
+
+    async def resolve(self, rev: str) -> str | None:
+        """Object id of rev (any `git rev-parse` revision), or None."""
+        header, _ = await self._query(rev, want_body=False)
+        return header[0] if header else None
+
+    async def exists(self, oid: str) -> bool:
+        return await self.resolve(oid) is not None
+
+    async def commit_info(self, rev: str) -> CommitInfo | None:
+        header, body = await self._query(f"{rev}^{{commit}}", want_body=True)
+        if not header or body is None:
+            return None
+        return _parse_commit(header[0], body)
+
+    async def log_oneline(self, base: str, head: str, limit: int = 50) -> str | None:
+        """`git log --oneline base..head` for a first-parent chain from head
+        down to base; None if base isn't reached within limit commits."""
+        lines = []
+        rev = head
+        for _ in range(limit):
+            if rev == base:
+                return "\n".join(lines)
+            info = await self.commit_info(rev)
+            if info is None or not info.parents:
+                return None
+            lines.append(f"{info.oid[:7]} {info.subject}")
+            rev = info.parents[0]
+        return None
+
+    async def _query(self, rev: str, want_body: bool) -> tuple[list[str] | None, bytes | None]:
+        """Send one request; returns (header fields, object body) or (None, None)."""
+        if "\n" in rev:
+            return None, None
+        async with self._lock:
+            self._touch()
+            try:
+                proc = await self._ensure_proc()
+                if proc is None:
+                    return None, None
+                assert proc.stdin is not None and proc.stdout is not None
+                proc.stdin.write(rev.encode() + b"\n")
+                await proc.stdin.drain()
+                line = await asyncio.wait_for(proc.stdout.readline(), GIT_HELPER_TIMEOUT_S)
+                fields = line.decode(errors="replace").split()
+                # "<oid> <type> <size>", or "<rev> missing" / "<rev> ambiguous"
+                if len(fields) != 3 or not _OID_RE.match(fields[0]):
+                    if not line:
+                        await self._kill()
+                    return None, None
+                # The body (plus trailing LF) always follows; read it to stay in sync
+                body = await asyncio.wait_for(
+                    proc.stdout.readexactly(int(fields[2]) + 1), GIT_HELPER_TIMEOUT_S
+                )
+                return fields, body[:-1] if want_body else None
+            except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                logger.warning("git cat-file helper failed for %s", self.workspace_path)
+                await self._kill()
+                return None, None
+
+    async def _ensure_proc(self) -> asyncio.subprocess.Process | None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # A process from another (finished) event loop can't be driven here
+            self._proc, self._loop = None, loop
+        if self._proc is not None and self._proc.returncode is None:
+            return self._proc
+        try:
+            self._proc = await asyncio.create_subprocess_exec(
+                "git",
+                "cat-file",
+                "--batch",
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+                cwd=self.workspace_path,
+            )
+        except OSError:
+            self._proc = None
+        return self._proc
+
+    def _touch(self) -> None:
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+        self._idle_handle = asyncio.get_running_loop().call_later(
+            settings.git_helper_idle_s, lambda: asyncio.ensure_future(self.close())
+        )
+
+    async def _kill(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+
+    async def close(self) -> None:
+        """Stop the batch process (EOF on stdin makes it exit)."""
+        if self._idle_handle is not None:
+            self._idle_handle.cancel()
+            self._idle_handle = None
+        async with self._lock:
+            proc, self._proc = self._proc, None
+            if proc is None or proc.returncode is not None:
+                return
+            assert proc.stdin is not None
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+
+    @property
+    def running(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+
+def _parse_commit(oid: str, body: bytes) -> CommitInfo:
+    headers, _, message = body.decode(errors="replace").partition("\n\n")
+    info = CommitInfo(oid=oid, tree="", subject=message.split("\n", 1)[0])
+    for line in headers.splitlines():
+        key, _, value = line.partition(" ")
+        if key == "tree":
+            info.tree = value
+        elif key == "parent":
+            info.parents.append(value)
+        elif key == "author":
+            info.author = value.rsplit(" ", 2)[0]
+        elif key == "committer":
+            try:
+                info.committed_at = int(value.rsplit(" ", 2)[1])
+            except (IndexError, ValueError):
+                pass
+    return info
+
+
+class GitHelpers:
+    """One helper per workspace path."""
+
+    def __init__(self):
+        self._helpers: dict[str, GitHelper] = {}
+
+    def get(self, workspace_path: str) -> GitHelper:
+        helper = self._helpers.get(workspace_path)
+        if helper is None:
+            helper = self._helpers[workspace_path] = GitHelper(workspace_path)
+        return helper
+
+    async def close(self) -> None:
+        helpers, self._helpers = list(self._helpers.values()), {}
+        await asyncio.gather(*(h.close() for h in helpers))
+
+
+git_helpers = GitHelpers()
@@ -0,0 +1,89 @@
+"""Chunked NDJSON line reader for CLI stdout.
+
+asyncio.StreamReader line iteration is bounded by the reader limit (64 KiB by
+default) and raises on longer lines, which a single big assistant message or
+base64 image easily exceeds. This reader pulls large chunks and splits them
+itself, so line length is bounded only by max_line_bytes.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+OVERSIZED_HEAD_BYTES = 200
+
+
+@dataclass
+class OversizedLine:
+    """Placeholder for a line longer than the cap. Its body was discarded."""
+
+    size: int
+    head: bytes
+
+
+async def iter_ndjson_lines(
+    stream: asyncio.StreamReader,
+    max_line_bytes: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> AsyncIterator[bytes | OversizedLine]:
+    """Yield newline-delimited lines (without the newline) from stream.
+
+    Lines longer than max_line_bytes are not buffered past the cap: the rest
+    of the line is skipped and an OversizedLine with its total size and first
+    bytes is yielded instead. A trailing line without newline is yielded at EOF.
+    """
+    buf = bytearray()
+    # Bytes of the current oversized line already discarded (-1: not skipping)
+    skipped = -1
+    head = b""
+
+    while True:
+        chunk = await stream.read(chunk_size)
+        if not chunk:
+            break
+
+        view = memoryview(chunk)
+        start = 0
+        while True:
+            nl = chunk.find(b"\n", start)
+            if nl < 0:
+                break
+            if skipped >= 0:
+                yield OversizedLine(size=skipped + nl - start, head=head)
+                skipped = -1
+            elif buf:
+                buf += view[start:nl]
+                if len(buf) > max_line_bytes:
+                    yield OversizedLine(size=len(buf), head=bytes(buf[:OVERSIZED_HEAD_BYTES]))
+                else:
+                    yield bytes(buf)
+                buf.clear()
+            elif nl - start > max_line_bytes:
+                yield OversizedLine(
+                    size=nl - start, head=bytes(view[start : start + OVERSIZED_HEAD_BYTES])
+                )
+            else:
+                yield chunk[start:nl]
+            start = nl + 1
+
+        rest = len(chunk) - start
+        if not rest:
+            continue
+        if skipped >= 0:
+            skipped += rest
+        elif len(buf) + rest > max_line_bytes:
+            # Start skipping: keep only the head for diagnostics
+            head = (
+                bytes(buf[:OVERSIZED_HEAD_BYTES])
+                + bytes(view[start : start + OVERSIZED_HEAD_BYTES])
+            )[:OVERSIZED_HEAD_BYTES]
+            skipped = len(buf) + rest
+            buf.clear()
+        else:
+            buf += view[start:]
+
+    if skipped >= 0:
+        yield OversizedLine(size=skipped, head=head)
+    elif buf:
+        yield bytes(buf)
@@ -0,0 +1,181 @@
+"""Per-run resource accounting for a CLI process tree, sampled from /proc.
+
+The tree is the CLI plus everything it spawns (MCP servers, tool commands).
+Each sample sums RSS over the live tree and CPU as utime+stime+cutime+cstime
+of every live process: a process's cutime/cstime already hold the CPU of the
+children it reaped, so short-lived tool commands are counted through their
+parent without double counting. I/O bytes are kept per process (keyed by pid
+and start time) and summed over every process ever seen.
+
+asyncio reaps the CLI itself, so its final rusage is not available; the last
+sample taken before exit stands in for it. On systems without /proc the
+sampler records nothing.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PROC = Path("/proc")
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass(slots=True)
+class _ProcSample:
+    ppid: int
+    start_time: int
+    cpu_user_ticks: int  # utime + cutime
+    cpu_sys_ticks: int  # stime + cstime
+    rss_bytes: int
+
+
+@dataclass
+class ResourceUsage:
+    peak_rss_bytes: int = 0
+    cpu_user_s: float = 0.0
+    cpu_sys_s: float = 0.0
+    io_read_bytes: int = 0
+    io_write_bytes: int = 0
+    max_children: int = 0
+    samples: int = 0
+    _io: dict[tuple[int, int], tuple[int, int]] = field(default_factory=dict, repr=False)
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        out.pop("_io")
+        return out
+
+
+def proc_available() -> bool:
+    return (PROC / "self" / "stat").exists()
+
+
+def _read_stat(pid: int) -> _ProcSample | None:
+    try:
+        raw = (PROC / str(pid) / "stat").read_bytes()
+    except OSError:
+        return None
+    # comm may contain spaces/parens: fields start after the last ')'
+    fields = raw[raw.rfind(b")") + 2 :].split()
+    try:
+        return _ProcSample(
+            ppid=int(fields[1]),
+            start_time=int(fields[19]),
+            cpu_user_ticks=int(fields[11]) + int(fields[13]),
+            cpu_sys_ticks=int(fields[12]) + int(fields[14]),
+            rss_bytes=int(fields[21]) * _PAGE_SIZE,
+        )
+    except (IndexError, ValueError):
+        return None
+
+
+def _read_io(pid: int) -> tuple[int, int] | None:
+    try:
+        text = (PROC / str(pid) / "io").read_text()
+    except OSError:
+        return None
+    values = {}
+    for line in text.splitlines():
+        key, _, value = line.partition(":")
+        values[key] = value.strip()
+    try:
+        return int(values["read_bytes"]), int(values["write_bytes"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _children_map() -> dict[int, list[int]]:
+    """ppid -> pids for every process on the host."""
+    children: dict[int, list[int]] = {}
+    for entry in os.scandir(PROC):
+        if not entry.name.isdigit():
+            continue
+        sample = _read_stat(int(entry.name))
+        if sample is not None:
+            children.setdefault(sample.ppid, []).append(int(entry.name))
+    return children
+
+
+def process_tree(root_pid: int) -> list[int]:
+    """root_pid and all its live descendants."""
+    children = _children_map()
+    tree, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, ()))
+    return tree
+
+
+def sample_tree(root_pid: int, usage: ResourceUsage) -> None:
+    """Take one sample of root_pid's tree and fold it into usage."""
+    rss = user = sys_ = 0
+    live = 0
+    for pid in process_tree(root_pid):
+        stat = _read_stat(pid)
+        if stat is None:
+            continue
+        live += 1
+        rss += stat.rss_bytes
+        user += stat.cpu_user_ticks
+        sys_ += stat.cpu_sys_ticks
+        io = _read_io(pid)
+        if io is not None:
+            usage._io[(pid, stat.start_time)] = io
+    if not live:
+        return
+
+    usage.samples += 1
+    usage.peak_rss_bytes = max(usage.peak_rss_bytes, rss)
+    usage.max_children = max(usage.max_children, live - 1)
+    # CPU is cumulative; exits of unreaped orphans can make a sample dip
+    usage.cpu_user_s = max(usage.cpu_user_s, user / _CLK_TCK)
+    usage.cpu_sys_s = max(usage.cpu_sys_s, sys_ / _CLK_TCK)
+    usage.io_read_bytes = sum(r for r, _ in usage._io.values())
+    usage.io_write_bytes = sum(w for _, w in usage._io.values())
+
+
+class ResourceSampler:
+    """Samples a process tree every interval_s until stopped."""
+
+    def __init__(self, pid: int, interval_s: float):
+        self.pid = pid
+        self.interval_s = interval_s
+        self.usage = ResourceUsage()
+        self._task: asyncio.Task | None = None
+        # A cancelled to_thread keeps running; never fold two samples at once
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if proc_available():
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self) -> None:
+        while True:
+            await self.sample()
+            await asyncio.sleep(self.interval_s)
+
+    async def sample(self) -> None:
+        # Scanning /proc is blocking I/O proportional to the host's process count
+        try:
+            await asyncio.to_thread(self._sample_locked)
+        except Exception:
+            logger.exception("Resource sampling failed for pid %s", self.pid)
+
+    def _sample_locked(self) -> None:
+        with self._lock:
+            sample_tree(self.pid, self.usage)
+
+    async def stop(self) -> ResourceUsage:
+        """Take a final sample (if the process is still there) and stop."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+            await self.sample()
+        return self.usage
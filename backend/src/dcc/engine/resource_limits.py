@@ -0,0 +1,227 @@
+"""Per-run resource caps: rlimits in the child before exec, plus a cgroup v2
+sub-group when a delegated, writable cgroup root is configured.
+
+Limits come from settings.run_resource_limits, overridden per tenant and then
+per workflow. Keys (all optional):
+
+  cpu_s       CPU seconds per process (RLIMIT_CPU, SIGXCPU on breach)
+  memory_mb   memory of the whole tree (cgroup memory.max); without a cgroup,
+              per-process address space (RLIMIT_AS), which must leave room for
+              Node's large virtual reservations
+  nofile      open files per process (RLIMIT_NOFILE)
+  nproc       processes in the tree (cgroup pids.max); without a cgroup,
+              RLIMIT_NPROC, which counts every process of the user
+"""
+
+import json
+import logging
+import os
+import resource
+import signal
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+
+from dcc.config import settings
+
+logger = logging.getLogger(__name__)
+
+MIB = 1024 * 1024
+# Hard CPU limit past the soft one: SIGXCPU first, SIGKILL if ignored
+CPU_HARD_GRACE_S = 5
+# How long remove() waits for a killed group to empty before rmdir
+CGROUP_DRAIN_TIMEOUT_S = 2.0
+
+LIMIT_CPU = "limit_cpu"
+LIMIT_MEMORY = "limit_memory"
+LIMIT_NOFILE = "limit_nofile"
+LIMIT_PIDS = "limit_pids"
+
+
+@dataclass
+class ResourceLimits:
+    cpu_s: int | None = None
+    memory_mb: int | None = None
+    nofile: int | None = None
+    nproc: int | None = None
+
+    @classmethod
+    def merged(cls, *layers: dict | str | None) -> "ResourceLimits":
+        """Later layers override earlier ones key by key; a value <= 0 lifts
+        the limit. Accepts JSON strings."""
+        names = {f.name for f in fields(cls)}
+        values: dict[str, int] = {}
+        for layer in layers:
+            if isinstance(layer, str):
+                try:
+                    layer = json.loads(layer)
+                except json.JSONDecodeError:
+                    logger.warning("Ignoring malformed resource limits: %r", layer)
+                    continue
+            for key, value in (layer or {}).items():
+                if key not in names or value is None:
+                    continue
+                if int(value) > 0:
+                    values[key] = int(value)
+                else:
+                    values.pop(key, None)
+        return cls(**values)
+
+    def is_empty(self) -> bool:
+        return not any(asdict(self).values())
+
+    def to_dict(self) -> dict:
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+class RunCgroup:
+    """A cgroup v2 sub-group holding one run's process tree."""
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    @classmethod
+    def create(cls, name: str, limits: ResourceLimits) -> "RunCgroup | None":
+        """Create {settings.cgroup_root}/{name} with the limits, or None if
+        no usable cgroup root is configured."""
+        if not settings.cgroup_root:
+            return None
+        root = Path(settings.cgroup_root)
+        if not (root / "cgroup.controllers").exists():
+            logger.warning("cgroup_root %s is not a cgroup v2 directory", root)
+            return None
+        try:
+            available = (root / "cgroup.controllers").read_text().split()
+            wanted = [c for c in ("memory", "pids") if c in available]
+            if wanted:
+                (root / "cgroup.subtree_control").write_text(
+                    " ".join(f"+{c}" for c in wanted)
+                )
+            path = root / name
+            path.mkdir(exist_ok=True)
+            if limits.memory_mb:
+                (path / "memory.max").write_text(str(limits.memory_mb * MIB))
+                # No swap: a breach is an OOM kill we can attribute
+                swap = path / "memory.swap.max"
+                if swap.exists():
+                    swap.write_text("0")
+            if limits.nproc:
+                (path / "pids.max").write_text(str(limits.nproc))
+        except OSError:
+            logger.exception("Failed to set up cgroup %s/%s", root, name)
+            return None
+        return cls(path)
+
+    def events(self) -> dict[str, int]:
+        """Breach counters: oom_kill (memory.events) and pids_max (pids.events)."""
+        out: dict[str, int] = {}
+        for filename, key, name in (
+            ("memory.events", "oom_kill", "oom_kill"),
+            ("pids.events", "max", "pids_max"),
+        ):
+            try:
+                for line in (self.path / filename).read_text().splitlines():
+                    k, _, v = line.partition(" ")
+                    if k == key:
+                        out[name] = int(v)
+            except (OSError, ValueError):
+                pass
+        return out
+
+    def _populated(self) -> bool:
+        try:
+            return "populated 1" in (self.path / "cgroup.events").read_text()
+        except OSError:
+            return False
+
+    def _kill(self) -> None:
+        kill = self.path / "cgroup.kill"
+        if kill.exists():  # Linux 5.14+
+            kill.write_text("1")
+            return
+        for pid in (self.path / "cgroup.procs").read_text().split():
+            try:
+                os.kill(int(pid), signal.SIGKILL)
+            except (ProcessLookupError, ValueError):
+                pass
+
+    def remove(self) -> None:
+        """Kill leftover processes and delete the group (blocking; run in a thread).
+
+        Killing is asynchronous: rmdir fails with EBUSY until the group has
+        emptied, so wait for cgroup.events to report populated 0 first.
+        """
+        try:
+            if self._populated():
+                self._kill()
+                deadline = time.monotonic() + CGROUP_DRAIN_TIMEOUT_S
+                while self._populated() and time.monotonic() < deadline:
+                    time.sleep(0.02)
+            self.path.rmdir()
+        except OSError as e:
+            logger.warning("Could not remove cgroup %s: %s", self.path, e)
+
+
+def make_preexec(limits: ResourceLimits, cgroup: RunCgroup | None) -> Callable[[], None]:
+    """preexec_fn for the CLI: join the cgroup, then set rlimits."""
+    procs = str(cgroup.path / "cgroup.procs") if cgroup else None
+    rlimits: list[tuple[int, int, int]] = []
+    if limits.cpu_s:
+        rlimits.append((resource.RLIMIT_CPU, limits.cpu_s, limits.cpu_s + CPU_HARD_GRACE_S))
+    if limits.nofile:
+        rlimits.append((resource.RLIMIT_NOFILE, limits.nofile, limits.nofile))
+    if not cgroup:
+        if limits.memory_mb:
+            mem = limits.memory_mb * MIB
+            rlimits.append((resource.RLIMIT_AS, mem, mem))
+        if limits.nproc:
+            rlimits.append((resource.RLIMIT_NPROC, limits.nproc, limits.nproc))
+
+    def preexec() -> None:
+        # Runs in the forked child: no logging, no locks
+        if procs:
+            with open(procs, "w") as f:
+                f.write("0")
+        for which, soft, hard in rlimits:
+            _, cur_hard = resource.getrlimit(which)
+            if cur_hard != resource.RLIM_INFINITY:
+                hard = min(hard, cur_hard)
+                soft = min(soft, hard)
+            resource.setrlimit(which, (soft, hard))
+
+    return preexec
+
+
+_NOFILE_MARKERS = ("EMFILE", "Too many open files")
+_MEMORY_MARKERS = ("ENOMEM", "Cannot allocate memory", "heap out of memory")
+
+
+def classify_breach(
+    limits: ResourceLimits,
+    returncode: int | None,
+    stderr_tail: str,
+    cgroup_events: dict[str, int] | None = None,
+) -> str | None:
+    """Best-effort: which limit (if any) ended a failed run."""
+    if limits.is_empty() or returncode in (None, 0):
+        return None
+    events = cgroup_events or {}
+    if limits.memory_mb and events.get("oom_kill"):
+        return LIMIT_MEMORY
+    if limits.cpu_s and returncode == -signal.SIGXCPU:
+        return LIMIT_CPU
+    if limits.nproc and events.get("pids_max"):
+        return LIMIT_PIDS
+    if limits.nofile and any(m in stderr_tail for m in _NOFILE_MARKERS):
+        return LIMIT_NOFILE
+    if limits.memory_mb and any(m in stderr_tail for m in _MEMORY_MARKERS):
+        return LIMIT_MEMORY
+    if limits.nproc and "EAGAIN" in stderr_tail:
+        return LIMIT_PIDS
+    return None
+
+
+def cgroup_name(session_id: str) -> str:
+    return f"dcc-run-{session_id}"
+
@@ -0,0 +1,273 @@
+"""Server-side run execution, decoupled from SSE connections.
+
+Each run is an asyncio task that appends its events to a per-session log:
+a bounded in-memory buffer of the latest events, flushed to session_events
+in chunks. SSE subscribers attach to the log, can come and go without
+affecting the run, and resume from any seq (Last-Event-ID). A subscriber
+that falls behind the buffer catches up from the database.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import asdict, dataclass
+
+from dcc.config import settings
+from dcc.db import repository
+from dcc.engine.blob_store import get_blob_store
+from dcc.engine.cli_runner import CliRunner
+from dcc.engine.event_batcher import TERMINAL_EVENTS
+from dcc.engine.git_diff import DIFF_PREVIEW_SIZE
+from dcc.engine.monitor import MonitorProcessor
+from dcc.engine.scheduler import RunTicket, scheduler
+from dcc.engine.types import AgUiEvent, AgUiEventType
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class LoggedEvent:
+    """A serialized event in a session's log."""
+
+    seq: int
+    type: AgUiEventType
+    data: str
+
+
+class RunHandle:
+    def __init__(self, session_id: str, runner: CliRunner, ticket: RunTicket):
+        self.session_id = session_id
+        self.runner = runner
+        self.ticket = ticket
+        self.monitor = MonitorProcessor(session_id)
+        self.task: asyncio.Task | None = None
+        self.done = False
+        self.cancelled = False
+        self.subscribers = 0
+        # Anything evicted from the buffer must already be in the DB
+        flush_size = settings.run_event_flush_size
+        self._buffer: deque[LoggedEvent] = deque(
+            maxlen=max(settings.run_event_buffer, 2 * flush_size)
+        )
+        self._unpersisted: list[tuple[str, int, str, str]] = []
+        self._next_seq = 0
+        self._wakeup = asyncio.Event()
+
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    def _notify(self) -> None:
+        self._wakeup.set()
+        self._wakeup = asyncio.Event()
+
+    async def _flush(self) -> None:
+        if not self._unpersisted:
+            return
+        batch, self._unpersisted = self._unpersisted, []
+        try:
+            await repository.insert_session_events_batch(batch)
+        except Exception:
+            logger.exception("Failed to persist events for session %s", self.session_id)
+
+    async def _record(self, event: AgUiEvent, start_time: float) -> None:
+        # Index full tool results kept out of band in the blob store
+        if event.tool_result_ref:
+            try:
+                await repository.insert_tool_result_blob(
+                    self.session_id,
+                    event.tool_call_id or "",
+                    event.tool_result_ref,
+                    event.tool_result_size or 0,
+                )
+            except Exception:
+                logger.exception("Failed to index tool result for %s", self.session_id)
+
+        # Forward al monitor para construir arbol de ejecucion
+        asyncio.create_task(self.monitor.process_event(event))
+
+        # Update DB on finish
+        if event.type in TERMINAL_EVENTS:
+            elapsed_ms = int((time.monotonic() - start_time) * 1000)
+            if self.cancelled:
+                status = "cancelled"
+            elif event.type == AgUiEventType.RUN_FINISHED:
+                status = "completed"
+            else:
+                status = "error"
+            await repository.update_session_finished(
+                session_id=self.session_id,
+                status=status,
+                model=event.model,
+                cost_usd=event.cost_usd,
+                input_tokens=event.input_tokens,
+                output_tokens=event.output_tokens,
+                num_turns=event.num_turns,
+                duration_ms=event.duration_ms or elapsed_ms,
+                cli_session_id=event.cli_session_id,
+            )
+
+    async def _persist_diff(self) -> None:
+        dc = self.runner.diff_capture
+        if not dc or not (dc.diff_stat or dc.diff_content):
+            return
+        try:
+            # Full diff compressed in the blob store, a bounded preview inline
+            digest = size = None
+            if dc.diff_content:
+                digest, size = await asyncio.to_thread(
+                    get_blob_store().put, dc.diff_content.encode()
+                )
+            await repository.insert_session_diff(
+                session_id=self.session_id,
+                diff_stat=dc.diff_stat,
+                diff_content=dc.diff_content[:DIFF_PREVIEW_SIZE] if dc.diff_content else None,
+                files_changed=dc.files_changed,
+                insertions=dc.insertions,
+                deletions=dc.deletions,
+                diff_sha256=digest,
+                diff_size=size,
+                files=[asdict(f) for f in dc.files] if digest else None,
+            )
+        except Exception:
+            logger.exception("Failed to persist diff for session %s", self.session_id)
+
+    async def _persist_resources(self) -> None:
+        usage = self.runner.resource_usage
+        if not usage or not usage.samples:
+            return
+        try:
+            await repository.update_session_resources(
+                session_id=self.session_id,
+                peak_rss_bytes=usage.peak_rss_bytes,
+                cpu_user_s=usage.cpu_user_s,
+                cpu_sys_s=usage.cpu_sys_s,
+                io_read_bytes=usage.io_read_bytes,
+                io_write_bytes=usage.io_write_bytes,
+                max_children=usage.max_children,
+            )
+        except Exception:
+            logger.exception("Failed to persist resource usage for %s", self.session_id)
+
+    async def _persist_worktree(self) -> None:
+        if not self.runner.worktree_path:
+            return
+        try:
+            await repository.update_session_worktree(
+                self.session_id, self.runner.worktree_branch, self.runner.worktree_path
+            )
+        except Exception:
+            logger.exception("Failed to persist worktree branch for %s", self.session_id)
+
+    async def run(self) -> None:
+        start_time = time.monotonic()
+        try:
+            async for event in scheduler.run(self.ticket, self.runner.run()):
+                data = event.to_json()
+                seq = self._next_seq
+                self._next_seq += 1
+                self._buffer.append(LoggedEvent(seq, event.type, data))
+                self._unpersisted.append((self.session_id, seq, event.type.value, data))
+                self._notify()
+
+                await self._record(event, start_time)
+                if len(self._unpersisted) >= settings.run_event_flush_size:
+                    await self._flush()
+        except asyncio.CancelledError:
+            logger.info("Run task cancelled for session %s", self.session_id)
+            await self.runner.cancel()
+            raise
+        except Exception:
+            logger.exception("Run task failed for session %s", self.session_id)
+        finally:
+            try:
+                await self._flush()
+                await self._persist_diff()
+                await self._persist_resources()
+                await self._persist_worktree()
+            finally:
+                # Subscribers wait on this; never leave them hanging
+                self.done = True
+                self._notify()
+
+    async def subscribe(self, after: int = -1) -> AsyncIterator[LoggedEvent]:
+        """Yield events with seq > after, live, until the run is over."""
+        seq = after
+        self.subscribers += 1
+        try:
+            while True:
+                # Taken before yielding so events appended meanwhile wake us
+                wakeup = self._wakeup
+
+                if self._buffer and seq + 1 < self._buffer[0].seq:
+                    oldest = self._buffer[0].seq
+                    for row in await repository.get_session_events(self.session_id, after_seq=seq):
+                        if row["seq"] >= oldest:
+                            break
+                        seq = row["seq"]
+                        yield LoggedEvent(seq, AgUiEventType(row["event_type"]), row["data"])
+                    # Rows lost to a failed flush are skipped
+                    seq = max(seq, oldest - 1)
+
+                for entry in list(self._buffer):
+                    if entry.seq > seq:
+                        seq = entry.seq
+                        yield entry
+
+                if self.done and seq >= self.last_seq:
+                    return
+                if not wakeup.is_set():
+                    await wakeup.wait()
+        finally:
+            self.subscribers -= 1
+
+
+class RunManager:
+    def __init__(self):
+        self._runs: dict[str, RunHandle] = {}
+
+    def get(self, session_id: str) -> RunHandle | None:
+        return self._runs.get(session_id)
+
+    def start(self, runner: CliRunner, ticket: RunTicket) -> RunHandle:
+        """Start a run task for runner.session_id (or return the existing one)."""
+        existing = self._runs.get(runner.session_id)
+        if existing is not None:
+            return existing
+        handle = RunHandle(runner.session_id, runner, ticket)
+        handle.task = asyncio.create_task(handle.run())
+        handle.task.add_done_callback(lambda _: self._retire(handle))
+        self._runs[runner.session_id] = handle
+        return handle
+
+    def _retire(self, handle: RunHandle) -> None:
+        # Keep finished logs around briefly so late reconnects can catch up
+        def drop():
+            if self._runs.get(handle.session_id) is handle:
+                del self._runs[handle.session_id]
+
+        asyncio.get_running_loop().call_later(settings.run_retain_s, drop)
+
+    async def cancel(self, session_id: str) -> bool:
+        handle = self._runs.get(session_id)
+        if handle is None or handle.done:
+            return False
+        handle.cancelled = True
+        if not scheduler.cancel(session_id):
+            await handle.runner.cancel()
+        return True
+
+    def active(self) -> list[RunHandle]:
+        return [h for h in self._runs.values() if not h.done]
+
+    async def close(self) -> None:
+        tasks = [h.task for h in self._runs.values() if h.task and not h.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runs.clear()
+
+
+run_manager = RunManager()
@@ -0,0 +1,159 @@
+"""Run scheduler: concurrency caps at global, tenant and workspace level.
+
+Runs wait in a FIFO queue until a slot is free at every level. On each
+release the queue is scanned in arrival order and every ticket that fits is
+started, so a workspace at its cap does not block runs for other workspaces
+queued behind it. While waiting, a run streams `queue_position` Custom events.
+A cap of 0 means unlimited.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+from dcc.config import settings
+from dcc.engine.types import AgUiEvent, AgUiEventType
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RunTicket:
+    session_id: str
+    tenant_id: str
+    workspace_id: str
+    enqueued_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    cancelled: bool = False
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "session_id": self.session_id,
+            "tenant_id": self.tenant_id,
+            "workspace_id": self.workspace_id,
+            "enqueued_at": self.enqueued_at,
+            "started_at": self.started_at,
+        }
+
+
+class RunScheduler:
+    def __init__(self):
+        self._queue: list[RunTicket] = []
+        self._running: dict[str, RunTicket] = {}
+
+    @staticmethod
+    def limits() -> dict[str, int]:
+        return {
+            "global": settings.max_concurrent_runs,
+            "tenant": settings.max_runs_per_tenant,
+            "workspace": settings.max_runs_per_workspace,
+        }
+
+    def _fits(self, ticket: RunTicket, tenants: Counter, workspaces: Counter) -> bool:
+        limits = self.limits()
+        if limits["global"] and len(self._running) >= limits["global"]:
+            return False
+        if limits["tenant"] and tenants[ticket.tenant_id] >= limits["tenant"]:
+            return False
+        if limits["workspace"] and workspaces[ticket.workspace_id] >= limits["workspace"]:
+            return False
+        return True
+
+    def _dispatch(self) -> None:
+        tenants = Counter(t.tenant_id for t in self._running.values())
+        workspaces = Counter(t.workspace_id for t in self._running.values())
+        waiting: list[RunTicket] = []
+        for ticket in self._queue:
+            if self._fits(ticket, tenants, workspaces):
+                ticket.started_at = time.time()
+                self._running[ticket.session_id] = ticket
+                tenants[ticket.tenant_id] += 1
+                workspaces[ticket.workspace_id] += 1
+            else:
+                waiting.append(ticket)
+        self._queue = waiting
+        # Wake every ticket that may have started or moved up
+        for ticket in [*self._queue, *self._running.values()]:
+            ticket._changed.set()
+
+    def position(self, ticket: RunTicket) -> int | None:
+        """1-based queue position, or None if not queued."""
+        try:
+            return self._queue.index(ticket) + 1
+        except ValueError:
+            return None
+
+    async def _wait_turn(self, ticket: RunTicket) -> AsyncIterator[AgUiEvent]:
+        self._queue.append(ticket)
+        self._dispatch()
+        last_position = None
+        while ticket.session_id not in self._running:
+            if ticket.cancelled:
+                return
+            position = self.position(ticket)
+            if position != last_position:
+                last_position = position
+                yield AgUiEvent(
+                    type=AgUiEventType.CUSTOM,
+                    session_id=ticket.session_id,
+                    custom_type="queue_position",
+                    data={"position": position, "queued": len(self._queue)},
+                )
+            ticket._changed.clear()
+            await ticket._changed.wait()
+
+    async def run(
+        self, ticket: RunTicket, events: AsyncIterator[AgUiEvent]
+    ) -> AsyncIterator[AgUiEvent]:
+        """Wait for a slot, then yield the run's events; the slot is freed on exit."""
+        try:
+            async for ev in self._wait_turn(ticket):
+                yield ev
+            if ticket.cancelled:
+                yield AgUiEvent(
+                    type=AgUiEventType.RUN_ERROR,
+                    session_id=ticket.session_id,
+                    error="Cancelled while queued",
+                    error_code="cancelled",
+                )
+                return
+            waited = ticket.started_at - ticket.enqueued_at
+            if waited > 0.5:
+                logger.info("Session %s started after %.1fs in queue", ticket.session_id, waited)
+            async for ev in events:
+                yield ev
+        finally:
+            self.release(ticket)
+
+    def release(self, ticket: RunTicket) -> None:
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+        self._running.pop(ticket.session_id, None)
+        self._dispatch()
+
+    def cancel(self, session_id: str) -> bool:
+        """Drop a queued run. Returns False if it is not queued."""
+        for ticket in self._queue:
+            if ticket.session_id == session_id:
+                ticket.cancelled = True
+                self._queue.remove(ticket)
+                ticket._changed.set()
+                self._dispatch()
+                return True
+        return False
+
+    def snapshot(self) -> dict:
+        return {
+            "limits": self.limits(),
+            "running": [t.to_dict() for t in self._running.values()],
+            "queued": [
+                {**t.to_dict(), "position": i + 1} for i, t in enumerate(self._queue)
+            ],
+        }
+
+
+scheduler = RunScheduler()
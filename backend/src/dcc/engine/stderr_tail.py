@@ -0,0 +1,61 @@
+"""Bounded ring buffer for CLI stderr, drained concurrently with stdout.
+
+An undrained stderr pipe fills up (64 KiB on Linux) and blocks the CLI on its
+next write while we wait on stdout. Draining it in a task keeps the process
+moving; only the last max_bytes of output are kept.
+"""
+
+import asyncio
+from collections import deque
+
+STDERR_CHUNK_SIZE = 16 * 1024
+
+
+class StderrTail:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._lines: deque[tuple[int, str]] = deque()
+        self._size = 0
+        self._count = 0
+
+    @property
+    def line_count(self) -> int:
+        """Lines seen so far, including ones already evicted."""
+        return self._count
+
+    def append(self, line: str) -> None:
+        if len(line) > self.max_bytes:
+            line = line[-self.max_bytes :]
+        self._count += 1
+        self._lines.append((self._count, line))
+        self._size += len(line) + 1
+        while self._size > self.max_bytes and len(self._lines) > 1:
+            _, old = self._lines.popleft()
+            self._size -= len(old) + 1
+
+    def text(self, max_chars: int | None = None) -> str:
+        out = "\n".join(line for _, line in self._lines)
+        if max_chars is not None and len(out) > max_chars:
+            return out[-max_chars:]
+        return out
+
+    def lines_since(self, seen: int) -> list[str]:
+        """Buffered lines after the first `seen` lines (evicted ones are skipped)."""
+        return [line for n, line in self._lines if n > seen]
+
+    async def drain(self, stream: asyncio.StreamReader) -> None:
+        """Read stream to EOF, keeping complete lines in the buffer."""
+        carry = b""
+        while True:
+            chunk = await stream.read(STDERR_CHUNK_SIZE)
+            if not chunk:
+                break
+            self.total_bytes += len(chunk)
+            *lines, carry = (carry + chunk).split(b"\n")
+            # A line without newline never grows past the cap
+            carry = carry[-self.max_bytes :]
+            for line in lines:
+                self.append(line.decode("utf-8", errors="replace"))
+        if carry:
+            self.append(carry.decode("utf-8", errors="replace"))
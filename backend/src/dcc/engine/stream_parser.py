@@ -1,16 +1,125 @@
 import json
 import logging
+from typing import Any
 
 from dcc.engine.types import CliEvent
 
 logger = logging.getLogger(__name__)
 
+# Optional fast JSON decoders. Both accept bytes directly and skip the
+# utf-8 decode + str.strip round-trip of the stdlib path.
+try:
+    import orjson
 
-def parse_cli_line(line: str) -> CliEvent | None:
-    """Parse a single NDJSON line from Claude CLI stream-json output.
+    _fast_loads = orjson.loads
+    _FAST_DECODE_ERRORS: tuple[type[Exception], ...] = (orjson.JSONDecodeError,)
+    FAST_DECODER = "orjson"
+except ImportError:
+    try:
+        import msgspec
 
-    Returns None for empty lines or unparseable content.
+        _fast_loads = msgspec.json.Decoder().decode
+        _FAST_DECODE_ERRORS = (msgspec.DecodeError,)
+        FAST_DECODER = "msgspec"
+    except ImportError:
+        _fast_loads = None
+        _FAST_DECODE_ERRORS = ()
+        FAST_DECODER = "json"
+
+
+def _first_block_type(message: dict[str, Any]) -> str | None:
+    content_list = message.get("content", [])
+    if content_list:
+        first = content_list[0] if isinstance(content_list, list) else {}
+        return first.get("type") if isinstance(first, dict) else None
+    return None
+
+
+def _event_fields(data: dict[str, Any]) -> dict[str, Any]:
+    """Map a decoded stream-json object to CliEvent field values."""
+    event_type = data.get("type", "")
+
+    if event_type == "system":
+        return {
+            "type": "system",
+            "subtype": data.get("subtype"),
+            "session_id": data.get("session_id"),
+            "message": data,
+            "raw": data,
+        }
+
+    if event_type in ("assistant", "user"):
+        message = data.get("message", {})
+        return {
+            "type": event_type,
+            "subtype": _first_block_type(message),
+            "session_id": data.get("session_id"),
+            "message": message,
+            "raw": data,
+        }
+
+    if event_type == "result":
+        return {
+            "type": "result",
+            "session_id": data.get("session_id"),
+            "cost_usd": data.get("cost_usd"),
+            "duration_ms": data.get("duration_ms"),
+            "duration_api_ms": data.get("duration_api_ms"),
+            "num_turns": data.get("num_turns"),
+            "is_error": data.get("is_error", False),
+            "message": data,
+            "raw": data,
+        }
+
+    # Catch-all for unknown types (e.g., stream_event for partial messages)
+    return {
+        "type": event_type,
+        "subtype": data.get("subtype"),
+        "session_id": data.get("session_id"),
+        "message": data,
+        "raw": data,
+    }
+
+
+def _is_opt_str(value: Any) -> bool:
+    return value is None or type(value) is str
+
+
+def _is_opt_int(value: Any) -> bool:
+    return value is None or type(value) is int
+
+
+def _construct_event(fields: dict[str, Any]) -> CliEvent:
+    """Build a CliEvent without validation when the values already have the
+    exact field types; anything unusual goes through the validated constructor
+    so coercion and errors stay identical to parse_cli_line.
     """
+    if not (
+        type(fields["type"]) is str
+        and _is_opt_str(fields.get("subtype"))
+        and _is_opt_str(fields.get("session_id"))
+        and type(fields["message"]) is dict
+    ):
+        return CliEvent(**fields)
+
+    if fields["type"] == "result":
+        cost = fields["cost_usd"]
+        if type(cost) is int:
+            fields["cost_usd"] = float(cost)
+        elif not (cost is None or type(cost) is float):
+            return CliEvent(**fields)
+        if not (
+            _is_opt_int(fields["duration_ms"])
+            and _is_opt_int(fields["duration_api_ms"])
+            and _is_opt_int(fields["num_turns"])
+            and type(fields["is_error"]) is bool
+        ):
+            return CliEvent(**fields)
+
+    return CliEvent.model_construct(**fields)
+
+
+def _parse_text(line: str) -> dict[str, Any] | None:
     line = line.strip()
     if not line:
         return None
@@ -24,70 +133,40 @@ def parse_cli_line(line: str) -> CliEvent | None:
     if not isinstance(data, dict):
         return None
 
-    event_type = data.get("type", "")
+    return _event_fields(data)
 
-    if event_type == "system":
-        return CliEvent(
-            type="system",
-            subtype=data.get("subtype"),
-            session_id=data.get("session_id"),
-            message=data,
-            raw=data,
-        )
-
-    if event_type == "assistant":
-        message = data.get("message", {})
-        content_list = message.get("content", [])
-
-        # Determine subtype from content
-        subtype = None
-        if content_list:
-            first = content_list[0] if isinstance(content_list, list) else {}
-            subtype = first.get("type") if isinstance(first, dict) else None
-
-        return CliEvent(
-            type="assistant",
-            subtype=subtype,
-            session_id=data.get("session_id"),
-            message=message,
-            raw=data,
-        )
-
-    if event_type == "user":
-        message = data.get("message", {})
-        content_list = message.get("content", [])
 
-        subtype = None
-        if content_list:
-            first = content_list[0] if isinstance(content_list, list) else {}
-            subtype = first.get("type") if isinstance(first, dict) else None
+def parse_cli_line(line: str) -> CliEvent | None:
+    """Parse a single NDJSON line from Claude CLI stream-json output.
 
-        return CliEvent(
-            type="user",
-            subtype=subtype,
-            session_id=data.get("session_id"),
-            message=message,
-            raw=data,
-        )
+    Returns None for empty lines or unparseable content.
+    """
+    fields = _parse_text(line)
+    return CliEvent(**fields) if fields is not None else None
 
-    if event_type == "result":
-        return CliEvent(
-            type="result",
-            session_id=data.get("session_id"),
-            cost_usd=data.get("cost_usd"),
-            duration_ms=data.get("duration_ms"),
-            duration_api_ms=data.get("duration_api_ms"),
-            num_turns=data.get("num_turns"),
-            is_error=data.get("is_error", False),
-            message=data,
-            raw=data,
-        )
 
-    # Catch-all for unknown types (e.g., stream_event for partial messages)
-    return CliEvent(
-        type=event_type,
-        subtype=data.get("subtype"),
-        session_id=data.get("session_id"),
-        message=data,
-        raw=data,
-    )
+def parse_cli_bytes(line: bytes) -> CliEvent | None:
+    """Fast path of parse_cli_line for raw stdout lines.
+
+    Decodes bytes with orjson/msgspec when installed and builds the event
+    without per-field validation. Lines the fast decoder rejects (invalid
+    utf-8, NaN, huge ints, ...) are handed to parse_cli_line so the result
+    is always the same as decoding the line and calling parse_cli_line.
+    """
+    if _fast_loads is None:
+        fields = _parse_text(line.decode("utf-8", errors="replace"))
+        return _construct_event(fields) if fields is not None else None
+
+    line = line.strip()
+    if not line:
+        return None
+
+    try:
+        data = _fast_loads(line)
+    except _FAST_DECODE_ERRORS:
+        return parse_cli_line(line.decode("utf-8", errors="replace"))
+
+    if not isinstance(data, dict):
+        return None
+
+    return _construct_event(_event_fields(data))
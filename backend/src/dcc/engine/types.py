@@ -1,8 +1,24 @@
+import json
+from dataclasses import dataclass
 from enum import Enum
 from typing import Any
 
 from pydantic import BaseModel
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            pass  # e.g. ints beyond 64 bits in a raw CLI payload
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
 
 # --- CLI Events (from claude --output-format stream-json) ---
 
@@ -41,7 +57,10 @@ class AgUiEventType(str, Enum):
     CUSTOM = "Custom"
 
 
-class AgUiEvent(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class AgUiEvent:
+    """AG-UI event. Slotted and unvalidated: one is built per streamed event."""
+
     type: AgUiEventType
     session_id: str
     timestamp: str | None = None
@@ -55,6 +74,8 @@ class AgUiEvent(BaseModel):
     tool_input: str | None = None
     tool_result: str | None = None
     tool_is_error: bool | None = None
+    tool_result_ref: str | None = None  # blob sha256 of the full result
+    tool_result_size: int | None = None  # full result size in bytes
     # Run fields
     model: str | None = None
     cost_usd: float | None = None
@@ -69,6 +90,60 @@ class AgUiEvent(BaseModel):
     state: dict[str, Any] | None = None
     # Error
     error: str | None = None
+    error_code: str | None = None  # machine-readable RunError reason, e.g. "timeout"
     # Custom
     custom_type: str | None = None
     data: dict[str, Any] | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Non-None fields this event type carries, in declaration order."""
+        out: dict[str, Any] = {"type": self.type.value, "session_id": self.session_id}
+        for name in _FIELDS_BY_TYPE[self.type]:
+            value = getattr(self, name)
+            if value is not None:
+                out[name] = value
+        return out
+
+    def to_json(self) -> str:
+        """Compact JSON, same shape as model_dump_json(exclude_none=True) had."""
+        return _dumps(self.to_dict())
+
+
+_RUN_FIELDS = (
+    "timestamp",
+    "model",
+    "cost_usd",
+    "input_tokens",
+    "output_tokens",
+    "cache_read_tokens",
+    "cache_write_tokens",
+    "num_turns",
+    "duration_ms",
+    "cli_session_id",
+    "error",
+    "error_code",
+    "data",
+)
+
+# Fields serialized per event type (besides type/session_id). Precomputed so
+# to_json only looks at the handful of slots an event can actually carry.
+_FIELDS_BY_TYPE: dict[AgUiEventType, tuple[str, ...]] = {
+    AgUiEventType.RUN_STARTED: ("timestamp", "model", "cli_session_id"),
+    AgUiEventType.RUN_FINISHED: _RUN_FIELDS,
+    AgUiEventType.RUN_ERROR: _RUN_FIELDS,
+    AgUiEventType.TEXT_MESSAGE_START: ("timestamp", "message_id", "role"),
+    AgUiEventType.TEXT_MESSAGE_CONTENT: ("timestamp", "message_id", "text"),
+    AgUiEventType.TEXT_MESSAGE_END: ("timestamp", "message_id"),
+    AgUiEventType.TOOL_CALL_START: ("timestamp", "tool_call_id", "tool_name", "tool_input"),
+    AgUiEventType.TOOL_CALL_END: ("timestamp", "tool_call_id"),
+    AgUiEventType.TOOL_CALL_RESULT: (
+        "timestamp",
+        "tool_call_id",
+        "tool_result",
+        "tool_is_error",
+        "tool_result_ref",
+        "tool_result_size",
+    ),
+    AgUiEventType.STATE_SNAPSHOT: ("timestamp", "cli_session_id", "state"),
+    AgUiEventType.CUSTOM: ("timestamp", "custom_type", "data"),
+}
@@ -0,0 +1,143 @@
+"""Pool of pre-spawned Claude CLI processes waiting for a prompt on stdin.
+
+A cold CliRunner pays Node boot, config load from CLAUDE_CONFIG_DIR and MCP
+server startup before the first event. Pooled processes are started ahead of
+time in stream-json input mode and block on stdin until a run takes one and
+writes its prompt.
+
+Processes are single-use: each one serves exactly one run (one conversation),
+after which the pool spawns a replacement for the same key. Idle processes
+older than the TTL are terminated.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+from dcc.config import settings
+from dcc.engine.line_reader import DEFAULT_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Idle:
+    process: asyncio.subprocess.Process
+    spawned_at: float
+
+
+@dataclass
+class SpawnSpec:
+    """Everything needed to start an equivalent CLI process."""
+
+    key: Hashable
+    cmd: list[str]
+    env: dict[str, str]
+    cwd: str
+
+
+class WarmPool:
+    def __init__(self):
+        self._idle: dict[Hashable, list[_Idle]] = {}
+        self._spawning: dict[Hashable, int] = {}
+        self._reaper: asyncio.Task | None = None
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return settings.warm_pool_size > 0 and not self._closed
+
+    def acquire(self, key: Hashable) -> asyncio.subprocess.Process | None:
+        """Take a live idle process for key, or None if none is ready."""
+        idle = self._idle.get(key, [])
+        while idle:
+            entry = idle.pop(0)
+            if entry.process.returncode is None:
+                return entry.process
+            logger.info("Discarding dead pooled CLI (pid=%s)", entry.process.pid)
+        return None
+
+    def prewarm(self, spec: SpawnSpec) -> None:
+        """Top up the pool for spec.key in the background."""
+        if not self.enabled:
+            return
+        self._ensure_reaper()
+        have = len(self._idle.get(spec.key, [])) + self._spawning.get(spec.key, 0)
+        for _ in range(settings.warm_pool_size - have):
+            self._spawning[spec.key] = self._spawning.get(spec.key, 0) + 1
+            asyncio.create_task(self._spawn(spec))
+
+    async def _spawn(self, spec: SpawnSpec) -> None:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *spec.cmd,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=spec.cwd,
+                env=spec.env,
+                limit=DEFAULT_CHUNK_SIZE,
+            )
+        except OSError:
+            logger.exception("Failed to pre-spawn CLI for %s", spec.key)
+            return
+        finally:
+            self._spawning[spec.key] -= 1
+
+        if self._closed:
+            await _stop(process)
+            return
+        logger.info("Pre-spawned CLI (pid=%s) for %s", process.pid, spec.key)
+        self._idle.setdefault(spec.key, []).append(_Idle(process, time.monotonic()))
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_loop())
+
+    async def _reap_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(max(settings.warm_pool_idle_ttl_s / 4, 1))
+            cutoff = time.monotonic() - settings.warm_pool_idle_ttl_s
+            for key, idle in list(self._idle.items()):
+                expired = [e for e in idle if e.spawned_at < cutoff]
+                self._idle[key] = [e for e in idle if e.spawned_at >= cutoff]
+                for entry in expired:
+                    logger.info("Idle TTL expired for pooled CLI (pid=%s)", entry.process.pid)
+                    await _stop(entry.process)
+                if not self._idle[key]:
+                    del self._idle[key]
+
+    def stats(self) -> dict:
+        return {
+            "size": settings.warm_pool_size,
+            "idle": {str(k): len(v) for k, v in self._idle.items()},
+            "spawning": sum(self._spawning.values()),
+        }
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._reaper:
+            self._reaper.cancel()
+        for idle in self._idle.values():
+            for entry in idle:
+                await _stop(entry.process)
+        self._idle.clear()
+
+
+async def _stop(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
+    try:
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+    except ProcessLookupError:
+        pass
+
+
+warm_pool = WarmPool()
@@ -0,0 +1,215 @@
+"""Pool of git worktrees so parallel runs on one workspace don't share a tree.
+
+Each workspace gets up to settings.worktree_pool_size idle worktrees under
+{settings.worktree_dir}/{hash of workspace path}/. A run leases one, checked
+out (detached) at its base ref; on release any commits or edits the run made
+are saved on a `dcc/session-<id>` branch in the main repo and the worktree is
+reset and cleaned for the next run. Ignored files (node_modules, build
+caches) survive cleaning, which is what keeps a recycled worktree warm.
+"""
+
+import asyncio
+import hashlib
+import logging
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+
+from dcc.config import settings
+from dcc.engine.git_diff import _run_git
+from dcc.engine.git_helper import git_helpers
+
+logger = logging.getLogger(__name__)
+
+ISOLATION_WORKTREE = "worktree"
+GIT_WORKTREE_TIMEOUT_S = 300  # checkout of a big repo
+# Identity for snapshot commits of a run's leftover changes
+_COMMIT_IDENTITY = ("-c", "user.name=dcc", "-c", "user.email=dcc@localhost")
+
+
+class WorktreeError(RuntimeError):
+    pass
+
+
+@dataclass
+class Worktree:
+    workspace_path: str
+    path: str
+    base_ref: str | None = None
+
+
+def _pool_dir(workspace_path: str) -> Path:
+    digest = hashlib.sha1(str(Path(workspace_path).resolve()).encode()).hexdigest()[:12]
+    return Path(settings.worktree_dir).resolve() / digest
+
+
+def session_branch(session_id: str) -> str:
+    return f"dcc/session-{session_id}"
+
+
+class WorktreePool:
+    def __init__(self):
+        self._idle: dict[str, list[Worktree]] = {}
+        self._leased: dict[str, Worktree] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._adopted: set[str] = set()
+
+    def _lock(self, workspace_path: str) -> asyncio.Lock:
+        return self._locks.setdefault(workspace_path, asyncio.Lock())
+
+    async def acquire(
+        self, workspace_path: str, base_ref: str | None = None, path: str | None = None
+    ) -> Worktree:
+        """Lease a clean worktree checked out (detached) at base_ref (default HEAD).
+
+        path asks for that worktree in particular (created again if it was
+        discarded); WorktreeError if another run holds it.
+        """
+        ref = base_ref or "HEAD"
+        base = await git_helpers.get(workspace_path).resolve(f"{ref}^{{commit}}")
+        if not base:
+            raise WorktreeError(f"Cannot resolve base ref {ref!r}")
+
+        async with self._lock(workspace_path):
+            await self._adopt_existing(workspace_path)
+            idle = self._idle.setdefault(workspace_path, [])
+            if path is not None:
+                if path in self._leased:
+                    raise WorktreeError(f"Worktree {path} is in use by another run")
+                wt = next((w for w in idle if w.path == path), None)
+                if wt is not None:
+                    idle.remove(wt)
+                else:
+                    wt = await self._create(workspace_path, base, Path(path))
+            else:
+                wt = idle.pop() if idle else await self._create(workspace_path, base)
+            self._leased[wt.path] = wt
+
+        ok = await _run_git(
+            wt.path, "checkout", "--force", "--detach", base, timeout=GIT_WORKTREE_TIMEOUT_S
+        )
+        if ok is None:
+            self._leased.pop(wt.path, None)
+            await self._discard(wt)
+            raise WorktreeError(f"Failed to check out {base} in {wt.path}")
+        wt.base_ref = base
+        logger.info("Leased worktree %s at %s", wt.path, base[:12])
+        return wt
+
+    async def release(self, wt: Worktree, session_id: str) -> str | None:
+        """Save the run's changes on a session branch, clean up, return to pool.
+
+        Returns the branch name if the run left commits or edits, else None.
+        """
+        self._leased.pop(wt.path, None)
+        branch = None
+        try:
+            branch = await self._save_changes(wt, session_id)
+        except Exception:
+            logger.exception("Failed to save worktree changes for session %s", session_id)
+
+        reset = await _run_git(
+            wt.path, "reset", "--hard", "--quiet", timeout=GIT_WORKTREE_TIMEOUT_S
+        )
+        cleaned = await _run_git(wt.path, "clean", "-fd", "--quiet")
+        async with self._lock(wt.workspace_path):
+            idle = self._idle.setdefault(wt.workspace_path, [])
+            if reset is None or cleaned is None or len(idle) >= settings.worktree_pool_size:
+                await self._discard(wt)
+            else:
+                idle.append(wt)
+        return branch
+
+    async def _save_changes(self, wt: Worktree, session_id: str) -> str | None:
+        dirty = await _run_git(wt.path, "status", "--porcelain")
+        head = await git_helpers.get(wt.path).head()
+        if not dirty and head == wt.base_ref:
+            return None
+        if dirty:
+            await _run_git(wt.path, "add", "-A")
+            committed = await _run_git(
+                wt.path,
+                *_COMMIT_IDENTITY,
+                "commit",
+                "--quiet",
+                "--no-verify",
+                "-m",
+                f"dcc: uncommitted changes of session {session_id}",
+            )
+            if committed is None:
+                raise WorktreeError("snapshot commit failed")
+        branch = session_branch(session_id)
+        if await _run_git(wt.path, "branch", "--force", branch, "HEAD") is None:
+            raise WorktreeError(f"could not create branch {branch}")
+        logger.info("Saved session %s changes on branch %s", session_id, branch)
+        return branch
+
+    async def prewarm(self, workspace_path: str) -> None:
+        """Create idle worktrees at HEAD up to the pool size."""
+        head = await git_helpers.get(workspace_path).head()
+        if not head:
+            return
+        async with self._lock(workspace_path):
+            await self._adopt_existing(workspace_path)
+            idle = self._idle.setdefault(workspace_path, [])
+            while len(idle) + self._leased_count(workspace_path) < settings.worktree_pool_size:
+                try:
+                    idle.append(await self._create(workspace_path, head))
+                except WorktreeError:
+                    logger.exception("Worktree prewarm failed for %s", workspace_path)
+                    return
+
+    def _leased_count(self, workspace_path: str) -> int:
+        return sum(1 for wt in self._leased.values() if wt.workspace_path == workspace_path)
+
+    async def _adopt_existing(self, workspace_path: str) -> None:
+        """Pick up worktrees left by a previous server process (lock held)."""
+        if workspace_path in self._adopted:
+            return
+        self._adopted.add(workspace_path)
+        pool_dir = _pool_dir(workspace_path)
+        if not pool_dir.is_dir():
+            return
+        await _run_git(workspace_path, "worktree", "prune")
+        idle = self._idle.setdefault(workspace_path, [])
+        for entry in sorted(pool_dir.iterdir()):
+            if (entry / ".git").is_file() and str(entry) not in self._leased:
+                idle.append(Worktree(workspace_path, str(entry)))
+
+    async def _create(self, workspace_path: str, base: str, path: Path | None = None) -> Worktree:
+        pool_dir = _pool_dir(workspace_path)
+        pool_dir.mkdir(parents=True, exist_ok=True)
+        if path is None:
+            n = 0
+            while (pool_dir / f"wt-{n}").exists():
+                n += 1
+            path = pool_dir / f"wt-{n}"
+        out = await _run_git(
+            workspace_path,
+            "worktree",
+            "add",
+            "--detach",
+            "--quiet",
+            str(path),
+            base,
+            timeout=GIT_WORKTREE_TIMEOUT_S,
+        )
+        if out is None:
+            raise WorktreeError(f"git worktree add failed for {path}")
+        logger.info("Created worktree %s for %s", path, workspace_path)
+        return Worktree(workspace_path, str(path))
+
+    async def _discard(self, wt: Worktree) -> None:
+        removed = await _run_git(wt.workspace_path, "worktree", "remove", "--force", wt.path)
+        if removed is None:
+            shutil.rmtree(wt.path, ignore_errors=True)
+            await _run_git(wt.workspace_path, "worktree", "prune")
+
+    def stats(self) -> dict:
+        return {
+            "idle": {ws: len(v) for ws, v in self._idle.items()},
+            "leased": [wt.path for wt in self._leased.values()],
+        }
+
+
+worktree_pool = WorktreePool()
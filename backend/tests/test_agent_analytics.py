@@ -118,3 +118,33 @@ async def test_agent_comparison():
 
     empty = await repository.get_agent_comparison([])
     assert empty == []
+
+
+@pytest.mark.asyncio
+async def test_agent_usage_stats_resources():
+    s1 = await repository.create_session("w1", "p", agent="builder")
+    await repository.update_session_finished(s1, status="completed")
+    await repository.update_session_resources(
+        s1,
+        peak_rss_bytes=200_000_000,
+        cpu_user_s=10.0,
+        cpu_sys_s=2.5,
+        io_read_bytes=1000,
+        io_write_bytes=500,
+        max_children=3,
+    )
+    s2 = await repository.create_session("w1", "p", agent="builder")
+    await repository.update_session_finished(s2, status="completed")
+
+    stats = await repository.get_agent_usage_stats()
+    builder = stats[0]
+    assert builder["total_cpu_s"] == 12.5
+    assert builder["max_peak_rss_bytes"] == 200_000_000
+    # Sessions without samples don't drag the average down
+    assert builder["avg_peak_rss_bytes"] == 200_000_000
+
+    daily = await repository.get_resource_usage(days=1)
+    assert len(daily) == 1
+    assert daily[0]["sessions"] == 1
+    assert daily[0]["cpu_user_s"] == 10.0
+    assert daily[0]["max_children"] == 3
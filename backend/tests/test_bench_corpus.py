@@ -0,0 +1,49 @@
+"""Sanity checks for the benchmark corpus and baseline comparison."""
+
+from benchmarks.corpus import SCENARIOS, iter_corpus, to_ndjson
+from benchmarks.stream_pipeline import compare
+from dcc.engine.event_converter import PartialMessageConverter
+from dcc.engine.stream_parser import parse_cli_bytes
+from dcc.engine.types import AgUiEventType
+
+
+def test_corpus_is_deterministic():
+    for build in SCENARIOS.values():
+        assert to_ndjson(build()) == to_ndjson(build())
+
+
+def test_corpus_lines_convert_and_finish():
+    for name, lines in iter_corpus():
+        conv = PartialMessageConverter("bench")
+        types = []
+        for line in lines:
+            cli = parse_cli_bytes(line)
+            assert cli is not None, name
+            types.extend(ev.type for ev in conv.convert(cli))
+        assert types[0] == AgUiEventType.STATE_SNAPSHOT, name
+        assert types[-1] == AgUiEventType.RUN_FINISHED, name
+
+
+def test_tool_heavy_has_500_tool_calls():
+    lines = SCENARIOS["tool_heavy_500"]()
+    uses = [
+        b for ln in lines if ln["type"] == "assistant"
+        for b in ln["message"]["content"] if b["type"] == "tool_use"
+    ]
+    assert len(uses) == 500
+
+
+def test_compare_flags_regressions():
+    base = {"s": {"parse": {"items_per_sec": 1000, "p99_us": 10, "alloc_bytes_per_item": 100}}}
+    ok = {"s": {"parse": {"items_per_sec": 900, "p99_us": 12, "alloc_bytes_per_item": 110}}}
+    bad = {"s": {"parse": {"items_per_sec": 500, "p99_us": 30, "alloc_bytes_per_item": 200}}}
+    assert compare(ok, base, 0.25) == []
+    assert len(compare(bad, base, 0.25)) == 3
+
+
+def test_compare_scales_by_machine_speed():
+    base = {"s": {"parse": {"items_per_sec": 1000, "p99_us": 10, "alloc_bytes_per_item": 100}}}
+    slow = {"s": {"parse": {"items_per_sec": 500, "p99_us": 20, "alloc_bytes_per_item": 100}}}
+    # Half as fast across the board on a machine half as fast: no regression
+    assert len(compare(slow, base, 0.25)) == 2
+    assert compare(slow, base, 0.25, speed=0.5) == []
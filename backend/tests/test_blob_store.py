@@ -0,0 +1,126 @@
+"""Tests for the tool result blob store."""
+
+import os
+import time
+
+import pytest
+
+from dcc.engine.blob_store import BlobStore
+from dcc.engine.event_converter import MAX_TOOL_RESULT_LEN, convert_cli_event
+from dcc.engine.types import CliEvent
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    store = BlobStore(tmp_path)
+    digest, size = store.put("héllo\n".encode() * 1000)
+    assert size == len("héllo\n".encode()) * 1000
+    assert store.exists(digest)
+    assert store.get(digest) == "héllo\n".encode() * 1000
+
+
+def test_put_dedupes_identical_content(tmp_path):
+    store = BlobStore(tmp_path)
+    d1, _ = store.put_chunks([b"abc", b"def"])
+    d2, _ = store.put(b"abcdef")
+    assert d1 == d2
+    assert len(list(tmp_path.rglob("*.z"))) == 1
+
+
+def test_invalid_digest_rejected(tmp_path):
+    store = BlobStore(tmp_path)
+    assert not store.exists("../etc/passwd")
+    with pytest.raises(FileNotFoundError):
+        store.get("../../secret")
+
+
+def test_large_tool_result_stored_out_of_band(tmp_path):
+    store = BlobStore(tmp_path)
+    parts = [{"type": "text", "text": "x" * 3000}, {"type": "text", "text": "tail"}]
+    cli = CliEvent(
+        type="user",
+        message={"content": [{"type": "tool_result", "tool_use_id": "t1", "content": parts}]},
+    )
+    ev = convert_cli_event(cli, "s1", blob_store=store)[0]
+    assert ev.tool_result == "x" * MAX_TOOL_RESULT_LEN + "\n... [truncated]"
+    assert ev.tool_result_size == 3000 + 1 + 4
+    assert store.get(ev.tool_result_ref) == b"x" * 3000 + b"\ntail"
+
+
+def test_small_tool_result_has_no_blob(tmp_path):
+    store = BlobStore(tmp_path)
+    cli = CliEvent(
+        type="user",
+        message={"content": [{"type": "tool_result", "tool_use_id": "t1", "content": "ok"}]},
+    )
+    ev = convert_cli_event(cli, "s1", blob_store=store)[0]
+    assert ev.tool_result == "ok"
+    assert ev.tool_result_ref is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_put_chunks_streams_reiterables_and_buffers_generators(tmp_path):
+    store = BlobStore(tmp_path)
+
+    class Chunks:
+        passes = 0
+
+        def __iter__(self):
+            Chunks.passes += 1
+            yield from (b"abc", b"def")
+
+    d1, size = store.put_chunks(Chunks())
+    assert (d1, size) == (store.put(b"abcdef")[0], 6)
+    assert Chunks.passes == 2  # hashed, then compressed; never listed
+
+    d2, _ = store.put_chunks(c for c in (b"ab", b"cdef"))
+    assert d2 == d1
+
+
+def test_iter_range_slices_across_chunks(tmp_path):
+    store = BlobStore(tmp_path)
+    data = bytes(range(256)) * 2048  # several READ_CHUNKs once decompressed
+    digest, _ = store.put(data)
+    for offset, length in [(0, 10), (100_000, 300_000), (len(data) - 5, 5), (len(data), 10)]:
+        got = b"".join(store.iter_range(digest, offset, length))
+        assert got == data[offset : offset + length]
+
+
+def _age(store: BlobStore, digest: str, seconds: float) -> None:
+    path = store._path(digest)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_collect_removes_old_unreferenced_blobs(tmp_path):
+    store = BlobStore(tmp_path)
+    kept, _ = store.put(b"referenced")
+    gone, _ = store.put(b"orphan")
+    fresh, _ = store.put(b"just written")
+    _age(store, kept, 7200)
+    _age(store, gone, 7200)
+    (tmp_path / kept[:2] / "abandoned.tmp").write_bytes(b"partial")
+    os.utime(tmp_path / kept[:2] / "abandoned.tmp", (0, 0))
+
+    removed, freed = store.collect({kept}, grace_s=3600)
+    assert removed == 1 and freed > 0
+    assert store.exists(kept) and store.exists(fresh) and not store.exists(gone)
+    assert not (tmp_path / kept[:2] / "abandoned.tmp").exists()
+
+
+def test_put_again_restarts_grace_period(tmp_path):
+    store = BlobStore(tmp_path)
+    digest, _ = store.put(b"same content")
+    _age(store, digest, 7200)
+    store.put(b"same content")  # e.g. a new run producing it before its row exists
+    assert store.collect(set(), grace_s=3600) == (0, 0)
+
+
+def test_collect_evicts_oldest_over_size_cap(tmp_path):
+    store = BlobStore(tmp_path)
+    digests = [store.put(os.urandom(1000))[0] for _ in range(3)]
+    for age, digest in zip((300, 200, 100), digests):
+        _age(store, digest, age)
+
+    removed, _ = store.collect(set(digests), grace_s=3600, max_bytes=2500)
+    assert removed == 1
+    assert [store.exists(d) for d in digests] == [False, True, True]
@@ -0,0 +1,341 @@
+"""CliRunner end-to-end against the fake Claude CLI (benchmarks/fake_claude.py)."""
+
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from dcc.config import settings
+from dcc.engine import cli_runner
+from dcc.engine.cli_runner import CliRunner
+from dcc.engine.types import AgUiEventType
+from dcc.engine.warm_pool import WarmPool
+
+FAKE_CLAUDE = Path(__file__).resolve().parent.parent / "benchmarks" / "fake_claude.py"
+
+
+@pytest.fixture(autouse=True)
+def fake_cli(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "claude_bin", str(FAKE_CLAUDE))
+    monkeypatch.setattr(settings, "blob_dir", str(tmp_path / "blobs"))
+    monkeypatch.setenv("FAKE_CLAUDE_SEED", "7")
+
+
+async def _run(tmp_path, **kwargs) -> list:
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello", **kwargs)
+    return [ev async for ev in runner.run()]
+
+
+@pytest.mark.asyncio
+async def test_runner_replays_tool_session(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_CLAUDE_TOOLS", "5")
+    events = await _run(tmp_path)
+    types = [e.type for e in events]
+    assert types[0] == AgUiEventType.RUN_STARTED
+    assert types[-1] == AgUiEventType.RUN_FINISHED
+    assert types.count(AgUiEventType.TOOL_CALL_START) == 5
+    assert types.count(AgUiEventType.TOOL_CALL_RESULT) == 5
+
+
+@pytest.mark.asyncio
+async def test_runner_partial_messages(tmp_path):
+    events = await _run(tmp_path, partial_messages=True)
+    contents = [e for e in events if e.type == AgUiEventType.TEXT_MESSAGE_CONTENT]
+    starts = [e for e in events if e.type == AgUiEventType.TEXT_MESSAGE_START]
+    assert len(contents) > len(starts) > 0
+
+
+@pytest.mark.asyncio
+async def test_runner_crash_emits_run_error(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_CLAUDE_FAIL_RATE", "1")
+    monkeypatch.setenv("FAKE_CLAUDE_SCENARIO", "nested_tasks")
+    events = await _run(tmp_path)
+    assert events[-1].type == AgUiEventType.RUN_ERROR
+    assert "simulated crash" in events[-1].error
+
+
+@pytest.mark.asyncio
+async def test_runner_uses_warm_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "warm_pool_size", 1)
+    pool = WarmPool()
+    monkeypatch.setattr(cli_runner, "warm_pool", pool)
+
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello")
+    pool.prewarm(runner.spawn_spec())
+    for _ in range(100):
+        if pool.stats()["idle"]:
+            break
+        await asyncio.sleep(0.02)
+    pooled = pool._idle[runner.pool_key][0].process
+
+    events = [ev async for ev in runner.run()]
+    assert runner._process is pooled
+    assert events[-1].type == AgUiEventType.RUN_FINISHED
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_runner_idle_timeout(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_CLAUDE_STARTUP_MS", "5000")
+    started = asyncio.get_running_loop().time()
+    events = await _run(tmp_path, idle_timeout_s=0.3)
+    assert asyncio.get_running_loop().time() - started < 4
+    assert events[-1].type == AgUiEventType.RUN_ERROR
+    assert events[-1].error_code == "idle_timeout"
+
+
+@pytest.mark.asyncio
+async def test_busy_silent_cli_is_not_idle(tmp_path, monkeypatch):
+    # A long tool call: no stdout for a while, but the tree is burning CPU
+    monkeypatch.setattr(settings, "resource_sample_interval_s", 0.1)
+    monkeypatch.setenv("FAKE_CLAUDE_BURN_CPU_S", "1.5")
+    events = await _run(tmp_path, idle_timeout_s=0.4)
+    assert events[-1].type == AgUiEventType.RUN_FINISHED
+
+
+@pytest.mark.asyncio
+async def test_runner_total_timeout(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_CLAUDE_TOOLS", "50")
+    monkeypatch.setenv("FAKE_CLAUDE_LINE_DELAY_MS", "50")
+    events = await _run(tmp_path, timeout_s=0.5, idle_timeout_s=0)
+    assert events[-1].type == AgUiEventType.RUN_ERROR
+    assert events[-1].error_code == "timeout"
+    assert '"error_code":"timeout"' in events[-1].to_json()
+
+
+@pytest.mark.asyncio
+async def test_runner_within_budget_unaffected(tmp_path):
+    events = await _run(tmp_path, timeout_s=30, idle_timeout_s=10)
+    assert events[-1].type == AgUiEventType.RUN_FINISHED
+
+
+@pytest.mark.asyncio
+async def test_runner_drains_heavy_stderr(tmp_path, monkeypatch):
+    # Far more than a pipe buffer: would deadlock if stderr were read only at exit
+    monkeypatch.setenv("FAKE_CLAUDE_STDERR_BYTES", str(2 * 1024 * 1024))
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello", timeout_s=20)
+    events = [ev async for ev in runner.run()]
+    assert events[-1].type == AgUiEventType.RUN_FINISHED
+    assert runner.stderr_tail.total_bytes >= 2 * 1024 * 1024
+    assert len(runner.stderr_tail.text()) <= settings.cli_stderr_tail_bytes
+
+
+@pytest.mark.asyncio
+async def test_run_error_carries_stderr_tail(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_CLAUDE_FAIL_RATE", "1")
+    monkeypatch.setenv("FAKE_CLAUDE_SCENARIO", "nested_tasks")
+    events = await _run(tmp_path)
+    assert "simulated crash" in events[-1].data["stderr_tail"]
+
+
+@pytest.mark.asyncio
+async def test_runner_streams_stderr_events(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cli_stderr_events", True)
+    monkeypatch.setenv("FAKE_CLAUDE_STDERR_BYTES", "100")
+    events = await _run(tmp_path)
+    logs = [e for e in events if e.custom_type == "stderr"]
+    assert logs
+    assert any("debug log line" in line for e in logs for line in e.data["lines"])
+
+
+def test_build_command_resume_and_fork(tmp_path):
+    runner = CliRunner(
+        "s1", str(tmp_path), str(tmp_path), "more", resume_cli_session_id="abc", fork_session=True
+    )
+    cmd = runner._build_command()
+    assert cmd[cmd.index("--resume") + 1] == "abc"
+    assert "--fork-session" in cmd
+
+    plain = CliRunner("s1", str(tmp_path), str(tmp_path), "more", resume_cli_session_id="abc")
+    assert "--fork-session" not in plain._build_command()
+
+
+@pytest.mark.asyncio
+async def test_prompt_goes_over_stdin_not_argv(tmp_path, caplog):
+    prompt = "spec " * 200_000  # ~1 MB, beyond a single argv string's limit
+    source = {"type": "base64", "media_type": "image/png", "data": "AA=="}
+    attachment = {"type": "image", "source": source}
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), prompt, attachments=[attachment])
+    assert all(prompt not in arg for arg in runner._build_command())
+
+    message = json.loads(runner._stdin_message())
+    assert message["message"]["content"] == [{"type": "text", "text": prompt}, attachment]
+
+    with caplog.at_level(logging.INFO, logger="dcc.engine.cli_runner"):
+        events = [ev async for ev in runner.run()]
+    assert events[-1].type == AgUiEventType.RUN_FINISHED
+    assert "spec spec" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_run_finished_carries_cli_session_id(tmp_path):
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello", resume_cli_session_id="abc")
+    events = [ev async for ev in runner.run()]
+    assert runner.cli_session_id
+    assert events[-1].type == AgUiEventType.RUN_FINISHED
+    assert events[-1].cli_session_id == runner.cli_session_id
+
+
+@pytest.mark.asyncio
+async def test_runner_records_resource_usage(tmp_path, monkeypatch):
+    from dcc.engine.proc_stats import proc_available
+
+    if not proc_available():
+        pytest.skip("requires /proc")
+    monkeypatch.setenv("FAKE_CLAUDE_STARTUP_MS", "200")
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello")
+    [ev async for ev in runner.run()]
+    assert runner.resource_usage is not None
+    assert runner.resource_usage.samples >= 1
+    assert runner.resource_usage.peak_rss_bytes > 0
+
+
+@pytest.mark.asyncio
+async def test_runner_cpu_limit_breach(tmp_path, monkeypatch):
+    from dcc.engine.resource_limits import LIMIT_CPU, ResourceLimits
+
+    monkeypatch.setenv("FAKE_CLAUDE_BURN_CPU_S", "5")
+    events = await _run(tmp_path, resource_limits=ResourceLimits(cpu_s=1))
+    assert events[-1].type == AgUiEventType.RUN_ERROR
+    assert events[-1].error_code == LIMIT_CPU
+    assert events[-1].data["limits"] == {"cpu_s": 1}
+
+
+@pytest.mark.asyncio
+async def test_runner_isolated_in_worktree(tmp_path, monkeypatch):
+    import subprocess
+
+    monkeypatch.setattr(settings, "worktree_dir", str(tmp_path / "worktrees"))
+    monkeypatch.setenv("FAKE_CLAUDE_WRITE_FILE", "out.txt")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "out.txt").write_text("original\n")
+    for args in (
+        ["init", "-q"],
+        ["add", "out.txt"],
+        ["-c", "user.name=t", "-c", "user.email=t@e", "commit", "-qm", "i"],
+    ):
+        subprocess.run(["git", *args], cwd=repo, check=True)
+
+    runner = CliRunner("s1", str(repo), str(tmp_path), "hello", isolation="worktree")
+    events = [ev async for ev in runner.run()]
+
+    # The edit landed in the worktree, not the workspace
+    assert (repo / "out.txt").read_text() == "original\n"
+    worktree = next(e for e in events if e.custom_type == "worktree")
+    assert worktree.data["path"] != str(repo)
+    assert runner.worktree_branch == "dcc/session-s1"
+    assert events[-1].custom_type == "worktree_branch"
+    assert runner.diff_capture.files_changed == 1
+
+
+@pytest.mark.asyncio
+async def test_runner_streams_touched_files(tmp_path, monkeypatch):
+    import subprocess
+
+    monkeypatch.setattr(settings, "run_file_watch", True)
+    monkeypatch.setattr(settings, "file_watch_debounce_ms", 10)
+    monkeypatch.setenv("FAKE_CLAUDE_WRITE_FILE", "out.txt")
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+
+    runner = CliRunner("s1", str(repo), str(tmp_path), "hello")
+    events = [ev async for ev in runner.run()]
+
+    touched = [e for e in events if e.custom_type == "files_touched"]
+    assert [p for e in touched for p in e.data["paths"]] == ["out.txt"]
+    assert [(f.path, f.status) for f in runner.diff_capture.files] == [("out.txt", "A")]
+
+
+@pytest.mark.asyncio
+async def test_side_events_do_not_wait_for_stdout(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "cli_stderr_events", True)
+    monkeypatch.setattr(settings, "run_file_watch", True)
+    monkeypatch.setattr(settings, "file_watch_debounce_ms", 10)
+    monkeypatch.setenv("FAKE_CLAUDE_STDERR_BYTES", "100")
+    monkeypatch.setenv("FAKE_CLAUDE_WRITE_FILE", "out.txt")
+    monkeypatch.setenv("FAKE_CLAUDE_SILENT_MS", "2000")
+    loop = asyncio.get_running_loop()
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello")
+    arrivals = [(loop.time(), ev) async for ev in runner.run()]
+
+    first_line_at = next(t for t, ev in arrivals if ev.cli_session_id)
+    for kind in ("stderr", "files_touched"):
+        sent_at = next(t for t, ev in arrivals if ev.custom_type == kind)
+        assert sent_at < first_line_at - 1  # during the silence, not with the next line
+
+
+@pytest.mark.asyncio
+async def test_runner_diffs_non_git_workspace_from_manifests(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_CLAUDE_WRITE_FILE", "out.txt")
+    (tmp_path / "out.txt").write_text("before\n")
+
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello")
+    [ev async for ev in runner.run()]
+
+    capture = runner.diff_capture
+    assert [(f.path, f.status) for f in capture.files] == [("out.txt", "M")]
+    assert "-before\n+written by fake_claude" in capture.diff_content
+
+
+@pytest.mark.asyncio
+async def test_cancel_before_run_does_not_spawn(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "run_idle_timeout_s", 0)
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello")
+    await runner.cancel()
+    events = await asyncio.wait_for(_collect(runner), timeout=10)
+    assert events[-1].type == AgUiEventType.RUN_ERROR
+    assert events[-1].error_code == "cancelled"
+    assert runner._process is None
+
+
+@pytest.mark.asyncio
+async def test_cancel_mid_stream_stops_cli(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "run_idle_timeout_s", 0)
+    # Without a terminate this would keep writing for well over the timeout
+    monkeypatch.setenv("FAKE_CLAUDE_TOOLS", "5000")
+    monkeypatch.setenv("FAKE_CLAUDE_LINE_DELAY_MS", "5")
+    runner = CliRunner("s1", str(tmp_path), str(tmp_path), "hello")
+
+    async def consume():
+        async for ev in runner.run():
+            if ev.type == AgUiEventType.TOOL_CALL_START:
+                await runner.cancel()
+
+    await asyncio.wait_for(consume(), timeout=15)
+    assert runner._process.returncode is not None
+
+
+async def _collect(runner) -> list:
+    return [ev async for ev in runner.run()]
+
+
+@pytest.mark.asyncio
+async def test_runner_stores_large_tool_result_off_loop(tmp_path, monkeypatch):
+    big = "y" * 50_000
+    lines = [
+        {"type": "system", "subtype": "init", "session_id": "c1", "model": "m"},
+        {"type": "user", "message": {"content": [
+            {"type": "tool_result", "tool_use_id": "t1", "content": big}
+        ]}},
+        {"type": "result", "subtype": "success", "session_id": "c1", "result": "ok"},
+    ]
+    transcript = tmp_path / "t.ndjson"
+    transcript.write_text("".join(json.dumps(ln) + "\n" for ln in lines))
+    monkeypatch.setenv("FAKE_CLAUDE_TRANSCRIPT", str(transcript))
+
+    offloaded = []
+    real_to_thread = asyncio.to_thread
+
+    async def to_thread(fn, *args):
+        offloaded.append(getattr(fn, "__name__", fn))
+        return await real_to_thread(fn, *args)
+
+    monkeypatch.setattr(cli_runner.asyncio, "to_thread", to_thread)
+    events = await _run(tmp_path)
+    result = next(e for e in events if e.type == AgUiEventType.TOOL_CALL_RESULT)
+    assert result.tool_result_size == len(big)
+    assert "_convert_line" in offloaded
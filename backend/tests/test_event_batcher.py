@@ -0,0 +1,70 @@
+"""Tests for SSE micro-batching."""
+
+import asyncio
+
+import pytest
+
+from dcc.engine.event_batcher import coalesce_events
+from dcc.engine.types import AgUiEvent, AgUiEventType
+
+
+def _ev(t: AgUiEventType) -> AgUiEvent:
+    return AgUiEvent(type=t, session_id="s1")
+
+
+async def _source(items: list, delay_after: dict[int, float] | None = None):
+    for i, item in enumerate(items):
+        yield item
+        if delay_after and i in delay_after:
+            await asyncio.sleep(delay_after[i])
+
+
+@pytest.mark.asyncio
+async def test_burst_is_one_batch():
+    items = [
+        _ev(AgUiEventType.TEXT_MESSAGE_START),
+        _ev(AgUiEventType.TEXT_MESSAGE_CONTENT),
+        _ev(AgUiEventType.TEXT_MESSAGE_END),
+    ]
+    batches = [b async for b in coalesce_events(_source(items), 0.05, 64)]
+    assert len(batches) == 1
+    assert [e.type for e in batches[0]] == [e.type for e in items]
+
+
+@pytest.mark.asyncio
+async def test_window_expiry_splits_batches():
+    items = [_ev(AgUiEventType.TEXT_MESSAGE_CONTENT), _ev(AgUiEventType.TEXT_MESSAGE_CONTENT)]
+    batches = [b async for b in coalesce_events(_source(items, {0: 0.05}), 0.005, 64)]
+    assert [len(b) for b in batches] == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_max_events_caps_batch():
+    items = [_ev(AgUiEventType.TEXT_MESSAGE_CONTENT) for _ in range(5)]
+    batches = [b async for b in coalesce_events(_source(items), 0.05, 2)]
+    assert [len(b) for b in batches] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_terminal_event_flushes_immediately():
+    items = [
+        _ev(AgUiEventType.TEXT_MESSAGE_CONTENT),
+        _ev(AgUiEventType.RUN_FINISHED),
+        _ev(AgUiEventType.CUSTOM),
+    ]
+    batches = [b async for b in coalesce_events(_source(items), 0.05, 64)]
+    assert [len(b) for b in batches] == [2, 1]
+    assert batches[0][-1].type == AgUiEventType.RUN_FINISHED
+
+
+@pytest.mark.asyncio
+async def test_source_error_propagates():
+    async def failing():
+        yield _ev(AgUiEventType.RUN_STARTED)
+        raise RuntimeError("boom")
+
+    received = []
+    with pytest.raises(RuntimeError, match="boom"):
+        async for b in coalesce_events(failing(), 0.05, 64):
+            received.extend(b)
+    assert len(received) == 1
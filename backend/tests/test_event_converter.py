@@ -1,5 +1,7 @@
-from dcc.engine.event_converter import convert_cli_event
-from dcc.engine.types import AgUiEventType, CliEvent
+import json
+
+from dcc.engine.event_converter import PartialMessageConverter, convert_cli_event
+from dcc.engine.types import AgUiEvent, AgUiEventType, CliEvent
 
 
 SESSION = "test-session-1"
@@ -176,3 +178,109 @@ def test_unknown_event_returns_empty():
     cli = CliEvent(type="something_else")
     events = convert_cli_event(cli, SESSION)
     assert events == []
+
+
+def test_event_to_json_skips_none_fields():
+    ev = AgUiEvent(
+        type=AgUiEventType.TOOL_CALL_RESULT,
+        session_id=SESSION,
+        timestamp="2025-01-01T00:00:00+00:00",
+        tool_call_id="tool_abc",
+        tool_result="ñ ok",
+        tool_is_error=False,
+    )
+    assert json.loads(ev.to_json()) == {
+        "type": "ToolCallResult",
+        "session_id": SESSION,
+        "timestamp": "2025-01-01T00:00:00+00:00",
+        "tool_call_id": "tool_abc",
+        "tool_result": "ñ ok",
+        "tool_is_error": False,
+    }
+    assert ev.to_json().startswith('{"type":"ToolCallResult","session_id":')
+    assert "ñ" in ev.to_json()
+
+
+def test_run_finished_to_json():
+    ev = AgUiEvent(
+        type=AgUiEventType.RUN_FINISHED,
+        session_id=SESSION,
+        cost_usd=0.042,
+        num_turns=3,
+        model="claude-sonnet-4-20250514",
+    )
+    assert json.loads(ev.to_json()) == {
+        "type": "RunFinished",
+        "session_id": SESSION,
+        "model": "claude-sonnet-4-20250514",
+        "cost_usd": 0.042,
+        "num_turns": 3,
+    }
+
+
+def _stream(event: dict) -> CliEvent:
+    return CliEvent(type="stream_event", raw={"type": "stream_event", "event": event})
+
+
+def test_partial_text_deltas_share_message_id():
+    conv = PartialMessageConverter(SESSION)
+    events = []
+    for ev in [
+        {"type": "message_start", "message": {"id": "msg_1", "content": []}},
+        {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Hel"}},
+        {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "lo"}},
+        {"type": "content_block_stop", "index": 0},
+    ]:
+        events.extend(conv.convert(_stream(ev)))
+
+    types = [e.type for e in events]
+    assert types == [
+        AgUiEventType.TEXT_MESSAGE_START,
+        AgUiEventType.TEXT_MESSAGE_CONTENT,
+        AgUiEventType.TEXT_MESSAGE_CONTENT,
+        AgUiEventType.TEXT_MESSAGE_END,
+    ]
+    assert len({e.message_id for e in events}) == 1
+    assert "".join(e.text for e in events if e.text) == "Hello"
+
+    # The complete assistant message for the streamed id is not re-emitted
+    full = CliEvent(
+        type="assistant",
+        message={"id": "msg_1", "content": [{"type": "text", "text": "Hello"}]},
+    )
+    assert conv.convert(full) == []
+
+
+def test_partial_tool_input_assembled():
+    conv = PartialMessageConverter(SESSION)
+    events = []
+    for ev in [
+        {"type": "message_start", "message": {"id": "msg_2"}},
+        {
+            "type": "content_block_start",
+            "index": 1,
+            "content_block": {"type": "tool_use", "id": "toolu_1", "name": "Read", "input": {}},
+        },
+        {"type": "content_block_delta", "index": 1,
+         "delta": {"type": "input_json_delta", "partial_json": '{"file_'}},
+        {"type": "content_block_delta", "index": 1,
+         "delta": {"type": "input_json_delta", "partial_json": 'path": "/tmp/a.py"}'}},
+        {"type": "content_block_stop", "index": 1},
+    ]:
+        events.extend(conv.convert(_stream(ev)))
+
+    assert [e.type for e in events] == [AgUiEventType.TOOL_CALL_START, AgUiEventType.TOOL_CALL_END]
+    assert events[0].tool_call_id == "toolu_1"
+    assert json.loads(events[0].tool_input) == {"file_path": "/tmp/a.py"}
+
+
+def test_partial_converter_passes_through_other_events():
+    conv = PartialMessageConverter(SESSION)
+    cli = CliEvent(
+        type="assistant",
+        message={"id": "msg_sub", "content": [{"type": "text", "text": "from subagent"}]},
+    )
+    events = conv.convert(cli)
+    assert len(events) == 3
+    assert events[1].text == "from subagent"
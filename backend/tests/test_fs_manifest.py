@@ -0,0 +1,139 @@
+"""Tests for manifest-based diff capture in non-git workspaces."""
+
+import os
+import time
+
+import pytest
+
+from dcc.config import settings
+from dcc.engine import fs_manifest
+from dcc.engine.fs_manifest import (
+    ManifestCache,
+    build_manifest,
+    compute_manifest_diff,
+    diff_manifests,
+    get_copies,
+    prune_copies,
+    snapshot_manifest,
+)
+from dcc.engine.git_diff import parse_diff_stat
+
+
+@pytest.fixture
+def ws(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "blob_dir", str(tmp_path / "blobs"))
+    monkeypatch.setattr(fs_manifest, "manifest_cache", ManifestCache())
+    root = tmp_path / "ws"
+    (root / "src").mkdir(parents=True)
+    (root / "src" / "app.py").write_text("a = 1\nb = 2\n")
+    (root / "gone.txt").write_text("bye\n")
+    (root / "logo.png").write_bytes(b"\x89PNG\0\0data")
+    (root / "node_modules" / "dep").mkdir(parents=True)
+    (root / "node_modules" / "dep" / "index.js").write_text("skip\n")
+    return root
+
+
+def test_manifest_walks_tree_and_skips_dependency_dirs(ws):
+    manifest = build_manifest(str(ws))
+    assert sorted(manifest.entries) == ["gone.txt", "logo.png", "src/app.py"]
+    # Copies of text files only, and none in the blob store proper
+    assert {rel for rel, e in manifest.entries.items() if e.stored} == {"gone.txt", "src/app.py"}
+    assert [p.parent.parent.name for p in (ws.parent / "blobs").rglob("*.z")] == ["manifest"] * 2
+
+
+def test_manifest_copies_capped_per_snapshot(ws, monkeypatch):
+    monkeypatch.setattr(settings, "manifest_copy_max_bytes", 10)
+    manifest = build_manifest(str(ws))
+    stored = [rel for rel, e in manifest.entries.items() if e.stored]
+    assert stored == ["gone.txt"]  # "a = 1\nb = 2\n" doesn't fit in what's left
+
+
+def test_manifest_reuses_hashes_for_unchanged_stat(ws, monkeypatch):
+    first = build_manifest(str(ws))
+    first.taken_ns += 10 * fs_manifest.RACY_NS  # as if taken well after the writes
+    hashed = []
+    real = fs_manifest._hash_file
+    monkeypatch.setattr(
+        fs_manifest,
+        "_hash_file",
+        lambda root, rel, *args: hashed.append(rel) or real(root, rel, *args),
+    )
+    (ws / "new.txt").write_text("n\n")
+    second = build_manifest(str(ws), first)
+    assert hashed == ["new.txt"]
+    assert second.entries["src/app.py"] is first.entries["src/app.py"]
+
+
+def test_expired_copies_are_pruned_and_rewritten(ws, monkeypatch):
+    first = build_manifest(str(ws))
+    first.taken_ns += 10 * fs_manifest.RACY_NS
+    copies = get_copies()
+    app_digest = first.entries["src/app.py"].digest
+    stale = time.time() - settings.manifest_copy_retention_s - 60
+    for path in copies.root.rglob("*.z"):
+        os.utime(path, (stale, stale))
+
+    # Reused by the next snapshot: kept alive
+    second = build_manifest(str(ws), first)
+    assert second.entries["src/app.py"] is first.entries["src/app.py"]
+    assert prune_copies(force=True) == 0
+
+    for path in copies.root.rglob("*.z"):
+        os.utime(path, (stale, stale))
+    assert prune_copies(force=True) == 2
+    assert copies.get(app_digest) is None
+    # A manifest whose copy expired hashes the file again
+    third = build_manifest(str(ws), first)
+    assert third.entries["src/app.py"] is not first.entries["src/app.py"]
+    assert copies.get(app_digest) == b"a = 1\nb = 2\n"
+
+
+def test_manifest_too_many_files(ws, monkeypatch):
+    monkeypatch.setattr(settings, "manifest_max_files", 2)
+    assert build_manifest(str(ws)) is None
+    assert snapshot_manifest(str(ws)) is None
+
+
+@pytest.mark.asyncio
+async def test_manifest_diff_covers_changed_files_only(ws):
+    before = snapshot_manifest(str(ws))
+    (ws / "src" / "app.py").write_text("a = 1\nb = 3\nc = 4\n")
+    (ws / "gone.txt").unlink()
+    (ws / "docs").mkdir()
+    (ws / "docs" / "new.md").write_text("# New\n")
+    (ws / "logo.png").write_bytes(b"\x89PNG\0\0other")
+
+    capture = await compute_manifest_diff(str(ws), before)
+    assert [(f.path, f.status, f.insertions, f.deletions, f.binary) for f in capture.files] == [
+        ("docs/new.md", "A", 1, 0, False),
+        ("gone.txt", "D", 0, 1, False),
+        ("logo.png", "M", 0, 0, True),
+        ("src/app.py", "M", 2, 1, False),
+    ]
+    data = capture.diff_content.encode()
+    app = capture.files[-1]
+    section = data[app.offset : app.offset + app.length].decode()
+    assert section.startswith("diff --git a/src/app.py b/src/app.py\n--- a/src/app.py")
+    assert "-b = 2\n+b = 3\n+c = 4" in section
+    assert "Binary files a/logo.png and b/logo.png differ" in capture.diff_content
+    assert "+++ /dev/null" in capture.diff_content
+    assert parse_diff_stat(capture.diff_stat) == (4, 3, 2)
+
+
+@pytest.mark.asyncio
+async def test_manifest_diff_limited_to_touched_paths(ws):
+    before = snapshot_manifest(str(ws))
+    (ws / "src" / "app.py").write_text("changed\n")
+    (ws / "gone.txt").unlink()
+    (ws / "pkg").mkdir()
+    (ws / "pkg" / "mod.py").write_text("x\n")
+
+    # Only what the watcher reported is looked at
+    capture = await compute_manifest_diff(str(ws), before, ["gone.txt", "pkg"])
+    assert [(f.path, f.status) for f in capture.files] == [("gone.txt", "D"), ("pkg/mod.py", "A")]
+
+
+def test_no_changes_no_diff(ws):
+    before = build_manifest(str(ws))
+    capture = diff_manifests(str(ws), before, build_manifest(str(ws), before))
+    assert capture.diff_content is None and capture.files == []
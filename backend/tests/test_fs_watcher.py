@@ -0,0 +1,78 @@
+"""Tests for live file-change tracking (inotify and polling)."""
+
+import subprocess
+import time
+
+import pytest
+
+from dcc.engine.fs_watcher import FileWatcher
+
+
+def _repo(tmp_path):
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    (tmp_path / ".gitignore").write_text("*.log\nbuild/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "keep.txt").write_text("k\n")
+    (tmp_path / "old.txt").write_text("o\n")
+    return tmp_path
+
+
+def _wait_for(watcher: FileWatcher, expected: set[str], timeout: float = 5) -> list[list[str]]:
+    batches = []
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if batch := watcher.drain():
+            batches.append(batch)
+        if {p for b in batches for p in b} >= expected:
+            break
+        time.sleep(0.02)
+    return batches
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_reports_touched_files(tmp_path, use_inotify):
+    root = _repo(tmp_path)
+    watcher = FileWatcher(str(root), debounce_s=0.05, poll_interval_s=0.05, use_inotify=use_inotify)
+    watcher.start()
+    try:
+        assert watcher.mode == ("inotify" if use_inotify else "poll")
+        (root / "new.txt").write_text("n\n")
+        (root / "old.txt").unlink()
+        (root / "pkg" / "sub").mkdir(parents=True)
+        (root / "pkg" / "sub" / "mod.py").write_text("x = 1\n")
+        (root / "run.log").write_text("ignored\n")
+        (root / "build" / "out.bin").write_text("ignored\n")
+        (root / ".git" / "scratch").write_text("ignored\n")
+        expected = {"new.txt", "old.txt", "pkg/sub/mod.py"}
+        batches = _wait_for(watcher, expected)
+    finally:
+        watcher.stop()
+    assert {p for b in batches for p in b} == expected
+    assert watcher.touched == expected and watcher.complete
+
+
+def test_watcher_debounces_and_reports_each_path_once(tmp_path):
+    root = _repo(tmp_path)
+    watcher = FileWatcher(str(root), debounce_s=0.3)
+    watcher.start()
+    try:
+        for i in range(5):
+            (root / "keep.txt").write_text(f"{i}\n")
+            time.sleep(0.02)
+        assert watcher.drain() == []  # still inside the debounce window
+        batches = _wait_for(watcher, {"keep.txt"})
+        (root / "keep.txt").write_text("again\n")
+        time.sleep(0.5)
+        assert watcher.drain() == []  # already reported
+    finally:
+        watcher.stop()
+    assert batches == [["keep.txt"]]
+
+
+def test_stop_picks_up_changes_made_just_before(tmp_path):
+    watcher = FileWatcher(str(tmp_path), debounce_s=10)
+    watcher.start()
+    (tmp_path / "last.txt").write_text("x\n")
+    watcher.stop()
+    assert watcher.drain() == ["last.txt"]
+    watcher.stop()  # idempotent
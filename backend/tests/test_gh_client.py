@@ -1,90 +1,169 @@
-"""Tests for gh CLI client (mocked subprocess)."""
+"""Tests for the GitHub API client against a local stub server."""
 
-import asyncio
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 import pytest
-
-from dcc.engine.gh_client import GhError, gh_api
-
-
-def _make_process(stdout: bytes = b"", stderr: bytes = b"", returncode: int = 0):
-    """Create a mock asyncio.subprocess.Process."""
-    proc = MagicMock()
-    proc.returncode = returncode
-    proc.communicate = AsyncMock(return_value=(stdout, stderr))
-    return proc
+import pytest_asyncio
+
+from dcc.config import settings
+from dcc.engine import gh_client as gh_module
+from dcc.engine.gh_client import GhClient, GhError, gh_api
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    routes: dict = {}
+    requests: list = []
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        _Stub.connections += 1
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        _Stub.requests.append((self.command, self.path, dict(self.headers), body))
+        status, payload, delay = self.routes.get((self.command, self.path), (404, None, 0))
+        time.sleep(delay)
+        if payload is None:
+            payload = json.dumps({"message": "Not Found"}).encode()
+        elif not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):  # noqa: N802
+        self._handle()
+
+    def do_POST(self):  # noqa: N802
+        self._handle()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    _Stub.routes, _Stub.requests, _Stub.connections = {}, [], 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    monkeypatch.setattr(settings, "github_api_url", f"http://127.0.0.1:{server.server_port}")
+
+    # A fake `gh` that logs each call and prints a token
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    gh = bin_dir / "gh"
+    gh.write_text(f'#!/bin/sh\necho "$@" >> {tmp_path}/gh_calls\necho "$FAKE_GH_TOKEN"\n')
+    gh.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_GH_TOKEN", "tok-1")
+    yield _Stub
+    server.shutdown()
+    server.server_close()
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def fresh_client(monkeypatch):
+    client = GhClient()
+    monkeypatch.setattr(gh_module, "gh_client", client)
+    yield client
+    await client.close()
+
+
+def _gh_args(tmp_path) -> list[str]:
+    return (tmp_path / "gh_calls").read_text().splitlines()
+
+
+def _gh_calls(tmp_path) -> int:
+    path = tmp_path / "gh_calls"
+    return len(path.read_text().splitlines()) if path.exists() else 0
 
 
 @pytest.mark.asyncio
-async def test_gh_api_success():
-    data = [{"number": 1, "title": "Issue 1"}]
-    proc = _make_process(stdout=json.dumps(data).encode())
+async def test_gh_api_success_reuses_token_and_connection(stub, tmp_path):
+    stub.routes[("GET", "/repos/owner/repo/issues?state=open")] = (200, [{"number": 1}], 0)
+    for _ in range(3):
+        result = await gh_api("/repos/owner/repo/issues?state=open")
+        assert result == [{"number": 1}]
 
-    with patch("dcc.engine.gh_client.asyncio.create_subprocess_exec", return_value=proc):
-        result = await gh_api("/repos/owner/repo/issues")
-
-    assert isinstance(result, list)
-    assert result[0]["number"] == 1
+    assert _gh_calls(tmp_path) == 1
+    assert stub.connections == 1
+    headers = stub.requests[0][2]
+    assert headers["Authorization"] == "Bearer tok-1"
+    assert headers["Accept"] == "application/vnd.github+json"
 
 
 @pytest.mark.asyncio
-async def test_gh_api_error_exit():
-    proc = _make_process(stderr=b"Not Found", returncode=1)
-
-    with patch("dcc.engine.gh_client.asyncio.create_subprocess_exec", return_value=proc):
-        with pytest.raises(GhError, match="Not Found"):
-            await gh_api("/repos/owner/repo/issues")
+async def test_gh_api_post_sends_json_body(stub):
+    stub.routes[("POST", "/repos/owner/repo/issues")] = (201, {"number": 7}, 0)
+    result = await gh_api("/repos/owner/repo/issues", method="POST", body={"title": "Bug"})
+    assert result == {"number": 7}
+    assert json.loads(stub.requests[0][3]) == {"title": "Bug"}
 
 
 @pytest.mark.asyncio
-async def test_gh_api_timeout():
-    async def slow_communicate(input=None):
-        await asyncio.sleep(100)
-        return b"", b""
+async def test_gh_api_error_status(stub):
+    with pytest.raises(GhError, match=r"Not Found \(HTTP 404\)") as exc:
+        await gh_api("/repos/owner/missing/issues")
+    assert exc.value.exit_code == 1
 
-    proc = MagicMock()
-    proc.communicate = slow_communicate
 
-    with patch("dcc.engine.gh_client.asyncio.create_subprocess_exec", return_value=proc):
-        with patch("dcc.engine.gh_client.GH_TIMEOUT_S", 0.01):
-            with pytest.raises(GhError, match="timeout"):
-                await gh_api("/repos/owner/repo/issues")
+@pytest.mark.asyncio
+async def test_gh_api_401_rereads_token(stub, tmp_path, monkeypatch):
+    stub.routes[("GET", "/user")] = (401, {"message": "Bad credentials"}, 0)
+    with pytest.raises(GhError, match="Bad credentials"):
+        await gh_api("/user")
+    monkeypatch.setenv("FAKE_GH_TOKEN", "tok-2")
+    stub.routes[("GET", "/user")] = (200, {"login": "me"}, 0)
+    assert await gh_api("/user") == {"login": "me"}
+    assert stub.requests[-1][2]["Authorization"] == "Bearer tok-2"
+    assert _gh_calls(tmp_path) == 2
 
 
 @pytest.mark.asyncio
-async def test_gh_api_invalid_json():
-    proc = _make_process(stdout=b"not json {{{")
-
-    with patch("dcc.engine.gh_client.asyncio.create_subprocess_exec", return_value=proc):
-        with pytest.raises(GhError, match="invalid JSON"):
-            await gh_api("/repos/owner/repo/issues")
+async def test_gh_api_timeout(stub, monkeypatch):
+    monkeypatch.setattr(gh_module, "GH_TIMEOUT_S", 0.05)
+    stub.routes[("GET", "/slow")] = (200, {}, 0.5)
+    with pytest.raises(GhError, match="timeout"):
+        await gh_api("/slow")
 
 
 @pytest.mark.asyncio
-async def test_gh_api_post_with_body():
-    response = {"number": 42, "title": "New Issue"}
-    proc = _make_process(stdout=json.dumps(response).encode())
+async def test_gh_api_invalid_json(stub):
+    stub.routes[("GET", "/broken")] = (200, b"not json{", 0)
+    with pytest.raises(GhError, match="invalid JSON"):
+        await gh_api("/broken")
 
-    with patch("dcc.engine.gh_client.asyncio.create_subprocess_exec", return_value=proc) as mock_exec:
-        result = await gh_api(
-            "/repos/owner/repo/issues",
-            method="POST",
-            body={"title": "New Issue", "body": "Description"},
-        )
 
-    assert result["number"] == 42
-    # Verify --input - was passed for stdin
-    call_args = mock_exec.call_args
-    assert "--input" in call_args[0]
+@pytest.mark.asyncio
+async def test_gh_api_empty_body(stub):
+    stub.routes[("GET", "/empty")] = (200, b"", 0)
+    assert await gh_api("/empty") == {}
 
 
 @pytest.mark.asyncio
-async def test_gh_api_empty_response():
-    proc = _make_process(stdout=b"")
+async def test_gh_not_logged_in(stub, tmp_path):
+    (tmp_path / "bin" / "gh").write_text("#!/bin/sh\necho 'not logged in' >&2\nexit 4\n")
+    with pytest.raises(GhError, match="not logged in") as exc:
+        await gh_api("/user")
+    assert exc.value.exit_code == 4
 
-    with patch("dcc.engine.gh_client.asyncio.create_subprocess_exec", return_value=proc):
-        result = await gh_api("/repos/owner/repo/milestones")
 
-    assert result == {}
+@pytest.mark.asyncio
+async def test_token_for_enterprise_host(stub, tmp_path, monkeypatch):
+    # The stub stands in for a GitHub Enterprise host
+    stub.routes[("GET", "/user")] = (200, {"login": "me"}, 0)
+    await gh_api("/user")
+    assert _gh_args(tmp_path) == ["auth token --hostname 127.0.0.1"]
+
+    monkeypatch.setattr(settings, "github_api_url", "https://api.github.com")
+    assert await gh_module._gh_auth_token() == "tok-1"
+    assert _gh_args(tmp_path)[-1] == "auth token"
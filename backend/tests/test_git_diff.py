@@ -1,8 +1,18 @@
 """Tests for git diff parsing utilities."""
 
+import subprocess
+
 import pytest
 
-from dcc.engine.git_diff import capture_head_ref, parse_diff_stat
+from dcc.engine.git_diff import (
+    DIFF_PREVIEW_SIZE,
+    capture_head_ref,
+    compute_session_diff,
+    format_diff_stat,
+    parse_diff_stat,
+    parse_numstat_patch,
+    snapshot_tree,
+)
 
 
 def test_parse_diff_stat_basic():
@@ -40,3 +50,151 @@ def test_parse_diff_stat_empty():
 async def test_capture_head_ref_not_git_repo(tmp_path):
     result = await capture_head_ref(str(tmp_path))
     assert result is None
+
+
+def test_parse_numstat_patch_with_rename_and_binary():
+    out = (
+        "2\t1\ta.txt\0-\t-\tbin.dat\0" "0\t0\t\0old.txt\0new.txt\0"
+        "\0diff --git a/a.txt b/a.txt\n+c"
+    )
+    files, patch = parse_numstat_patch(out)
+    assert [(f.path, f.old_path, f.insertions, f.deletions, f.binary) for f in files] == [
+        ("a.txt", None, 2, 1, False),
+        ("bin.dat", None, 0, 0, True),
+        ("new.txt", "old.txt", 0, 0, False),
+    ]
+    assert patch == "diff --git a/a.txt b/a.txt\n+c"
+    assert parse_diff_stat(format_diff_stat(files)) == (3, 2, 1)
+
+
+def _git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@e", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_compute_session_diff_commits_and_edits(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "a.txt").write_text("a\nb\n")
+    (tmp_path / "b.txt").write_text("keep\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-qm", "init")
+    head = await capture_head_ref(str(tmp_path))
+
+    # One committed change and one uncommitted edit
+    (tmp_path / "a.txt").write_text("a\nc\nd\n")
+    _git(tmp_path, "commit", "-qam", "edit a")
+    (tmp_path / "b.txt").write_text("keep\nmore\n")
+
+    capture = await compute_session_diff(str(tmp_path), head)
+    assert [f.path for f in capture.files] == ["a.txt", "b.txt"]
+    assert (capture.files_changed, capture.insertions, capture.deletions) == (2, 3, 1)
+    assert "# Commits" in capture.diff_content and "edit a" in capture.diff_content
+    assert "+more" in capture.diff_content and "+d" in capture.diff_content
+    assert "2 files changed" in capture.diff_stat
+
+
+@pytest.mark.asyncio
+async def test_compute_session_diff_no_changes(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "commit", "-q", "--allow-empty", "-m", "init")
+    head = await capture_head_ref(str(tmp_path))
+    capture = await compute_session_diff(str(tmp_path), head)
+    assert capture.diff_content is None and capture.files_changed == 0
+
+
+@pytest.mark.asyncio
+async def test_compute_session_diff_indexes_files_untruncated(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "gone.txt").write_text("bye\n")
+    (tmp_path / "old.txt").write_text("".join(f"line {i}\n" for i in range(50)))
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-qm", "init")
+    head = await capture_head_ref(str(tmp_path))
+
+    (tmp_path / "gone.txt").unlink()
+    _git(tmp_path, "mv", "old.txt", "renamed.txt")
+    (tmp_path / "big.txt").write_text("x" * 100 + "\n" + "é\n" * 40_000)
+    _git(tmp_path, "add", "-A")
+    _git(tmp_path, "commit", "-qm", "reshuffle")
+
+    capture = await compute_session_diff(str(tmp_path), head)
+    assert len(capture.diff_content) > DIFF_PREVIEW_SIZE
+    by_path = {f.path: f for f in capture.files}
+    assert {p: f.status for p, f in by_path.items()} == {
+        "big.txt": "A",
+        "gone.txt": "D",
+        "renamed.txt": "R",
+    }
+    data = capture.diff_content.encode()
+    for f in capture.files:
+        section = data[f.offset : f.offset + f.length].decode()
+        assert section.startswith(f"diff --git a/{f.old_path or f.path} b/{f.path}")
+    big = by_path["big.txt"]
+    assert big.offset + big.length <= len(data) and big.insertions == 40_001
+
+
+@pytest.mark.asyncio
+async def test_snapshot_diff_attributes_only_the_run(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    (tmp_path / "a.txt").write_text("a\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-qm", "init")
+    # Dirty before the run: an edit, a staged file and an untracked one
+    (tmp_path / "a.txt").write_text("a\nalready dirty\n")
+    (tmp_path / "staged.txt").write_text("s\n")
+    _git(tmp_path, "add", "staged.txt")
+    (tmp_path / "scratch.txt").write_text("x\n")
+    status = subprocess.run(
+        ["git", "status", "--porcelain"], cwd=tmp_path, capture_output=True, text=True
+    ).stdout
+
+    head = await capture_head_ref(str(tmp_path))
+    tree = await snapshot_tree(str(tmp_path))
+    assert tree
+
+    # The run: creates a file, edits an untracked one, writes an ignored log
+    (tmp_path / "new.txt").write_text("new\n")
+    (tmp_path / "scratch.txt").write_text("x\ny\n")
+    (tmp_path / "run.log").write_text("noise\n")
+
+    capture = await compute_session_diff(str(tmp_path), head, tree)
+    assert {(f.path, f.status) for f in capture.files} == {("new.txt", "A"), ("scratch.txt", "M")}
+    assert "already dirty" not in capture.diff_content
+    (tmp_path / "new.txt").unlink()
+    (tmp_path / "scratch.txt").write_text("x\n")
+    (tmp_path / "run.log").unlink()
+    after = subprocess.run(
+        ["git", "status", "--porcelain"], cwd=tmp_path, capture_output=True, text=True
+    ).stdout
+    assert after == status  # the user's index is untouched
+
+
+@pytest.mark.asyncio
+async def test_snapshot_tree_not_git_repo(tmp_path):
+    assert await snapshot_tree(str(tmp_path)) is None
+
+
+@pytest.mark.asyncio
+async def test_snapshot_restaging_touched_paths_matches_full_snapshot(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "a.txt").write_text("a\n")
+    (tmp_path / "b.txt").write_text("b\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-qm", "init")
+    before = await snapshot_tree(str(tmp_path))
+
+    (tmp_path / "a.txt").write_text("changed\n")
+    (tmp_path / "b.txt").unlink()
+    (tmp_path / "d").mkdir()
+    (tmp_path / "d" / "c.txt").write_text("c\n")
+    touched = ["a.txt", "b.txt", "d/c.txt", "tmp.txt"]  # tmp.txt came and went
+
+    narrowed = await snapshot_tree(str(tmp_path), before, touched)
+    assert narrowed == await snapshot_tree(str(tmp_path))
+    assert await snapshot_tree(str(tmp_path), before, []) == before
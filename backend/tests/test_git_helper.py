@@ -0,0 +1,116 @@
+"""Tests for the fork-free git helper."""
+
+import subprocess
+
+import pytest
+
+from dcc.config import settings
+from dcc.engine import git_helper
+from dcc.engine.git_helper import GitHelper, read_head
+
+
+def _git(cwd, *args) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=T", "-c", "user.email=t@e", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "a.txt").write_text("one\n")
+    _git(tmp_path, "add", "a.txt")
+    _git(tmp_path, "commit", "-qm", "first")
+    (tmp_path / "a.txt").write_text("two\n")
+    _git(tmp_path, "commit", "-qam", "second commit")
+    return tmp_path
+
+
+def test_read_head_loose_packed_and_detached(repo):
+    head = _git(repo, "rev-parse", "HEAD")
+    assert read_head(str(repo)) == head
+
+    _git(repo, "pack-refs", "--all")
+    assert read_head(str(repo)) == head
+
+    _git(repo, "checkout", "-q", "--detach", "HEAD~1")
+    assert read_head(str(repo)) == _git(repo, "rev-parse", "HEAD")
+
+
+def test_read_head_in_linked_worktree(repo, tmp_path_factory):
+    wt = tmp_path_factory.mktemp("wt") / "wt"
+    _git(repo, "worktree", "add", "-q", "--detach", str(wt), "HEAD~1")
+    assert read_head(str(wt)) == _git(repo, "rev-parse", "HEAD~1")
+
+
+@pytest.mark.asyncio
+async def test_head_from_subdirectory_workspace(repo):
+    (repo / "pkg").mkdir()
+    head = _git(repo, "rev-parse", "HEAD")
+    assert read_head(str(repo / "pkg")) == head
+    helper = GitHelper(str(repo / "pkg"))
+    try:
+        assert await helper.head() == head
+    finally:
+        await helper.close()
+
+
+@pytest.mark.asyncio
+async def test_head_falls_back_to_git_when_ref_files_unreadable(repo, monkeypatch):
+    monkeypatch.setattr(git_helper, "read_head", lambda path: None)
+    helper = GitHelper(str(repo))
+    try:
+        assert await helper.head() == _git(repo, "rev-parse", "HEAD")
+        assert helper.running
+    finally:
+        await helper.close()
+
+
+def test_read_head_outside_git(tmp_path):
+    assert read_head(str(tmp_path)) is None
+
+
+@pytest.mark.asyncio
+async def test_batch_queries_share_one_process(repo):
+    helper = GitHelper(str(repo))
+    try:
+        head = await helper.head()
+        assert not helper.running  # answered from the ref files
+
+        assert await helper.resolve("HEAD~1") == _git(repo, "rev-parse", "HEAD~1")
+        proc = helper._proc
+        assert await helper.exists(head)
+        assert not await helper.exists("0" * 40)
+        assert await helper.resolve("no-such-branch") is None
+
+        info = await helper.commit_info("HEAD")
+        assert info.oid == head and info.subject == "second commit"
+        assert info.parents == [_git(repo, "rev-parse", "HEAD~1")]
+        assert info.author.startswith("T <t@e>")
+        assert helper._proc is proc
+
+        # New commits are visible to the running process
+        (repo / "a.txt").write_text("three\n")
+        _git(repo, "commit", "-qam", "third")
+        new_head = await helper.head()
+        assert (await helper.commit_info(new_head)).subject == "third"
+        assert await helper.log_oneline(head, new_head) == f"{new_head[:7]} third"
+    finally:
+        await helper.close()
+    assert not helper.running
+
+
+@pytest.mark.asyncio
+async def test_idle_shutdown(repo, monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(settings, "git_helper_idle_s", 0.1)
+    helper = GitHelper(str(repo))
+    assert await helper.resolve("HEAD")
+    assert helper.running
+    await asyncio.sleep(0.5)
+    assert not helper.running
@@ -0,0 +1,52 @@
+"""Tests for the chunked NDJSON stdout reader."""
+
+import asyncio
+
+import pytest
+
+from dcc.engine.line_reader import OversizedLine, iter_ndjson_lines
+
+
+async def _collect(data: bytes, max_line: int = 1024, chunk: int = 7, feed: int = 5):
+    reader = asyncio.StreamReader()
+    for i in range(0, len(data), feed):
+        reader.feed_data(data[i : i + feed])
+    reader.feed_eof()
+    return [line async for line in iter_ndjson_lines(reader, max_line, chunk_size=chunk)]
+
+
+@pytest.mark.asyncio
+async def test_splits_lines_across_chunks():
+    lines = await _collect(b'{"a": 1}\n{"b": 22}\n\n{"c": 333}\n')
+    assert lines == [b'{"a": 1}', b'{"b": 22}', b"", b'{"c": 333}']
+
+
+@pytest.mark.asyncio
+async def test_trailing_line_without_newline():
+    lines = await _collect(b'{"a": 1}\n{"tail": true}')
+    assert lines == [b'{"a": 1}', b'{"tail": true}']
+
+
+@pytest.mark.asyncio
+async def test_line_larger_than_stream_limit():
+    big = b'{"text": "' + b"x" * 200_000 + b'"}'
+    lines = await _collect(big + b"\nok\n", max_line=1_000_000, chunk=65536, feed=100_000)
+    assert lines == [big, b"ok"]
+
+
+@pytest.mark.asyncio
+async def test_oversized_line_skipped():
+    lines = await _collect(b"short\n" + b"y" * 50 + b"\nafter\n", max_line=20)
+    assert lines[0] == b"short"
+    assert isinstance(lines[1], OversizedLine)
+    assert lines[1].size == 50
+    assert lines[1].head.startswith(b"yyyy")
+    assert lines[2] == b"after"
+
+
+@pytest.mark.asyncio
+async def test_oversized_line_within_one_chunk():
+    lines = await _collect(b"z" * 30 + b"\nok\n", max_line=20, chunk=4096, feed=4096)
+    assert isinstance(lines[0], OversizedLine)
+    assert lines[0].size == 30
+    assert lines[1] == b"ok"
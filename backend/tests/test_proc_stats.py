@@ -0,0 +1,68 @@
+"""Tests for /proc based resource sampling."""
+
+import asyncio
+import sys
+
+import pytest
+
+from dcc.engine.proc_stats import ResourceSampler, ResourceUsage, proc_available, sample_tree
+
+pytestmark = pytest.mark.skipif(not proc_available(), reason="requires /proc")
+
+# Parent burns CPU while two sleeping children exist
+TREE_SCRIPT = """
+import subprocess, sys, time
+cmd = [sys.executable, "-c", "import time; time.sleep(5)"]
+kids = [subprocess.Popen(cmd, stdout=subprocess.DEVNULL) for _ in range(2)]
+end = time.time() + 0.6
+while time.time() < end:
+    pass
+print("ready", flush=True)
+sys.stdin.read()
+for kid in kids:
+    kid.kill()
+"""
+
+
+@pytest.mark.asyncio
+async def test_sample_tree_counts_children_and_cpu():
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        TREE_SCRIPT,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        await asyncio.wait_for(proc.stdout.readline(), timeout=10)
+        usage = ResourceUsage()
+        sample_tree(proc.pid, usage)
+        assert usage.samples == 1
+        assert usage.max_children == 2
+        assert usage.cpu_user_s + usage.cpu_sys_s >= 0.3
+        assert usage.peak_rss_bytes > 3 * 1024 * 1024
+    finally:
+        proc.stdin.close()
+        await proc.wait()
+
+
+def test_sample_missing_pid_is_noop():
+    usage = ResourceUsage()
+    sample_tree(2**22 + 12345, usage)
+    assert usage.samples == 0
+    assert "_io" not in usage.to_dict()
+
+
+@pytest.mark.asyncio
+async def test_sampler_final_sample_on_stop():
+    proc = await asyncio.create_subprocess_exec(sys.executable, "-c", "import time; time.sleep(5)")
+    try:
+        sampler = ResourceSampler(proc.pid, interval_s=60)
+        sampler.start()
+        await asyncio.sleep(0.05)
+        usage = await sampler.stop()
+        assert usage.samples >= 1
+        assert usage.peak_rss_bytes > 0
+    finally:
+        proc.kill()
+        await proc.wait()
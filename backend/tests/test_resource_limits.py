@@ -0,0 +1,116 @@
+"""Tests for per-run resource limits."""
+
+import asyncio
+import resource
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+from dcc.config import settings
+from dcc.engine.resource_limits import (
+    LIMIT_CPU,
+    LIMIT_MEMORY,
+    LIMIT_NOFILE,
+    ResourceLimits,
+    RunCgroup,
+    classify_breach,
+    make_preexec,
+)
+
+
+def test_merged_layers_override_per_key():
+    limits = ResourceLimits.merged(
+        {"cpu_s": 600, "nofile": 1024},
+        '{"cpu_s": 60}',
+        {"memory_mb": 2048, "unknown": 1, "nproc": None},
+    )
+    assert limits == ResourceLimits(cpu_s=60, memory_mb=2048, nofile=1024)
+    assert limits.to_dict() == {"cpu_s": 60, "memory_mb": 2048, "nofile": 1024}
+
+
+def test_merged_zero_lifts_a_limit():
+    limits = ResourceLimits.merged({"cpu_s": 600, "nofile": 1024}, {"cpu_s": 0})
+    assert limits == ResourceLimits(nofile=1024)
+
+
+def test_merged_ignores_bad_json_and_empty():
+    assert ResourceLimits.merged(None, "not json", {}).is_empty()
+
+
+def test_classify_breach():
+    cpu = ResourceLimits(cpu_s=10)
+    assert classify_breach(cpu, -signal.SIGXCPU, "") == LIMIT_CPU
+    assert classify_breach(cpu, 1, "") is None
+    assert classify_breach(ResourceLimits(), -signal.SIGXCPU, "") is None
+
+    mem = ResourceLimits(memory_mb=512)
+    assert classify_breach(mem, -signal.SIGKILL, "", {"oom_kill": 1}) == LIMIT_MEMORY
+    assert classify_breach(mem, 134, "FATAL ERROR: JavaScript heap out of memory") == LIMIT_MEMORY
+
+    files = ResourceLimits(nofile=64)
+    assert classify_breach(files, 1, "Error: EMFILE, too many open files") == LIMIT_NOFILE
+    assert classify_breach(files, 0, "EMFILE") is None
+
+
+@pytest.mark.asyncio
+async def test_preexec_applies_rlimits():
+    preexec = make_preexec(ResourceLimits(nofile=77, cpu_s=30), None)
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "-c",
+        "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE)[0],"
+        " resource.getrlimit(resource.RLIMIT_CPU)[0])",
+        stdout=asyncio.subprocess.PIPE,
+        preexec_fn=preexec,
+    )
+    out, _ = await proc.communicate()
+    assert out.split() == [b"77", b"30"]
+    # The server's own limits are untouched
+    assert resource.getrlimit(resource.RLIMIT_CPU)[0] != 30
+
+
+def test_cgroup_unavailable_without_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "cgroup_root", "")
+    assert RunCgroup.create("x", ResourceLimits(memory_mb=10)) is None
+    monkeypatch.setattr(settings, "cgroup_root", str(tmp_path))
+    assert RunCgroup.create("x", ResourceLimits(memory_mb=10)) is None
+
+
+def test_cgroup_files_written(monkeypatch, tmp_path):
+    # A fake cgroup2 directory: only the interface files we touch
+    (tmp_path / "cgroup.controllers").write_text("cpu memory pids\n")
+    (tmp_path / "cgroup.subtree_control").write_text("")
+    monkeypatch.setattr(settings, "cgroup_root", str(tmp_path))
+
+    cg = RunCgroup.create("dcc-run-s1", ResourceLimits(memory_mb=1, nproc=50))
+    assert cg is not None
+    assert (tmp_path / "cgroup.subtree_control").read_text() == "+memory +pids"
+    assert (cg.path / "memory.max").read_text() == str(1024 * 1024)
+    assert (cg.path / "pids.max").read_text() == "50"
+
+    (cg.path / "memory.events").write_text("low 0\nhigh 0\nmax 3\noom 1\noom_kill 1\n")
+    (cg.path / "pids.events").write_text("max 0\n")
+    assert cg.events() == {"oom_kill": 1, "pids_max": 0}
+
+
+def test_cgroup_remove_waits_until_empty(tmp_path):
+    # Fake group still populated after the kill; it "empties" a bit later
+    path = tmp_path / "dcc-run-s1"
+    path.mkdir()
+    (path / "cgroup.kill").write_text("")
+    (path / "cgroup.events").write_text("populated 1\nfrozen 0\n")
+
+    def drain():
+        time.sleep(0.1)
+        assert (path / "cgroup.kill").read_text() == "1"
+        (path / "cgroup.kill").unlink()
+        (path / "cgroup.events").unlink()
+
+    t = threading.Thread(target=drain)
+    t.start()
+    RunCgroup(path).remove()
+    t.join()
+    assert not path.exists()
@@ -0,0 +1,148 @@
+"""Tests for server-side runs with multi-subscriber event logs."""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from dcc.config import settings
+from dcc.db import repository
+from dcc.db.database import close_db, init_db
+from dcc.engine.run_manager import RunManager
+from dcc.engine.scheduler import RunTicket
+from dcc.engine.types import AgUiEvent, AgUiEventType
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db(tmp_path, monkeypatch):
+    settings.db_path = str(tmp_path / "test.db")
+    monkeypatch.setattr(settings, "max_concurrent_runs", 0)
+    await close_db()
+    await init_db()
+
+    await repository.upsert_tenant("t1", "Test", "/tmp/cfg", "claude-test")
+    await repository.upsert_workspace("w1", "t1", "TestWS", "/tmp/ws")
+
+    yield
+
+    await close_db()
+
+
+class StubRunner:
+    """Emits n text events, waiting on a gate before finishing."""
+
+    def __init__(self, session_id: str, n: int, gate: asyncio.Event | None = None):
+        self.session_id = session_id
+        self.n = n
+        self.gate = gate
+        self.diff_capture = None
+        self.resource_usage = None
+        self.worktree_branch = None
+        self.worktree_path = None
+        self.cancelled = False
+
+    async def run(self):
+        yield AgUiEvent(type=AgUiEventType.RUN_STARTED, session_id=self.session_id)
+        for i in range(self.n):
+            yield AgUiEvent(
+                type=AgUiEventType.TEXT_MESSAGE_CONTENT,
+                session_id=self.session_id,
+                message_id="m1",
+                text=str(i),
+            )
+        if self.gate:
+            await self.gate.wait()
+        yield AgUiEvent(type=AgUiEventType.RUN_FINISHED, session_id=self.session_id)
+
+    async def cancel(self):
+        self.cancelled = True
+        if self.gate:
+            self.gate.set()
+
+
+async def _start(manager: RunManager, n: int, gate: asyncio.Event | None = None):
+    sid = await repository.create_session("w1", "hi")
+    runner = StubRunner(sid, n, gate)
+    handle = manager.start(runner, RunTicket(sid, "t1", "w1"))
+    return sid, handle
+
+
+@pytest.mark.asyncio
+async def test_run_completes_without_subscribers():
+    manager = RunManager()
+    sid, handle = await _start(manager, 3)
+    await handle.task
+
+    assert handle.done
+    session = await repository.get_session(sid)
+    assert session["status"] == "completed"
+    events = await repository.get_session_events(sid)
+    assert [e["seq"] for e in events] == list(range(5))
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_multiple_subscribers_and_resume():
+    manager = RunManager()
+    gate = asyncio.Event()
+    sid, handle = await _start(manager, 3, gate)
+
+    async def collect(after=-1):
+        return [e.seq async for e in handle.subscribe(after)]
+
+    first = asyncio.create_task(collect())
+    second = asyncio.create_task(collect())
+    await asyncio.sleep(0.01)
+    # A subscriber that goes away doesn't affect the run
+    second.cancel()
+    resumed = asyncio.create_task(collect(after=2))
+    await asyncio.sleep(0.01)
+    gate.set()
+
+    assert await first == [0, 1, 2, 3, 4]
+    assert await resumed == [3, 4]
+    assert handle.subscribers == 0
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_late_subscriber_catches_up_from_db(monkeypatch):
+    monkeypatch.setattr(settings, "run_event_buffer", 8)
+    monkeypatch.setattr(settings, "run_event_flush_size", 4)
+    manager = RunManager()
+    sid, handle = await _start(manager, 50)
+    await handle.task
+
+    seqs = [e.seq async for e in handle.subscribe()]
+    assert seqs == list(range(52))
+    types = [e.type async for e in handle.subscribe(after=49)]
+    assert types == [AgUiEventType.TEXT_MESSAGE_CONTENT, AgUiEventType.RUN_FINISHED]
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_cancel_marks_session_cancelled():
+    manager = RunManager()
+    gate = asyncio.Event()
+    sid, handle = await _start(manager, 1, gate)
+    await asyncio.sleep(0.01)
+
+    assert await manager.cancel(sid) is True
+    await handle.task
+    assert handle.runner.cancelled
+    session = await repository.get_session(sid)
+    assert session["status"] == "cancelled"
+    assert await manager.cancel(sid) is False
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_start_is_idempotent():
+    manager = RunManager()
+    gate = asyncio.Event()
+    sid, handle = await _start(manager, 1, gate)
+    again = manager.start(StubRunner(sid, 1), RunTicket(sid, "t1", "w1"))
+    assert again is handle
+    gate.set()
+    await handle.task
+    await manager.close()
@@ -0,0 +1,174 @@
+"""Tests para el scheduler de runs con limites de concurrencia."""
+
+import asyncio
+
+import pytest
+
+from dcc.config import settings
+from dcc.engine.scheduler import RunScheduler, RunTicket
+from dcc.engine.types import AgUiEvent, AgUiEventType
+
+
+@pytest.fixture
+def caps(monkeypatch):
+    def _set(global_=0, tenant=0, workspace=0):
+        monkeypatch.setattr(settings, "max_concurrent_runs", global_)
+        monkeypatch.setattr(settings, "max_runs_per_tenant", tenant)
+        monkeypatch.setattr(settings, "max_runs_per_workspace", workspace)
+
+    return _set
+
+
+def _ticket(sid: str, tenant: str = "t1", ws: str = "w1") -> RunTicket:
+    return RunTicket(session_id=sid, tenant_id=tenant, workspace_id=ws)
+
+
+async def _gated_run(sid: str, gate: asyncio.Event):
+    yield AgUiEvent(type=AgUiEventType.RUN_STARTED, session_id=sid)
+    await gate.wait()
+    yield AgUiEvent(type=AgUiEventType.RUN_FINISHED, session_id=sid)
+
+
+async def _consume(gen, out: list):
+    async for ev in gen:
+        out.append(ev)
+
+
+def _start(sched, ticket: RunTicket, gate: asyncio.Event, out: list) -> asyncio.Task:
+    run = _gated_run(ticket.session_id, gate)
+    return asyncio.create_task(_consume(sched.run(ticket, run), out))
+
+
+@pytest.mark.asyncio
+async def test_unlimited_starts_immediately(caps):
+    caps()
+    sched = RunScheduler()
+    gate = asyncio.Event()
+    gate.set()
+    events = [ev async for ev in sched.run(_ticket("s1"), _gated_run("s1", gate))]
+    assert [e.type for e in events] == [AgUiEventType.RUN_STARTED, AgUiEventType.RUN_FINISHED]
+    assert sched.snapshot()["running"] == []
+
+
+@pytest.mark.asyncio
+async def test_global_cap_queues_fifo(caps):
+    caps(global_=1)
+    sched = RunScheduler()
+    gates = {sid: asyncio.Event() for sid in ("s1", "s2", "s3")}
+    outs = {sid: [] for sid in gates}
+    tasks = []
+    for sid in gates:
+        tasks.append(asyncio.create_task(
+            _consume(sched.run(_ticket(sid), _gated_run(sid, gates[sid])), outs[sid])
+        ))
+        await asyncio.sleep(0)
+
+    await asyncio.sleep(0.01)
+    snap = sched.snapshot()
+    assert [r["session_id"] for r in snap["running"]] == ["s1"]
+    assert [(q["session_id"], q["position"]) for q in snap["queued"]] == [("s2", 1), ("s3", 2)]
+    assert outs["s3"][0].custom_type == "queue_position"
+    assert outs["s3"][0].data == {"position": 2, "queued": 2}
+
+    gates["s1"].set()
+    await asyncio.sleep(0.01)
+    assert [r["session_id"] for r in sched.snapshot()["running"]] == ["s2"]
+    # s3 moved up
+    assert outs["s3"][-1].data["position"] == 1
+
+    gates["s2"].set()
+    gates["s3"].set()
+    await asyncio.gather(*tasks)
+    assert outs["s3"][-1].type == AgUiEventType.RUN_FINISHED
+    assert sched.snapshot() == {"limits": sched.limits(), "running": [], "queued": []}
+
+
+@pytest.mark.asyncio
+async def test_workspace_cap_does_not_block_other_workspaces(caps):
+    caps(workspace=1)
+    sched = RunScheduler()
+    gate = asyncio.Event()
+    outs = {sid: [] for sid in ("a1", "a2", "b1")}
+    tasks = [
+        _start(sched, _ticket(sid, ws=sid[0]), gate, outs[sid]) for sid in ("a1", "a2", "b1")
+    ]
+    await asyncio.sleep(0.01)
+    running = {r["session_id"] for r in sched.snapshot()["running"]}
+    assert running == {"a1", "b1"}
+    assert [q["session_id"] for q in sched.snapshot()["queued"]] == ["a2"]
+
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert all(out[-1].type == AgUiEventType.RUN_FINISHED for out in outs.values())
+
+
+@pytest.mark.asyncio
+async def test_tenant_cap(caps):
+    caps(tenant=1)
+    sched = RunScheduler()
+    gate = asyncio.Event()
+    outs = {sid: [] for sid in ("x", "y")}
+    tasks = [
+        _start(sched, _ticket(sid, ws=sid), gate, outs[sid]) for sid in ("x", "y")
+    ]
+    await asyncio.sleep(0.01)
+    assert len(sched.snapshot()["running"]) == 1
+    gate.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_cancel_while_queued(caps):
+    caps(global_=1)
+    sched = RunScheduler()
+    gate = asyncio.Event()
+    out1, out2 = [], []
+    t1 = asyncio.create_task(_consume(sched.run(_ticket("s1"), _gated_run("s1", gate)), out1))
+    await asyncio.sleep(0)
+    t2 = asyncio.create_task(_consume(sched.run(_ticket("s2"), _gated_run("s2", gate)), out2))
+    await asyncio.sleep(0.01)
+
+    assert sched.cancel("s2") is True
+    await t2
+    assert out2[-1].type == AgUiEventType.RUN_ERROR
+    assert "queued" in out2[-1].error
+    assert out2[-1].error_code == "cancelled"
+    assert sched.cancel("s1") is False
+
+    gate.set()
+    await t1
+
+
+@pytest.mark.asyncio
+async def test_disconnect_while_queued_frees_queue(caps):
+    caps(global_=1)
+    sched = RunScheduler()
+    gate = asyncio.Event()
+    t1 = asyncio.create_task(_consume(sched.run(_ticket("s1"), _gated_run("s1", gate)), []))
+    await asyncio.sleep(0)
+    t2 = asyncio.create_task(_consume(sched.run(_ticket("s2"), _gated_run("s2", gate)), []))
+    await asyncio.sleep(0.01)
+
+    t2.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await t2
+    assert sched.snapshot()["queued"] == []
+
+    gate.set()
+    await t1
+    assert sched.snapshot()["running"] == []
+
+
+@pytest.mark.asyncio
+async def test_queue_endpoint(caps):
+    from httpx import ASGITransport, AsyncClient
+
+    from dcc.app import app
+
+    caps(global_=3, workspace=1)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        resp = await client.get("/api/runs/queue")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["limits"] == {"global": 3, "tenant": 0, "workspace": 1}
+    assert body["running"] == [] and body["queued"] == []
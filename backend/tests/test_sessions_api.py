@@ -0,0 +1,314 @@
+"""Tests for session continuation endpoints."""
+
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from dcc.app import app
+from dcc.config import settings
+from dcc.db import repository
+from dcc.db.database import close_db, init_db
+from dcc.engine.blob_gc import blob_collector
+from dcc.engine.blob_store import get_blob_store
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def setup_db(tmp_path):
+    settings.db_path = str(tmp_path / "test.db")
+    await close_db()
+    await init_db()
+
+    await repository.upsert_tenant("t1", "Test", "/tmp/cfg", "claude-test")
+    await repository.upsert_workspace("w1", "t1", "TestWS", "/tmp/ws")
+
+    yield
+
+    await close_db()
+
+
+@pytest_asyncio.fixture
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+
+async def _finished_session(cli_session_id: str | None = "cli-1") -> str:
+    sid = await repository.create_session("w1", "first", model="sonnet")
+    await repository.update_session_finished(
+        sid, status="completed", model="sonnet", cli_session_id=cli_session_id
+    )
+    return sid
+
+
+@pytest.mark.asyncio
+async def test_continue_links_parent_and_resumes(client: AsyncClient):
+    parent = await _finished_session()
+
+    resp = await client.post(f"/api/sessions/{parent}/continue", json={"prompt": "and now?"})
+    assert resp.status_code == 200
+    child_id = resp.json()["session_id"]
+
+    child = await repository.get_session(child_id)
+    assert child["parent_session_id"] == parent
+    assert child["resume_cli_session_id"] == "cli-1"
+    assert child["fork_session"] == 0
+    assert child["model"] == "sonnet"
+    assert child["prompt"] == "and now?"
+
+
+@pytest.mark.asyncio
+async def test_continuation_runs_in_parent_worktree(client: AsyncClient, monkeypatch):
+    from types import SimpleNamespace
+
+    from dcc.api.routes import sessions
+
+    parent = await repository.create_session("w1", "first", isolation="worktree")
+    await repository.update_session_finished(parent, status="completed", cli_session_id="cli-1")
+    await repository.update_session_worktree(parent, "dcc/session-p", "/wt/abc/wt-1")
+
+    resp = await client.post(f"/api/sessions/{parent}/continue", json={"prompt": "more"})
+    child = await repository.get_session(resp.json()["session_id"])
+    assert child["isolation"] == "worktree"
+    assert child["base_ref"] == "dcc/session-p"
+    assert child["worktree_path"] == "/wt/abc/wt-1"
+
+    started = []
+    monkeypatch.setattr(
+        sessions.run_manager,
+        "start",
+        lambda runner, ticket: started.append(runner) or SimpleNamespace(last_seq=-1),
+    )
+    assert (await client.post(f"/api/sessions/{child['id']}/start")).status_code == 200
+    assert started[0].worktree_path == "/wt/abc/wt-1"
+    assert started[0].base_ref == "dcc/session-p"
+
+
+@pytest.mark.asyncio
+async def test_fork_several_continuations(client: AsyncClient):
+    parent = await _finished_session()
+
+    ids = []
+    for prompt in ("option A", "option B"):
+        resp = await client.post(
+            f"/api/sessions/{parent}/continue", json={"prompt": prompt, "fork": True}
+        )
+        assert resp.status_code == 200
+        ids.append(resp.json()["session_id"])
+
+    resp = await client.get(f"/api/sessions/{parent}/children")
+    children = resp.json()["sessions"]
+    assert [c["id"] for c in children] == ids
+    assert all(c["fork_session"] == 1 for c in children)
+
+
+@pytest.mark.asyncio
+async def test_one_running_continuation_per_conversation(client: AsyncClient):
+    parent = await _finished_session()
+    url = f"/api/sessions/{parent}/continue"
+
+    first = await client.post(url, json={"prompt": "a"})
+    assert first.status_code == 200
+    # Both would --resume the same CLI conversation
+    assert (await client.post(url, json={"prompt": "b"})).status_code == 409
+    assert (await client.post(url, json={"prompt": "b", "fork": True})).status_code == 200
+
+    await repository.update_session_finished(first.json()["session_id"], status="completed")
+    assert (await client.post(url, json={"prompt": "c"})).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_continue_requires_cli_session(client: AsyncClient):
+    parent = await _finished_session(cli_session_id=None)
+    resp = await client.post(f"/api/sessions/{parent}/continue", json={"prompt": "x"})
+    assert resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_continue_rejects_running_session(client: AsyncClient):
+    running = await repository.create_session("w1", "busy")
+    resp = await client.post(f"/api/sessions/{running}/continue", json={"prompt": "x"})
+    assert resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_continue_unknown_session(client: AsyncClient):
+    resp = await client.post("/api/sessions/nope/continue", json={"prompt": "x"})
+    assert resp.status_code == 404
+
+
+FAKE_CLAUDE = Path(__file__).resolve().parent.parent / "benchmarks" / "fake_claude.py"
+
+
+async def _sse_ids(client: AsyncClient, url: str, **kwargs) -> list[tuple[str, str]]:
+    frames = []
+    async with client.stream("GET", url, **kwargs) as resp:
+        assert resp.status_code == 200
+        fields: dict[str, str] = {}
+        async for line in resp.aiter_lines():
+            if not line.strip():
+                if "id" in fields:
+                    frames.append((fields["id"], fields["event"]))
+                fields = {}
+            elif ":" in line:
+                key, value = line.split(":", 1)
+                fields[key] = value.strip()
+    return frames
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_from_last_event_id(client: AsyncClient, tmp_path, monkeypatch):
+    from dcc.engine.run_manager import run_manager
+
+    monkeypatch.setattr(settings, "claude_bin", str(FAKE_CLAUDE))
+    monkeypatch.setattr(settings, "blob_dir", str(tmp_path / "blobs"))
+    await repository.upsert_workspace("w2", "t1", "Real", str(tmp_path))
+    sid = await repository.create_session("w2", "hello")
+
+    frames = await _sse_ids(client, f"/api/sessions/{sid}/stream")
+    assert frames[-1][1] == "RunFinished"
+    assert [int(i) for i, _ in frames] == list(range(len(frames)))
+
+    # Reconnect after the run finished: only what came after Last-Event-ID
+    tail = await _sse_ids(
+        client, f"/api/sessions/{sid}/stream", headers={"Last-Event-ID": frames[-3][0]}
+    )
+    assert tail == frames[-2:]
+
+    await run_manager.get(sid).task
+    session = await repository.get_session(sid)
+    assert session["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_create_skips_prewarm_for_capped_runs(client: AsyncClient, monkeypatch):
+    from dcc.engine.warm_pool import warm_pool
+
+    specs = []
+    monkeypatch.setattr(settings, "warm_pool_size", 1)
+    monkeypatch.setattr(warm_pool, "prewarm", specs.append)
+
+    body = {"workspace_id": "w1", "prompt": "hi"}
+    assert (await client.post("/api/sessions", json=body)).status_code == 200
+    assert len(specs) == 1
+
+    monkeypatch.setattr(settings, "run_resource_limits", {"memory_mb": 512})
+    assert (await client.post("/api/sessions", json=body)).status_code == 200
+    assert len(specs) == 1
+
+
+@pytest.mark.asyncio
+async def test_attachments_reach_the_runner(client: AsyncClient, tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from dcc.api.routes import sessions
+
+    monkeypatch.setattr(settings, "blob_dir", str(tmp_path / "blobs"))
+    body = {
+        "workspace_id": "w1",
+        "prompt": "review this",
+        "attachments": [
+            {"name": "spec.md", "media_type": "text/markdown", "data": "# Spec"},
+            {"media_type": "image/png", "data": "iVBORw0KGgo="},
+        ],
+    }
+    resp = await client.post("/api/sessions", json=body)
+    assert resp.status_code == 200
+    sid = resp.json()["session_id"]
+
+    started = []
+    monkeypatch.setattr(
+        sessions.run_manager,
+        "start",
+        lambda runner, ticket: started.append(runner) or SimpleNamespace(last_seq=-1),
+    )
+    assert (await client.post(f"/api/sessions/{sid}/start")).status_code == 200
+    doc, image = started[0].attachments
+    assert doc == {
+        "type": "document",
+        "source": {"type": "text", "media_type": "text/plain", "data": "# Spec"},
+        "title": "spec.md",
+    }
+    assert image["type"] == "image" and image["source"]["media_type"] == "image/png"
+
+    body["attachments"] = [{"media_type": "application/zip", "data": "x"}]
+    assert (await client.post("/api/sessions", json=body)).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_diff_files_listed_and_streamed_one_at_a_time(
+    client: AsyncClient, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(settings, "blob_dir", str(tmp_path / "blobs"))
+    sid = await _finished_session()
+    a = "diff --git a/a.py b/a.py\n@@ -1 +1 @@\n-x\n+y\n"
+    b = "diff --git a/b.py b/b.py\nnew file mode 100644\n@@ -0,0 +1 @@\n+z\n"
+    digest, size = get_blob_store().put((a + b).encode())
+    await repository.insert_session_diff(
+        sid,
+        diff_stat=None,
+        diff_content=a + b,
+        files_changed=2,
+        insertions=2,
+        deletions=1,
+        diff_sha256=digest,
+        diff_size=size,
+        files=[
+            {
+                "path": "a.py",
+                "status": "M",
+                "insertions": 1,
+                "deletions": 1,
+                "offset": 0,
+                "length": len(a),
+            },
+            {"path": "b.py", "status": "A", "insertions": 1, "offset": len(a), "length": len(b)},
+        ],
+    )
+
+    resp = await client.get(f"/api/sessions/{sid}/diff")
+    assert resp.json()["truncated"] is False
+    resp = await client.get(f"/api/sessions/{sid}/diff/files")
+    assert [(f["path"], f["status"], f["size_bytes"]) for f in resp.json()["files"]] == [
+        ("a.py", "M", len(a)),
+        ("b.py", "A", len(b)),
+    ]
+    resp = await client.get(f"/api/sessions/{sid}/diff/file", params={"path": "b.py"})
+    assert resp.status_code == 200 and resp.text == b
+    resp = await client.get(f"/api/sessions/{sid}/diff/file", params={"path": "c.py"})
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_blob_gc_keeps_what_sessions_refer_to(client: AsyncClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "blob_dir", str(tmp_path / "blobs"))
+    monkeypatch.setattr(settings, "blob_gc_grace_s", 0)
+    sid = await _finished_session()
+    store = get_blob_store()
+    result, size = store.put(b"tool output")
+    await repository.insert_tool_result_blob(sid, "t1", result, size)
+    diff, size = store.put(b"diff --git a/x b/x\n")
+    await repository.insert_session_diff(
+        sid, None, "", 1, 0, 0, diff_sha256=diff, diff_size=size, files=[]
+    )
+    orphan, _ = store.put(b"from a run that never recorded it")
+    orphan_bytes = store._path(orphan).stat().st_size
+
+    assert await blob_collector.collect() == (1, orphan_bytes)
+    assert store.exists(result) and store.exists(diff) and not store.exists(orphan)
+
+
+@pytest.mark.asyncio
+async def test_diff_preview_reports_truncation(client: AsyncClient, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "blob_dir", str(tmp_path / "blobs"))
+    sid = await _finished_session()
+    full = "diff --git a/a.py b/a.py\n" + "+x\n" * 1000
+    digest, size = get_blob_store().put(full.encode())
+    await repository.insert_session_diff(
+        sid, None, full[:100], 1, 1000, 0, diff_sha256=digest, diff_size=size
+    )
+    body = (await client.get(f"/api/sessions/{sid}/diff")).json()
+    assert body["has_diff"] and body["truncated"] is True
+    assert len(body["diff"]["diff_content"]) == 100
@@ -0,0 +1,64 @@
+"""Tests para el buffer circular de stderr."""
+
+import asyncio
+
+import pytest
+
+from dcc.engine.stderr_tail import StderrTail
+
+
+def _reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_keeps_only_tail():
+    tail = StderrTail(max_bytes=20)
+    for i in range(10):
+        tail.append(f"line {i}")
+    assert tail.text().endswith("line 9")
+    assert "line 0" not in tail.text()
+    assert tail.line_count == 10
+    assert len(tail.text()) <= 20
+
+
+def test_long_line_truncated_to_cap():
+    tail = StderrTail(max_bytes=10)
+    tail.append("x" * 100 + "END")
+    assert tail.text() == "xxxxxxxEND"
+
+
+def test_lines_since():
+    tail = StderrTail(max_bytes=1000)
+    tail.append("a")
+    tail.append("b")
+    seen = tail.line_count
+    tail.append("c")
+    assert tail.lines_since(seen) == ["c"]
+    assert tail.lines_since(0) == ["a", "b", "c"]
+
+
+def test_text_max_chars():
+    tail = StderrTail(max_bytes=1000)
+    tail.append("hello world")
+    assert tail.text(max_chars=5) == "world"
+
+
+@pytest.mark.asyncio
+async def test_drain_splits_lines_and_keeps_trailing():
+    tail = StderrTail(max_bytes=1000)
+    await tail.drain(_reader(b"first\nsecond\npartial"))
+    assert tail.text() == "first\nsecond\npartial"
+    assert tail.total_bytes == len(b"first\nsecond\npartial")
+
+
+@pytest.mark.asyncio
+async def test_drain_bounded_memory():
+    tail = StderrTail(max_bytes=1024)
+    data = b"".join(b"noise %d\n" % i for i in range(100_000))
+    await tail.drain(_reader(data))
+    assert tail.total_bytes == len(data)
+    assert len(tail.text()) <= 1024
+    assert tail.text().endswith("noise 99999")
@@ -1,6 +1,9 @@
 import json
 
-from dcc.engine.stream_parser import parse_cli_line
+import pytest
+
+from dcc.engine import stream_parser
+from dcc.engine.stream_parser import parse_cli_bytes, parse_cli_line
 
 
 def test_parse_empty_line():
@@ -124,3 +127,43 @@ def test_parse_unknown_type():
     event = parse_cli_line(json.dumps(data))
     assert event is not None
     assert event.type == "stream_event"
+
+
+PARITY_LINES = [
+    b"",
+    b"   \n",
+    b"not json",
+    b'"just a string"',
+    b'{"type": "system", "subtype": "init", "session_id": "abc", "tools": ["Read"]}\n',
+    b'{"type": "assistant", "message": {"content": [{"type": "text", "text": "hola \xc3\xb1"}]}}',
+    b'{"type": "assistant", "message": {"content": []}}',
+    b'{"type": "user", "message": {"content": [{"type": "tool_result", "tool_use_id": "t1"}]}}',
+    b'{"type": "result", "cost_usd": 0, "duration_ms": 15000, "num_turns": 3}',
+    b'{"type": "result", "cost_usd": 0.5, "is_error": true, "error": "boom"}',
+    b'{"type": "result", "cost_usd": "0.25", "duration_ms": 12.0}',
+    b'{"type": "stream_event", "event": {"type": "content_block_delta"}}',
+    b'{"type": "assistant", "message": {"content": [{"type": "text", "text": "\xff\xfe"}]}}',
+    b'{"type": "result", "cost_usd": NaN}',
+]
+
+
+@pytest.mark.parametrize("line", PARITY_LINES)
+def test_parse_cli_bytes_matches_parse_cli_line(line):
+    expected = parse_cli_line(line.decode("utf-8", errors="replace"))
+    event = parse_cli_bytes(line)
+    if expected is None:
+        assert event is None
+    else:
+        assert event == expected
+        assert event.model_dump() == expected.model_dump()
+
+
+@pytest.mark.parametrize("line", PARITY_LINES)
+def test_parse_cli_bytes_stdlib_fallback(line, monkeypatch):
+    monkeypatch.setattr(stream_parser, "_fast_loads", None)
+    expected = parse_cli_line(line.decode("utf-8", errors="replace"))
+    event = parse_cli_bytes(line)
+    if expected is None:
+        assert event is None
+    else:
+        assert event == expected
@@ -132,3 +132,13 @@ async def test_list_categories(client: AsyncClient):
     ids = [c["id"] for c in cats]
     assert "development" in ids
     assert "testing" in ids
+
+
+@pytest.mark.asyncio
+async def test_resource_limits_must_be_positive(client: AsyncClient):
+    wf_id = await repository.create_workflow("w1", "Capped", "prompt")
+
+    resp = await client.put(f"/api/workflows/{wf_id}", json={"resource_limits": {"cpu_s": 0}})
+    assert resp.status_code == 422
+    resp = await client.put("/api/workspaces/tenants/t1/limits", json={"nofile": -1})
+    assert resp.status_code == 422
@@ -182,3 +182,52 @@ async def test_monitor_task_nesting():
     assert tasks[0]["parent_id"] is None
     assert tasks[1]["parent_id"] == parent_id
     assert tasks[1]["depth"] == 1
+
+
+# --- Run budgets ---
+
+
+@pytest.mark.asyncio
+async def test_workflow_and_session_timeouts_persist():
+    wf_id = await repository.create_workflow(
+        workspace_id="w1",
+        name="Slow",
+        prompt_template="x",
+        timeout_s=60,
+        idle_timeout_s=15,
+    )
+    wf = await repository.get_workflow(wf_id)
+    assert (wf["timeout_s"], wf["idle_timeout_s"]) == (60, 15)
+
+    sid = await repository.create_session("w1", "x", workflow_id=wf_id, timeout_s=60)
+    session = await repository.get_session(sid)
+    assert session["timeout_s"] == 60
+    assert session["idle_timeout_s"] is None
+
+
+@pytest.mark.asyncio
+async def test_init_db_adds_missing_columns():
+    from dcc.db.database import get_db
+
+    db = await get_db()
+    await db.execute("ALTER TABLE sessions DROP COLUMN idle_timeout_s")
+    await db.commit()
+    await init_db()
+    cursor = await db.execute("PRAGMA table_info(sessions)")
+    assert "idle_timeout_s" in {row["name"] for row in await cursor.fetchall()}
+
+
+@pytest.mark.asyncio
+async def test_resource_limits_roundtrip():
+    wf_id = await repository.create_workflow(
+        workspace_id="w1", name="Capped", prompt_template="x", resource_limits={"cpu_s": 60}
+    )
+    assert (await repository.get_workflow(wf_id))["resource_limits"] == {"cpu_s": 60}
+
+    await repository.update_workflow(wf_id, resource_limits={"memory_mb": 512})
+    assert (await repository.get_workflow(wf_id))["resource_limits"] == {"memory_mb": 512}
+
+    assert await repository.update_tenant_limits("t1", {"nofile": 256})
+    ws = await repository.get_workspace("w1")
+    assert ws["tenant_resource_limits"] == '{"nofile": 256}'
+    assert not await repository.update_tenant_limits("nope", None)
@@ -0,0 +1,127 @@
+"""Worktree isolation pool against a throwaway git repo."""
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from dcc.config import settings
+from dcc.engine.worktree_pool import WorktreeError, WorktreePool
+
+
+def _git(cwd, *args) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "worktree_dir", str(tmp_path / "worktrees"))
+    monkeypatch.setattr(settings, "worktree_pool_size", 2)
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git(path, "init", "-q")
+    _git(path, "config", "user.email", "t@example.com")
+    _git(path, "config", "user.name", "t")
+    (path / "a.txt").write_text("one\n")
+    _git(path, "add", "a.txt")
+    _git(path, "commit", "-qm", "first")
+    _git(path, "tag", "v1")
+    (path / "a.txt").write_text("two\n")
+    _git(path, "commit", "-qam", "second")
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_acquire_checks_out_base_ref(repo):
+    pool = WorktreePool()
+    wt = await pool.acquire(repo, "v1")
+    assert wt.path != repo
+    assert open(f"{wt.path}/a.txt").read() == "one\n"
+    assert wt.base_ref == _git(repo, "rev-parse", "v1")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_leases_get_separate_trees(repo):
+    pool = WorktreePool()
+    a = await pool.acquire(repo)
+    b = await pool.acquire(repo)
+    assert a.path != b.path
+    assert pool.stats()["leased"] == [a.path, b.path]
+
+
+@pytest.mark.asyncio
+async def test_release_saves_changes_and_recycles(repo):
+    pool = WorktreePool()
+    wt = await pool.acquire(repo)
+    with open(f"{wt.path}/new.txt", "w") as f:
+        f.write("x\n")
+
+    branch = await pool.release(wt, "s1")
+    assert branch == "dcc/session-s1"
+    # The branch lives in the main repo and holds the run's file
+    assert _git(repo, "show", f"{branch}:new.txt") == "x"
+
+    again = await pool.acquire(repo, "v1")
+    assert again.path == wt.path
+    assert _git(again.path, "status", "--porcelain") == ""
+
+
+@pytest.mark.asyncio
+async def test_release_without_changes_has_no_branch(repo):
+    pool = WorktreePool()
+    wt = await pool.acquire(repo)
+    assert await pool.release(wt, "s2") is None
+    assert "dcc/session-s2" not in _git(repo, "branch", "--list")
+
+
+@pytest.mark.asyncio
+async def test_pool_is_capped(repo, monkeypatch):
+    monkeypatch.setattr(settings, "worktree_pool_size", 1)
+    pool = WorktreePool()
+    a = await pool.acquire(repo)
+    b = await pool.acquire(repo)
+    await pool.release(a, "s1")
+    await pool.release(b, "s2")
+    assert pool.stats()["idle"] == {repo: 1}
+    assert len(_git(repo, "worktree", "list").splitlines()) == 2
+
+
+@pytest.mark.asyncio
+async def test_adopts_worktrees_of_previous_process(repo):
+    wt = await WorktreePool().acquire(repo)
+    pool = WorktreePool()
+    again = await pool.acquire(repo)
+    assert again.path == wt.path
+
+
+@pytest.mark.asyncio
+async def test_acquire_particular_worktree(repo):
+    pool = WorktreePool()
+    a = await pool.acquire(repo)
+    b = await pool.acquire(repo)
+    with pytest.raises(WorktreeError, match="in use"):
+        await pool.acquire(repo, path=a.path)
+    (Path(a.path) / "new.txt").write_text("x\n")
+    await pool.release(a, "s1")
+    await pool.release(b, "s2")
+
+    # Continues in the parent's tree, from the branch its changes were saved on
+    resumed = await pool.acquire(repo, "dcc/session-s1", path=a.path)
+    assert resumed.path == a.path
+    assert resumed.base_ref == _git(repo, "rev-parse", "dcc/session-s1")
+    assert (Path(resumed.path) / "new.txt").read_text() == "x\n"
+
+    # Gone from disk (pool cap, cleanup): checked out again at the same path
+    await pool._discard(b)
+    pool._idle[repo].clear()
+    again = await pool.acquire(repo, path=b.path)
+    assert again.path == b.path
+    assert open(f"{again.path}/a.txt").read() == "two\n"
+
+
+@pytest.mark.asyncio
+async def test_unknown_base_ref(repo):
+    with pytest.raises(WorktreeError):
+        await WorktreePool().acquire(repo, "no-such-ref")
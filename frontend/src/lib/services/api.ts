@@ -15,6 +15,7 @@ import type {
 	GitHubIssue,
 	GitHubPR,
 	SessionDiff,
+	SessionDiffFile,
 	McpServer,
 	Workflow,
 	MonitorTask,
@@ -229,10 +230,23 @@ export async function createGitHubIssue(params: {
 
 export async function fetchSessionDiff(
 	sessionId: string
-): Promise<{ has_diff: boolean; diff: SessionDiff | null }> {
+): Promise<{ has_diff: boolean; diff: SessionDiff | null; truncated: boolean }> {
 	return request(`/sessions/${sessionId}/diff`);
 }
 
+export async function fetchSessionDiffFiles(sessionId: string): Promise<SessionDiffFile[]> {
+	const data = await request<{ files: SessionDiffFile[] }>(`/sessions/${sessionId}/diff/files`);
+	return data.files;
+}
+
+export async function fetchSessionDiffFile(sessionId: string, path: string): Promise<string> {
+	const res = await fetch(
+		`${BASE}/sessions/${sessionId}/diff/file?path=${encodeURIComponent(path)}`
+	);
+	if (!res.ok) throw new Error(`API ${res.status}: ${await res.text()}`);
+	return res.text();
+}
+
 // --- MCP ---
 
 export async function fetchMcps(
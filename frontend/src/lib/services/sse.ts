@@ -19,9 +19,19 @@ export function connectSession(
 	onEvent: (event: AgUiEvent) => void,
 	onError: (error: Event) => void
 ): EventSource {
-	const url = `/api/sessions/${sessionId}/stream`;
+	// batch=true: the backend coalesces bursts into `Batch` frames (JSON arrays)
+	const url = `/api/sessions/${sessionId}/stream?batch=true`;
 	const es = new EventSource(url);
 
+	es.addEventListener('Batch', (e: MessageEvent) => {
+		try {
+			const events: AgUiEvent[] = JSON.parse(e.data);
+			for (const event of events) onEvent(event);
+		} catch (err) {
+			console.error('Failed to parse SSE batch:', err, e.data);
+		}
+	});
+
 	for (const eventType of ALL_EVENT_TYPES) {
 		es.addEventListener(eventType, (e: MessageEvent) => {
 			try {
@@ -42,7 +42,10 @@ export class TabSession {
 			this.eventSource = connectSession(
 				session_id,
 				(event) => this.handleEvent(event),
-				() => {
+				(err) => {
+					// EventSource reconnects on its own (resuming via Last-Event-ID);
+					// only a closed source means the stream is gone
+					if ((err.target as EventSource).readyState !== EventSource.CLOSED) return;
 					if (this.status === 'running') {
 						this.status = 'error';
 						this.errorMsg = 'SSE connection lost';
@@ -63,7 +66,8 @@ export class TabSession {
 
 			case 'TextMessageContent':
 				if (event.text) {
-					this.outputChunks = [...this.outputChunks, event.text];
+					// push, not spread: partial-message runs send one event per token
+					this.outputChunks.push(event.text);
 				}
 				break;
 
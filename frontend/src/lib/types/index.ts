@@ -95,6 +95,21 @@ export interface Session {
 	output_tokens: number | null;
 	num_turns: number | null;
 	duration_ms: number | null;
+	parent_session_id?: string | null;
+	fork_session?: number;
+	// isolation 'worktree': ran in a pooled git worktree; leftover changes
+	// are saved on worktree_branch; continuations reuse worktree_path
+	isolation?: 'worktree' | null;
+	base_ref?: string | null;
+	worktree_branch?: string | null;
+	worktree_path?: string | null;
+	// Host resources of the CLI process tree (null if not sampled)
+	peak_rss_bytes?: number | null;
+	cpu_user_s?: number | null;
+	cpu_sys_s?: number | null;
+	io_read_bytes?: number | null;
+	io_write_bytes?: number | null;
+	max_children?: number | null;
 	started_at: string;
 	finished_at: string | null;
 }
@@ -126,6 +141,9 @@ export interface AgUiEvent {
 	tool_input?: string;
 	tool_result?: string;
 	tool_is_error?: boolean;
+	// Set when tool_result is a preview; full text at /api/sessions/{id}/tool-results/{tool_call_id}
+	tool_result_ref?: string;
+	tool_result_size?: number;
 	// Run
 	model?: string;
 	cost_usd?: number;
@@ -140,6 +158,10 @@ export interface AgUiEvent {
 	state?: Record<string, unknown>;
 	// Error
 	error?: string;
+	error_code?: string;
+	// Custom (and RunError: stderr_tail)
+	custom_type?: string;
+	data?: Record<string, unknown>;
 }
 
 export interface ToolCall {
@@ -260,6 +282,18 @@ export interface SessionDiff {
 	files_changed: number;
 	insertions: number;
 	deletions: number;
+	diff_sha256: string | null;
+	diff_size: number | null;
+}
+
+export interface SessionDiffFile {
+	path: string;
+	old_path: string | null;
+	status: 'A' | 'M' | 'D' | 'R' | 'C';
+	insertions: number;
+	deletions: number;
+	binary: boolean;
+	size_bytes: number;
 }
 
 // --- MCP ---